@@ -1 +1,33 @@
+# Python (CPython) version
+# The MPU6050 library of RaspberryPico/Lib on a Raspberry Pi. The library runs
+# unmodified: machine.py and utime.py in this directory stand in for the
+# micropython modules, with I2C on /dev/i2c-N through i2c_dev.py.
+#
+#   from MPU6050 import MPU6050_DMP
+#   from bus import bus
+#   mpu = MPU6050_DMP(bus(1))          # /dev/i2c-1, pins 3 (SDA) and 5 (SCL)
+#
+# The bus speed is set in /boot/config.txt, e.g. dtparam=i2c_arm_baudrate=400000.
 
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+LIB = os.path.join(HERE, '..', 'RaspberryPico', 'Lib')
+
+# Lib first, so its MPUregisters is found before the older copy in the repo root
+for path in (HERE, LIB):
+    if path in sys.path:
+        sys.path.remove(path)
+sys.path[0:0] = [LIB, HERE]
+
+with open(os.path.join(LIB, 'MPU6050.py')) as source:
+    exec(compile(source.read(), os.path.join(LIB, 'MPU6050.py'), 'exec'))
+
+DMP_IMAGE_PATH = os.path.join(LIB, 'DMP_image.bin')
+
+
+class MPU6050_DMP(MPU6050_DMP):
+    ''' As in the library, with the DMP image read from RaspberryPico/Lib '''
+    def __init__(self, bus, address=MPUADDR, image_path=DMP_IMAGE_PATH):
+        super().__init__(bus, address, image_path)
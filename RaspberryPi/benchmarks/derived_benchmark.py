@@ -0,0 +1,119 @@
+# Python (CPython) benchmark
+# Gravity, yaw/pitch/roll and linear acceleration (sensor and world frame) for
+# a log of DMP packets: dmp_decode.derived on all packets at once versus a
+# per-packet loop unpacking each packet and applying the C++ formulas, the way
+# it is hand-rolled after MPU6050_quaternions.py. Also checks the integer
+# single packet functions of RaspberryPico/Lib/dmp_derived.py against it.
+# Run from the RaspberryPi directory: python3 benchmarks/derived_benchmark.py [packets]
+
+import math
+import os
+import struct
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..', '..', 'RaspberryPico', 'Lib'))
+import dmp_decode
+import dmp_derived
+
+PACKETS = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+CHECKED = 20000                 # packets compared with the integer functions
+# Largest differences allowed for the integer functions: Q14 rounding of the quaternion,
+# 0.01 degree output
+GRAVITY_TOLERANCE = 4 / 16384
+ANGLE_TOLERANCE   = 0.1         # degree
+ACCEL_TOLERANCE   = 4           # raw units, 8192 = 1g
+
+
+def synthetic_packets(n, seed=1):
+    ''' Random orientations, gravity plus up to 0.5g linear acceleration, random gyro '''
+    rng = np.random.default_rng(seed)
+    q = rng.normal(size=(n, 4))
+    q /= np.linalg.norm(q, axis=1, keepdims=True)
+    q *= np.sign(q[:, 0:1])
+    exact = dmp_decode.gravity(q) * dmp_decode.DMP_ACCEL_LSB_PER_G + rng.uniform(-4096, 4096, (n, 3))
+    words = np.empty((n, 14), dtype='>i2')
+    quaternion = np.round(q * (1 << 30)).astype('>i4')
+    words[:, 0:8] = quaternion.view('>i2').reshape(n, 8)
+    words[:, 8:11] = np.round(exact)
+    words[:, 11:14] = rng.integers(-2000, 2000, (n, 3))
+    return words.tobytes()
+
+
+def per_packet(buffer):
+    ''' The hand-rolled way: unpack and compute packet by packet '''
+    results = []
+    for offset in range(0, len(buffer), dmp_decode.DMP_PACKET_SIZE):
+        qw, qx, qy, qz, ax, ay, az = struct.unpack_from('>hxxhxxhxxhxx3h', buffer, offset)
+        w, x, y, z = qw/16384, qx/16384, qy/16384, qz/16384
+        gx = 2*(x*z - w*y)
+        gy = 2*(w*x + y*z)
+        gz = w*w - x*x - y*y + z*z
+        yaw = math.atan2(2*x*y - 2*w*z, 2*w*w + 2*x*x - 1)
+        pitch = math.atan2(gx, math.sqrt(gy*gy + gz*gz))
+        if gz < 0:
+            pitch = math.pi - pitch if pitch > 0 else -math.pi - pitch
+        roll = math.atan2(gy, gz)
+        lx, ly, lz = ax - gx*8192, ay - gy*8192, az - gz*8192
+        # rotate by q: q * (0, v) * conj(q)
+        pw = -x*lx - y*ly - z*lz
+        px = w*lx + y*lz - z*ly
+        py = w*ly - x*lz + z*lx
+        pz = w*lz + x*ly - y*lx
+        world = (-pw*x + px*w - py*z + pz*y,
+                 -pw*y + px*z + py*w - pz*x,
+                 -pw*z - px*y + py*x + pz*w)
+        results.append(((gx, gy, gz), (yaw, pitch, roll), (lx, ly, lz), world))
+    return results
+
+
+def integer_functions(buffer, count):
+    packet = memoryview(buffer)
+    gravity, ypr, linear, world = [0]*3, [0]*3, [0]*3, [0]*3
+    results = np.empty((count, 4, 3))
+    for i in range(count):
+        view = packet[i*dmp_decode.DMP_PACKET_SIZE:(i + 1)*dmp_decode.DMP_PACKET_SIZE]
+        dmp_derived.get_gravity(view, gravity)
+        dmp_derived.get_yaw_pitch_roll(view, ypr)
+        dmp_derived.get_linear_accel(view, linear)
+        dmp_derived.get_linear_accel_in_world(view, world)
+        results[i] = (gravity, ypr, linear, world)
+    return results
+
+
+def angle_difference(a, b):
+    return np.abs((a - b + 180) % 360 - 180)
+
+
+buffer = synthetic_packets(PACKETS)
+loop_count = min(PACKETS, 200000)
+start = time.perf_counter()
+loop = per_packet(buffer[:loop_count*dmp_decode.DMP_PACKET_SIZE])
+loop_rate = loop_count / (time.perf_counter() - start)
+start = time.perf_counter()
+gravity, ypr, linear, world = dmp_decode.derived(buffer)
+vector_rate = PACKETS / (time.perf_counter() - start)
+
+loop = np.array(loop)
+vectorized = np.stack((gravity[:loop_count], ypr[:loop_count], linear[:loop_count], world[:loop_count]), axis=1)
+if np.abs(loop - vectorized).max() > 1e-6:
+    raise Exception("per-packet loop and dmp_decode.derived disagree")
+print(f"per-packet loop          {loop_rate:12.0f} packets/s")
+print(f"dmp_decode.derived       {vector_rate:12.0f} packets/s  ({vector_rate/loop_rate:.0f}x)")
+
+checked = min(CHECKED, PACKETS)
+start = time.perf_counter()
+integers = integer_functions(buffer, checked)
+integer_rate = checked / (time.perf_counter() - start)
+# gimbal lock: yaw and roll are undefined where pitch is near +-90 degrees
+defined = np.abs(np.abs(np.degrees(ypr[:checked, 1])) - 90) > 2
+errors = (np.abs(integers[:, 0] / 16384 - gravity[:checked]).max(),
+          angle_difference(integers[defined, 1] / 100, np.degrees(ypr[:checked][defined])).max(),
+          np.abs(integers[:, 2] - linear[:checked]).max(),
+          np.abs(integers[:, 3] - world[:checked]).max())
+print(f"dmp_derived (integer)    {integer_rate:12.0f} packets/s on CPython, largest differences: gravity"
+      f" {errors[0]*1000:.2f} mg, angles {errors[1]:.3f} deg, linear {errors[2]:.1f}, world {errors[3]:.1f} LSB")
+if errors[0] > GRAVITY_TOLERANCE or errors[1] > ANGLE_TOLERANCE or max(errors[2:]) > ACCEL_TOLERANCE:
+    raise Exception("integer functions of dmp_derived out of tolerance")
@@ -0,0 +1,50 @@
+# Python (CPython) benchmark
+# Decoding a log of DMP packets with dmp_decode versus the per-packet loop
+# used in RaspberryPico/Example_rotating_cube_on_network_server/MPU6050_quaternions.py
+# Run from the RaspberryPi directory: python3 benchmarks/dmp_decode_benchmark.py [packets]
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import dmp_decode
+
+PACKETS = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+
+def two_bytes_to_int(d1,d2) -> int:
+    value = d1*256 + d2
+    if value >= 0x8000:
+        value -= 65536
+    return value
+
+
+def decode_per_packet(buffer):
+    scale = 16384.0
+    quaternions = []
+    for i in range(0, len(buffer), dmp_decode.DMP_PACKET_SIZE):
+        b = buffer[i:i+dmp_decode.DMP_PACKET_SIZE]
+        quaternions.append((two_bytes_to_int(b[0], b[1])/scale,
+                            two_bytes_to_int(b[4], b[5])/scale,
+                            two_bytes_to_int(b[8], b[9])/scale,
+                            two_bytes_to_int(b[12], b[13])/scale))
+    return quaternions
+
+
+buffer = np.random.default_rng(1).integers(0, 256, PACKETS*dmp_decode.DMP_PACKET_SIZE, dtype=np.uint8).tobytes()
+
+start = time.perf_counter()
+reference = decode_per_packet(buffer)
+loop_time = time.perf_counter() - start
+
+start = time.perf_counter()
+quaternion, accel, gyro = dmp_decode.decode(buffer)
+vector_time = time.perf_counter() - start
+
+if not np.array_equal(quaternion, np.array(reference)):
+    raise Exception("vectorized and per-packet decoding differ")
+print(f"{PACKETS} packets")
+print(f"per-packet loop {loop_time:8.3f} s  {PACKETS/loop_time:14.0f} packets/s")
+print(f"dmp_decode      {vector_time:8.3f} s  {PACKETS/vector_time:14.0f} packets/s  ({loop_time/vector_time:.0f}x)")
@@ -0,0 +1,97 @@
+# Python (CPython) benchmark
+# The fusion filters on a synthetic log of raw gyro and accel samples at 1kHz:
+# samples per second for the per-sample reference, for the filters on one
+# sensor and on STREAMS sensors at once, and the largest difference with the
+# reference. Also checks that feeding a log in blocks gives the same result as
+# in one go.
+# Run from the RaspberryPi directory: python3 benchmarks/fusion_benchmark.py [samples]
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import fusion
+
+SAMPLES   = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+REFERENCE = min(SAMPLES, 50000)         # samples run through the slow per-sample reference
+BLOCK     = 10000
+STREAMS   = 256
+PERIOD_US = 1000
+TOLERANCE = 1e-9
+
+
+def synthetic_log(n, seed=1):
+    ''' Raw int16 gyro (slowly varying rates, up to ~100 dps) and accel (1g plus wobble and
+        noise) at GYRO_FS_250 and ACCEL_FS_2
+    '''
+    rng = np.random.default_rng(seed)
+    t = np.arange(n)[:, np.newaxis] / 1000
+    phases = rng.uniform(0, 2*np.pi, (1, 3))
+    gyro = 100*131*np.sin(0.5*t + phases) + rng.normal(0, 20, (n, 3))
+    accel = np.array([0, 0, 16384]) + 3000*np.sin(0.3*t + phases) + rng.normal(0, 100, (n, 3))
+    return np.round(gyro).astype(np.int16), np.round(accel).astype(np.int16)
+
+
+def reference_run(name, gyro, accel):
+    dt = PERIOD_US / 1000000
+    out = np.empty((len(gyro), 4))
+    q = (1.0, 0.0, 0.0, 0.0)
+    integral = (0.0, 0.0, 0.0)
+    ax, ay, az = accel[0].tolist()
+    angles = (np.arctan2(ay, az), np.arctan2(-ax, np.hypot(ay, az)), 0.0)
+    for k, (g, a) in enumerate(zip(gyro.tolist(), accel.tolist())):
+        if name == 'madgwick':
+            q = fusion.madgwick_reference(q, g, a, dt)
+        elif name == 'mahony':
+            q, integral = fusion.mahony_reference(q, integral, g, a, dt, ki=0.1)
+        else:
+            angles = fusion.complementary_reference(angles, g, a, dt)
+            q = angles
+        out[k, 0:len(q)] = q
+    return fusion.euler_to_quaternion(out[:, 0:3]) if name == 'complementary' else out
+
+
+def make(name, streams=1):
+    if name == 'madgwick':
+        return fusion.madgwick(PERIOD_US, streams=streams)
+    if name == 'mahony':
+        return fusion.mahony(PERIOD_US, ki=0.1, streams=streams)
+    return fusion.complementary(PERIOD_US, streams=streams)
+
+
+def blocks(name, gyro, accel, size, streams=1):
+    fusion_filter = make(name, streams)
+    return np.concatenate([fusion_filter.update(gyro[i:i + size], accel[i:i + size])
+                           for i in range(0, len(gyro), size)])
+
+
+gyro, accel = synthetic_log(SAMPLES)
+print(f"{SAMPLES} samples, blocks of {BLOCK}, {STREAMS} streams of {SAMPLES//STREAMS} samples for the multi-stream run")
+for name in ('madgwick', 'mahony', 'complementary'):
+    start = time.perf_counter()
+    reference = reference_run(name, gyro[:REFERENCE], accel[:REFERENCE])
+    reference_rate = REFERENCE / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    single = blocks(name, gyro, accel, BLOCK)
+    single_rate = SAMPLES / (time.perf_counter() - start)
+    # q and -q are the same orientation
+    error = np.abs(single[:REFERENCE] - reference * np.sign((single[:REFERENCE] * reference).sum(axis=1, keepdims=True))).max()
+
+    n = SAMPLES // STREAMS
+    stream_gyro = gyro[:n*STREAMS].reshape(STREAMS, n, 3).transpose(1, 0, 2)
+    stream_accel = accel[:n*STREAMS].reshape(STREAMS, n, 3).transpose(1, 0, 2)
+    start = time.perf_counter()
+    multi = blocks(name, stream_gyro, stream_accel, BLOCK, STREAMS)
+    multi_rate = n * STREAMS / (time.perf_counter() - start)
+    stream_error = np.abs(multi[:, 0, :] - single[:n]).max()
+
+    whole = make(name).update(gyro[:REFERENCE], accel[:REFERENCE])
+    block_error = np.abs(whole - single[:REFERENCE]).max()
+    if max(error, stream_error, block_error) > TOLERANCE:
+        raise Exception(f"{name}: differences {error:.2e} (reference), {stream_error:.2e} (streams),"
+                        f" {block_error:.2e} (blocks) exceed {TOLERANCE}")
+    print(f"{name:14s} reference {reference_rate:10.0f}  one sensor {single_rate:10.0f}  {STREAMS} sensors"
+          f" {multi_rate:10.0f} samples/s   largest difference {max(error, stream_error, block_error):.1e}")
@@ -0,0 +1,94 @@
+# Python (CPython) benchmark
+# MPU6050_DMP on the Linux backend (i2c_dev.py), run against the fake device
+# of fake_i2c.py so no MPU6050 needs to be connected. Compares the combined
+# I2C_RDWR transactions of i2c_dev with what SMBus block transfers would take,
+# which carry at most 32 data bytes each: for dmp_initialize (firmware upload
+# and verify) and for draining a full FIFO of DMP packets.
+# Besides transactions and host time the time on the wire is estimated at
+# 400kHz: 9 bits per byte, plus the address, register and (repeated) start
+# bytes of every transaction.
+# Run from the RaspberryPi directory: python3 benchmarks/i2c_dev_benchmark.py [drains]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from MPU6050 import MPU6050_DMP
+from bus import bus
+from fifo import fifo_reader
+import MPUregisters as MPUreg
+import i2c_dev
+import fake_i2c
+
+DRAINS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+PACKET_SIZE = 28
+PACKETS_PER_DRAIN = fake_i2c.FIFO_SIZE // PACKET_SIZE
+BUS_HZ = 400000
+SMBUS_BLOCK_MAX = 32                            # I2C_SMBUS_BLOCK_MAX in linux/i2c.h
+NOT_INCREMENTING = (MPUreg.FIFO_R_W, MPUreg.MEM_R_W)
+
+
+class smbus_i2c(i2c_dev.i2c_dev):
+    ''' The same device accessed the way SMBus block reads and writes (i2c_smbus_read_i2c_block_data)
+        would: one transaction per 32 bytes
+    '''
+    def readfrom_mem_into(self, addr, memaddr, buf, *, addrsize=8):
+        view = memoryview(buf)
+        for start in range(0, len(buf), SMBUS_BLOCK_MAX):
+            register = memaddr if memaddr in NOT_INCREMENTING else memaddr + start
+            super().readfrom_mem_into(addr, register, view[start:start + SMBUS_BLOCK_MAX])
+
+    def writeto_mem(self, addr, memaddr, buf, *, addrsize=8):
+        for start in range(0, len(buf), SMBUS_BLOCK_MAX):
+            register = memaddr if memaddr in NOT_INCREMENTING else memaddr + start
+            super().writeto_mem(addr, register, bytes(buf[start:start + SMBUS_BLOCK_MAX]))
+
+class smbus_bus(bus, smbus_i2c):
+    pass
+
+
+def wire_ms(device) -> float:
+    ''' Estimated bus time: address byte per message, register byte and start per write '''
+    bits = 9 * (device.bytes_read + device.bytes_written + device.messages) + 2 * device.messages
+    return bits / BUS_HZ * 1000
+
+
+def counters(device):
+    return device.ioctls, device.bytes_read + device.bytes_written, wire_ms(device)
+
+
+def run(bus_class, name, bus_id):
+    mpu = MPU6050_DMP(bus_class(bus_id))
+    device = fake_i2c.fake_i2c_device.devices[bus_id]
+    before = counters(device)
+    start = time.perf_counter()
+    if mpu.dmp_initialize(warm_start=False) != 0:
+        raise Exception("dmp_initialize failed on the fake device")
+    host_ms = (time.perf_counter() - start) * 1000 - 200     # less the two 100 ms reset delays
+    after = counters(device)
+    print(f"{name:28s} dmp_initialize  {after[0]-before[0]:6d} transactions  {after[1]-before[1]:6d} bytes"
+          f"  wire {after[2]-before[2]:7.1f} ms  host {host_ms:7.1f} ms")
+
+    reader = fifo_reader(mpu, PACKET_SIZE, chunk_packets=PACKETS_PER_DRAIN)
+    packets = bytes(range(PACKET_SIZE)) * PACKETS_PER_DRAIN
+    before = counters(device)
+    start = time.perf_counter()
+    for _ in range(DRAINS):
+        device.push(packets)
+        reader.fill()
+        reader.clear()
+    host_us = (time.perf_counter() - start) / DRAINS * 1e6
+    after = counters(device)
+    if reader.buffer[:len(packets)] != packets:
+        raise Exception("FIFO data corrupted on the way")
+    print(f"{name:28s} FIFO drain      {(after[0]-before[0])/DRAINS:6.1f} transactions  {PACKETS_PER_DRAIN*PACKET_SIZE:6d} bytes"
+          f"  wire {(after[2]-before[2])/DRAINS:7.2f} ms  host {host_us:7.1f} us")
+    return (after[2] - before[2]) / DRAINS
+
+
+i2c_dev.i2c_dev.device_factory = fake_i2c.fake_i2c_device
+print(f"{PACKETS_PER_DRAIN} packets of {PACKET_SIZE} bytes per drain, {DRAINS} drains, wire time at {BUS_HZ//1000} kHz")
+combined = run(bus, "i2c_dev combined I2C_RDWR", 1)
+blocks = run(smbus_bus, "SMBus 32 byte blocks", 2)
+print(f"bus time per FIFO drain: {blocks/combined:.2f}x longer with SMBus blocks")
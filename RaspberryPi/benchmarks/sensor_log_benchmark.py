@@ -0,0 +1,86 @@
+# Python (CPython) benchmark
+# Reading a log file of DMP packets with sensor_log versus an ad-hoc loop
+# reading and unpacking one record at a time: a pass over all quaternions,
+# and lookups by timestamp with the sparse index versus a search of the full
+# timestamp column.
+# Run from the RaspberryPi directory: python3 benchmarks/sensor_log_benchmark.py [records]
+
+import os
+import struct
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import sensor_log
+
+RECORDS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+LOOKUPS = 10000
+CHUNK   = 100000
+
+
+def mean_w_per_record(path, limit):
+    ''' The ad-hoc way: read and unpack record by record '''
+    total = 0.0
+    with open(path, 'rb') as file:
+        file.seek(sensor_log.HEADER_SIZE)
+        for _ in range(limit):
+            record = file.read(sensor_log.RECORD_SIZE)
+            timestamp, sequence, w = struct.unpack_from('>QIh', record)
+            total += w / sensor_log.QUATERNION_SCALE
+    return total / limit
+
+
+def mean_w_chunks(reader):
+    total = 0.0
+    for records in reader.chunks(CHUNK):
+        quaternion, accel, gyro = sensor_log.decode(records)
+        total += quaternion[:, 0].sum()
+    return total / len(reader)
+
+
+rng = np.random.default_rng(1)
+path = os.path.join(tempfile.mkdtemp(), 'benchmark.log')
+start = time.perf_counter()
+with sensor_log.log_writer(path, 5000) as writer:
+    for first in range(0, RECORDS, CHUNK):
+        n = min(CHUNK, RECORDS - first)
+        packets = rng.integers(0, 256, n*sensor_log.DMP_PACKET_SIZE, dtype=np.uint8).tobytes()
+        sequences = np.arange(first, first + n)
+        writer.write_packets(5000*sequences, sequences, packets)
+write_time = time.perf_counter() - start
+print(f"{RECORDS} records, {os.path.getsize(path)/1e6:.0f} MB, written in {write_time:.2f} s"
+      f" ({RECORDS/write_time:.0f} records/s)")
+
+start = time.perf_counter()
+reader = sensor_log.log_reader(path)
+open_time = time.perf_counter() - start
+print(f"open with mmap and sparse index {open_time*1000:8.1f} ms")
+
+limit = min(RECORDS, 200000)
+start = time.perf_counter()
+loop_mean = mean_w_per_record(path, limit)
+loop_rate = limit / (time.perf_counter() - start)
+start = time.perf_counter()
+chunk_mean = mean_w_chunks(reader)
+chunk_rate = RECORDS / (time.perf_counter() - start)
+if not np.isclose(loop_mean, sensor_log.decode(reader.records[:limit])[0][:, 0].mean()):
+    raise Exception("per-record loop and sensor_log disagree")
+print(f"quaternion pass, per-record loop   {loop_rate:14.0f} records/s")
+print(f"quaternion pass, chunks of {CHUNK}  {chunk_rate:14.0f} records/s  ({chunk_rate/loop_rate:.0f}x)")
+
+targets = rng.integers(0, 5000*RECORDS, LOOKUPS)
+start = time.perf_counter()
+sparse = [reader.find(t) for t in targets]
+sparse_time = (time.perf_counter() - start) / LOOKUPS
+start = time.perf_counter()
+full = [int(np.searchsorted(reader.records['timestamp_us'], t)) for t in targets[:100]]
+full_time = (time.perf_counter() - start) / 100
+if sparse[:100] != full:
+    raise Exception("sparse index and full search disagree")
+print(f"lookup by timestamp, sparse index  {sparse_time*1e6:10.1f} us")
+print(f"lookup by timestamp, full column   {full_time*1e6:10.1f} us  ({full_time/sparse_time:.0f}x)")
+
+reader.close()
+os.remove(path)
@@ -0,0 +1,95 @@
+# Python (CPython) version
+# Vectorized decoding of DMP packets, for processing logged runs of many packets
+# on the host. The packet layout is that of the MotionApps 6.12 image in
+# RaspberryPico/Lib/DMP_image.txt:
+#   bytes  0-15  quaternion w, x, y, z as big endian 32 bit values
+#   bytes 16-21  accel x, y, z as big endian 16 bit values
+#   bytes 22-27  gyro x, y, z as big endian 16 bit values
+# Like MPU6050_quaternions.py only the high 16 bits of the quaternion
+# components are used, scaled by 16384.
+# The derived quantities of the C++ library (dmpGetGravity, dmpGetYawPitchRoll,
+# dmpGetLinearAccel, dmpGetLinearAccelInWorld) work on all packets at once;
+# RaspberryPico/Lib/dmp_derived.py has them for single packets on the Pico.
+
+import numpy as np
+
+DMP_PACKET_SIZE = 28
+QUATERNION_SCALE = 16384.0
+DMP_ACCEL_LSB_PER_G = 8192.0
+
+# One record per packet, a view on the raw bytes
+DMP_PACKET = np.dtype({'names':    ['w', 'x', 'y', 'z', 'accel', 'gyro'],
+                       'formats':  ['>i2', '>i2', '>i2', '>i2', ('>i2', (3,)), ('>i2', (3,))],
+                       'offsets':  [0, 4, 8, 12, 16, 22],
+                       'itemsize': DMP_PACKET_SIZE})
+
+
+def packet_count(buffer) -> int:
+    if len(buffer) % DMP_PACKET_SIZE:
+        raise Exception(f"buffer of {len(buffer)} bytes does not hold a whole number of {DMP_PACKET_SIZE} byte packets")
+    return len(buffer) // DMP_PACKET_SIZE
+
+
+def packets(buffer):
+    ''' Structured array view (no copy) of a buffer of N x 28 byte DMP packets '''
+    packet_count(buffer)
+    return np.frombuffer(buffer, dtype=DMP_PACKET)
+
+
+def words(buffer):
+    ''' The packets as an (N, 14) view of big endian 16 bit words '''
+    return np.frombuffer(buffer, dtype='>i2', count=packet_count(buffer)*14).reshape(-1, 14)
+
+
+def decode(buffer):
+    ''' Returns (quaternion, accel, gyro) for a buffer of N packets. quaternion is an (N, 4)
+        float array of w, x, y, z scaled in a single pass, accel and gyro are raw (N, 3)
+        int16 views on the buffer.
+    '''
+    w = words(buffer)
+    quaternion = w[:, 0:8:2] * (1/QUATERNION_SCALE)     # high words of the 32 bit components
+    return quaternion, w[:, 8:11], w[:, 11:14]
+
+
+def gravity(quaternion):
+    ''' (N, 3) direction of gravity in the sensor frame, in g, from (N, 4) quaternions '''
+    w, x, y, z = quaternion.T
+    return np.stack((2*(x*z - w*y), 2*(w*x + y*z), w*w - x*x - y*y + z*z), axis=1)
+
+
+def yaw_pitch_roll(quaternion, gravity_vector=None):
+    ''' (N, 3) yaw, pitch and roll in radians, as dmpGetYawPitchRoll of MotionApps 6.12: pitch
+        continues past 90 degrees when the sensor is upside down
+    '''
+    if gravity_vector is None:
+        gravity_vector = gravity(quaternion)
+    w, x, y, z = quaternion.T
+    gx, gy, gz = gravity_vector.T
+    yaw = np.arctan2(2*x*y - 2*w*z, 2*w*w + 2*x*x - 1)
+    pitch = np.arctan2(gx, np.sqrt(gy*gy + gz*gz))
+    pitch = np.where(gz < 0, np.where(pitch > 0, np.pi - pitch, -np.pi - pitch), pitch)
+    return np.stack((yaw, pitch, np.arctan2(gy, gz)), axis=1)
+
+
+def linear_accel(accel, gravity_vector):
+    ''' (N, 3) acceleration without gravity in the sensor frame, in raw DMP units (8192 = 1g) '''
+    return accel - gravity_vector * DMP_ACCEL_LSB_PER_G
+
+
+def linear_accel_in_world(linear, quaternion):
+    ''' (N, 3) linear acceleration rotated into the world frame, q v q* as getRotated of the C++
+        library: (w^2 - u.u) v + 2(u.v) u + 2w (u x v) with u = (x, y, z)
+    '''
+    w = quaternion[:, 0:1]
+    u = quaternion[:, 1:4]
+    uu = np.sum(u*u, axis=1, keepdims=True)
+    uv = np.sum(u*linear, axis=1, keepdims=True)
+    return (w*w - uu)*linear + 2*uv*u + 2*w*np.cross(u, linear)
+
+
+def derived(buffer):
+    ''' (gravity, yaw_pitch_roll, linear_accel, linear_accel_in_world) for a buffer of N packets '''
+    quaternion, accel, gyro = decode(buffer)
+    gravity_vector = gravity(quaternion)
+    linear = linear_accel(accel, gravity_vector)
+    return gravity_vector, yaw_pitch_roll(quaternion, gravity_vector), linear, linear_accel_in_world(linear, quaternion)
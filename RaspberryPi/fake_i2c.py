@@ -0,0 +1,126 @@
+# Python (CPython) version
+# A fake /dev/i2c-N with an MPU6050 behind it, for running the library on a
+# host without hardware. It takes the place of the ioctl of i2c_dev.py and
+# decodes the I2C_RDWR messages as the MPU6050 would see them on the wire:
+# a write message sets the register pointer and writes the bytes after it,
+# a read message reads from the register pointer on, auto-incrementing, except
+# for FIFO_R_W and MEM_R_W which read the FIFO and the DMP memory.
+#
+#   import i2c_dev, fake_i2c
+#   i2c_dev.i2c_dev.device_factory = fake_i2c.fake_i2c_device
+#
+# Only the registers the library depends on behave like the device: the reset
+# bits, the FIFO and its count, and the DMP memory access. Data for the FIFO is
+# put in with push().
+
+import ctypes
+import errno
+import MPUregisters as MPUreg
+from i2c_dev import I2C_RDWR, I2C_M_RD
+
+FIFO_SIZE = 1024
+DMP_MEMORY_SIZE = 16 * 256
+PWR1_DEVICE_RESET = 1 << MPUreg.PWR1_DEVICE_RESET_BIT
+
+
+class fake_i2c_device():
+    ''' Stands in for linux_device. Counts the ioctls (I2C transactions) and the messages and
+        bytes moved, as a measure of bus traffic.
+    '''
+    devices = {}            # bus id -> device, so a test can get at the device of a bus
+
+    def __init__(self, id, address=MPUreg.MPUADDRESS):
+        self.address = address
+        self.memory = bytearray(DMP_MEMORY_SIZE)
+        self.power_on()
+        self.ioctls = 0
+        self.messages = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        fake_i2c_device.devices[id] = self
+
+    def power_on(self):
+        self.registers = bytearray(256)
+        self.registers[MPUreg.WHO_AM_I] = 0x68
+        self.registers[MPUreg.PWR_MGMT_1] = 0x40        # sleep
+        self.fifo = bytearray()
+        self.pointer = 0
+
+    def push(self, data):
+        ''' Data arriving in the FIFO; what does not fit is lost and flags an overflow '''
+        room = FIFO_SIZE - len(self.fifo)
+        if len(data) > room:
+            self.registers[MPUreg.INT_STATUS] |= 1 << MPUreg.INTERRUPT_FIFO_OFLOW_BIT
+        self.fifo += data[:room]
+
+    def ioctl(self, request, rdwr):
+        if request != I2C_RDWR:
+            raise OSError(errno.ENOTTY, "only I2C_RDWR is implemented")
+        self.ioctls += 1
+        for i in range(rdwr.nmsgs):
+            msg = rdwr.msgs[i]
+            if msg.addr != self.address:
+                raise OSError(errno.ENXIO, "no device at address")   # NACK, as the i2c driver reports it
+            self.messages += 1
+            if msg.flags & I2C_M_RD:
+                data = self.read(msg.len)
+                ctypes.memmove(msg.buf, bytes(data), msg.len)
+                self.bytes_read += msg.len
+            else:
+                data = ctypes.string_at(msg.buf, msg.len)
+                self.pointer = data[0]
+                self.write(data[1:])
+                self.bytes_written += msg.len
+        return 0
+
+    def bank_address(self) -> int:
+        return (self.registers[MPUreg.BANK_SEL] & 0x1F) * 256 + self.registers[MPUreg.MEM_START_ADDR]
+
+    def read(self, length) -> bytearray:
+        if self.pointer == MPUreg.FIFO_R_W:     # the pointer stays on FIFO_R_W
+            data = self.fifo[:length]
+            del self.fifo[:length]
+            return data + bytes(length - len(data))
+        data = bytearray(length)
+        for i in range(length):
+            register = self.pointer
+            if register == MPUreg.MEM_R_W:
+                address = self.bank_address()
+                data[i] = self.memory[address % DMP_MEMORY_SIZE]
+                self.registers[MPUreg.MEM_START_ADDR] = (address + 1) & 0xFF
+                continue
+            if register == MPUreg.FIFO_COUNTH:
+                data[i] = len(self.fifo) >> 8
+            elif register == MPUreg.FIFO_COUNTH + 1:
+                data[i] = len(self.fifo) & 0xFF
+            else:
+                data[i] = self.registers[register]
+                if register == MPUreg.INT_STATUS:
+                    self.registers[register] = 0        # cleared by the read
+            self.pointer = (register + 1) & 0xFF
+        return data
+
+    def write(self, data):
+        for value in data:
+            register = self.pointer
+            if register == MPUreg.FIFO_R_W:
+                self.push(bytes((value,)))
+                continue
+            if register == MPUreg.MEM_R_W:
+                address = self.bank_address()
+                self.memory[address % DMP_MEMORY_SIZE] = value
+                self.registers[MPUreg.MEM_START_ADDR] = (address + 1) & 0xFF
+                continue
+            if register == MPUreg.PWR_MGMT_1 and value & PWR1_DEVICE_RESET:
+                self.power_on()
+                return
+            if register == MPUreg.USER_CTRL:
+                if value & (1 << MPUreg.USERCTRL_FIFO_RESET_BIT):
+                    self.fifo = bytearray()
+                value &= ~MPUreg.SELF_CLEARING_BITS.get(register, 0)
+            if register not in (MPUreg.WHO_AM_I, MPUreg.INT_STATUS):
+                self.registers[register] = value
+            self.pointer = (register + 1) & 0xFF
+
+    def close(self):
+        pass
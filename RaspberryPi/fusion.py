@@ -0,0 +1,406 @@
+# Python (CPython) version
+# Sensor fusion on the host for raw accel/gyro samples, for when the DMP is not
+# used: Madgwick and Mahony orientation filters and a complementary filter.
+# Each filter keeps its state between calls of update(), so a stream can be fed
+# block by block as it arrives, or a log in chunks, with the same result as in
+# one go.
+#
+# Input is raw sensor values as read with get_rotation/get_acceleration or from
+# the FIFO, as (N, 3) arrays, or (N, S, 3) for S sensors at once. The gyro
+# scaling follows from the GYRO_FS_* code of MPUregisters the sensor was
+# configured with. The filters only use the direction of the accelerometer
+# vector, so its ACCEL_FS_* range does not matter to them; sensor_scales gives
+# the g per LSB for converting accelerometer values yourself. Output is (N, 4)
+# (or (N, S, 4)) unit quaternions w, x, y, z, the orientation after every sample.
+#
+# Where the time goes:
+#   - scaling and normalising the accelerometer are done for a whole block in
+#     numpy
+#   - Madgwick and Mahony are recursive, every sample depends on the previous
+#     orientation, so the step itself runs sample by sample: on python floats
+#     for a single sensor, on (S,) arrays for S sensors together
+#   - the complementary filter works on roll, pitch and yaw angles. It is a
+#     first order linear recursion and is solved for the whole block in numpy.
+# The *_reference functions are plain per-sample versions after Madgwick's
+# and Mahony's C code, to check the filters against.
+
+import math
+import numpy as np
+
+GYRO_LSB_PER_DPS = (131.0, 65.5, 32.8, 16.4)       # by GYRO_FS_250 .. GYRO_FS_2000
+ACCEL_LSB_PER_G  = (16384.0, 8192.0, 4096.0, 2048.0)  # by ACCEL_FS_2 .. ACCEL_FS_16
+LINEAR_PRECISION = 1e6      # largest growth of a term in the block solution of the complementary filter
+
+
+def sensor_scales(gyro_fs=0, accel_fs=0):
+    ''' (rad/s per gyro LSB, g per accel LSB) for the full scale range codes '''
+    return math.radians(1 / GYRO_LSB_PER_DPS[gyro_fs]), 1 / ACCEL_LSB_PER_G[accel_fs]
+
+
+def as_block(samples):
+    ''' (N, S, 3) float view of (N, 3) or (N, S, 3) samples '''
+    samples = np.asarray(samples, dtype=np.float64)
+    return samples[:, np.newaxis, :] if samples.ndim == 2 else samples
+
+
+def unit_accel(accel):
+    ''' Normalised accelerometer vectors, zeros where the reading is zero (free fall or no data) '''
+    norm = np.sqrt((accel * accel).sum(axis=-1, keepdims=True))
+    return np.divide(accel, norm, out=np.zeros_like(accel), where=norm > 0)
+
+
+class orientation_filter():
+    ''' Common part of the Madgwick and Mahony filters: state, scaling and block handling '''
+    def __init__(self, period_us, gyro_fs=0, streams=1, q=None):
+        self.dt = period_us / 1000000
+        self.gyro_scale = sensor_scales(gyro_fs)[0]
+        self.q = np.tile([1.0, 0.0, 0.0, 0.0], (streams, 1)) if q is None else \
+                 np.array(q, dtype=np.float64).reshape(streams, 4)
+        self.samples = 0
+
+    def update(self, gyro, accel):
+        ''' Process a block of raw samples, returning the orientation after each '''
+        squeeze = np.ndim(gyro) == 2
+        gyro = as_block(gyro) * self.gyro_scale
+        accel = unit_accel(as_block(accel))
+        if gyro.shape != accel.shape or gyro.shape[1] != len(self.q):
+            raise Exception(f"expected gyro and accel blocks of {len(self.q)} streams with the same shape")
+        result = np.empty(gyro.shape[:2] + (4,))
+        if len(self.q) == 1:
+            self.run_single(gyro[:, 0, :], accel[:, 0, :], result[:, 0, :])
+        else:
+            self.run_streams(gyro, accel, result)
+        self.samples += len(gyro)
+        return result[:, 0, :] if squeeze else result
+
+
+class madgwick(orientation_filter):
+    ''' Madgwick's gradient descent filter (IMU version); beta is the gain of the correction by
+        the accelerometer, in rad/s
+    '''
+    def __init__(self, period_us, gyro_fs=0, beta=0.1, streams=1, q=None):
+        super().__init__(period_us, gyro_fs, streams, q)
+        self.beta = beta
+
+    def run_single(self, gyro, accel, result):
+        dt = self.dt
+        beta = self.beta
+        q0, q1, q2, q3 = self.q[0].tolist()
+        out = []
+        for (gx, gy, gz), (ax, ay, az) in zip(gyro.tolist(), accel.tolist()):
+            d0 = 0.5 * (-q1*gx - q2*gy - q3*gz)
+            d1 = 0.5 * (q0*gx + q2*gz - q3*gy)
+            d2 = 0.5 * (q0*gy - q1*gz + q3*gx)
+            d3 = 0.5 * (q0*gz + q1*gy - q2*gx)
+            if ax or ay or az:
+                q0q0 = q0*q0
+                q1q1 = q1*q1
+                q2q2 = q2*q2
+                q3q3 = q3*q3
+                s0 = 4*q0*q2q2 + 2*q2*ax + 4*q0*q1q1 - 2*q1*ay
+                s1 = 4*q1*q3q3 - 2*q3*ax + 4*q0q0*q1 - 2*q0*ay - 4*q1 + 8*q1*q1q1 + 8*q1*q2q2 + 4*q1*az
+                s2 = 4*q0q0*q2 + 2*q0*ax + 4*q2*q3q3 - 2*q3*ay - 4*q2 + 8*q2*q1q1 + 8*q2*q2q2 + 4*q2*az
+                s3 = 4*q1q1*q3 - 2*q1*ax + 4*q2q2*q3 - 2*q2*ay
+                norm = math.sqrt(s0*s0 + s1*s1 + s2*s2 + s3*s3)
+                if norm > 0:
+                    norm = beta / norm
+                    d0 -= norm*s0
+                    d1 -= norm*s1
+                    d2 -= norm*s2
+                    d3 -= norm*s3
+            q0 += d0*dt
+            q1 += d1*dt
+            q2 += d2*dt
+            q3 += d3*dt
+            norm = 1 / math.sqrt(q0*q0 + q1*q1 + q2*q2 + q3*q3)
+            q0 *= norm
+            q1 *= norm
+            q2 *= norm
+            q3 *= norm
+            out.append((q0, q1, q2, q3))
+        if out:
+            result[:] = out
+            self.q[0] = out[-1]
+
+    def run_streams(self, gyro, accel, result):
+        dt = self.dt
+        beta = self.beta
+        q = self.q.T.copy()         # (4, S): rows are the components
+        for k in range(len(gyro)):
+            q0, q1, q2, q3 = q
+            gx, gy, gz = gyro[k].T
+            ax, ay, az = accel[k].T
+            d = 0.5 * np.array((-q1*gx - q2*gy - q3*gz,
+                                q0*gx + q2*gz - q3*gy,
+                                q0*gy - q1*gz + q3*gx,
+                                q0*gz + q1*gy - q2*gx))
+            q0q0, q1q1, q2q2, q3q3 = q * q
+            s = np.array((4*q0*q2q2 + 2*q2*ax + 4*q0*q1q1 - 2*q1*ay,
+                          4*q1*q3q3 - 2*q3*ax + 4*q0q0*q1 - 2*q0*ay - 4*q1 + 8*q1*q1q1 + 8*q1*q2q2 + 4*q1*az,
+                          4*q0q0*q2 + 2*q0*ax + 4*q2*q3q3 - 2*q3*ay - 4*q2 + 8*q2*q1q1 + 8*q2*q2q2 + 4*q2*az,
+                          4*q1q1*q3 - 2*q1*ax + 4*q2q2*q3 - 2*q2*ay))
+            norm = np.sqrt((s * s).sum(axis=0))
+            gain = np.divide(beta, norm, out=np.zeros_like(norm), where=norm > 0)
+            gain *= (ax != 0) | (ay != 0) | (az != 0)     # no correction without an accelerometer reading
+            d -= s * gain
+            q = q + d * dt
+            q /= np.sqrt((q * q).sum(axis=0))
+            result[k] = q.T
+        self.q[:] = q.T
+
+
+class mahony(orientation_filter):
+    ''' Mahony's complementary filter on SO(3) (IMU version), proportional gain kp and integral
+        gain ki on the error between measured and estimated gravity. The integral (a gyro bias
+        estimate, rad/s) is part of the state.
+    '''
+    def __init__(self, period_us, gyro_fs=0, kp=0.5, ki=0.0, streams=1, q=None):
+        super().__init__(period_us, gyro_fs, streams, q)
+        self.kp = kp
+        self.ki = ki
+        self.integral = np.zeros((streams, 3))
+
+    def run_single(self, gyro, accel, result):
+        dt = self.dt
+        two_kp = 2 * self.kp
+        two_ki = 2 * self.ki
+        q0, q1, q2, q3 = self.q[0].tolist()
+        ix, iy, iz = self.integral[0].tolist()
+        out = []
+        for (gx, gy, gz), (ax, ay, az) in zip(gyro.tolist(), accel.tolist()):
+            if ax or ay or az:
+                vx = q1*q3 - q0*q2                  # half the estimated direction of gravity
+                vy = q0*q1 + q2*q3
+                vz = q0*q0 - 0.5 + q3*q3
+                ex = ay*vz - az*vy                  # half the error, cross product with the measured one
+                ey = az*vx - ax*vz
+                ez = ax*vy - ay*vx
+                if two_ki > 0:
+                    ix += two_ki * ex * dt
+                    iy += two_ki * ey * dt
+                    iz += two_ki * ez * dt
+                    gx += ix
+                    gy += iy
+                    gz += iz
+                gx += two_kp * ex
+                gy += two_kp * ey
+                gz += two_kp * ez
+            gx *= 0.5 * dt
+            gy *= 0.5 * dt
+            gz *= 0.5 * dt
+            qa, qb, qc = q0, q1, q2
+            q0 += -qb*gx - qc*gy - q3*gz
+            q1 += qa*gx + qc*gz - q3*gy
+            q2 += qa*gy - qb*gz + q3*gx
+            q3 += qa*gz + qb*gy - qc*gx
+            norm = 1 / math.sqrt(q0*q0 + q1*q1 + q2*q2 + q3*q3)
+            q0 *= norm
+            q1 *= norm
+            q2 *= norm
+            q3 *= norm
+            out.append((q0, q1, q2, q3))
+        if out:
+            result[:] = out
+            self.q[0] = out[-1]
+            self.integral[0] = (ix, iy, iz)
+
+    def run_streams(self, gyro, accel, result):
+        dt = self.dt
+        two_kp = 2 * self.kp
+        two_ki = 2 * self.ki
+        q = self.q.T.copy()
+        integral = self.integral.T.copy()
+        for k in range(len(gyro)):
+            q0, q1, q2, q3 = q
+            g = gyro[k].T.copy()
+            ax, ay, az = accel[k].T
+            v = np.array((q1*q3 - q0*q2, q0*q1 + q2*q3, q0*q0 - 0.5 + q3*q3))
+            e = np.array((ay*v[2] - az*v[1], az*v[0] - ax*v[2], ax*v[1] - ay*v[0]))
+            measured = (ax != 0) | (ay != 0) | (az != 0)
+            e *= measured                       # no correction without an accelerometer reading
+            if two_ki > 0:
+                integral += two_ki * e * dt
+                g += integral * measured
+            g += two_kp * e
+            g *= 0.5 * dt
+            gx, gy, gz = g
+            q = q + np.array((-q1*gx - q2*gy - q3*gz,
+                              q0*gx + q2*gz - q3*gy,
+                              q0*gy - q1*gz + q3*gx,
+                              q0*gz + q1*gy - q2*gx))
+            q /= np.sqrt((q * q).sum(axis=0))
+            result[k] = q.T
+        self.q[:] = q.T
+        self.integral[:] = integral.T
+
+
+class complementary():
+    ''' Complementary filter on roll and pitch: the integrated gyro rate, pulled towards the
+        accelerometer angles with weight 1 - alpha per sample. Yaw is the integrated z rate.
+        Treats the gyro rates as Euler angle rates, so it is meant for tilts well below 90
+        degrees. State: the last roll, pitch and yaw (rad) per stream. alpha 0 follows the
+        accelerometer only, 1 the gyro only.
+    '''
+    def __init__(self, period_us, gyro_fs=0, alpha=0.98, streams=1, angles=None):
+        if not 0 <= alpha <= 1:
+            raise Exception(f"alpha {alpha} outside 0 .. 1")
+        self.dt = period_us / 1000000
+        self.gyro_scale = sensor_scales(gyro_fs)[0]
+        self.alpha = alpha
+        self.angles = np.zeros((streams, 3)) if angles is None else np.array(angles, dtype=np.float64).reshape(streams, 3)
+        self.initialised = angles is not None
+        # Within a chunk of this length the powers of alpha stay within LINEAR_PRECISION
+        self.chunk = max(1, int(math.log(LINEAR_PRECISION) / -math.log(alpha))) if 0 < alpha < 1 else 1 << 20
+        self.samples = 0
+
+    def update_angles(self, gyro, accel):
+        ''' Process a block of raw samples, returning roll, pitch and yaw (rad) after each '''
+        squeeze = np.ndim(gyro) == 2
+        rates = as_block(gyro) * self.gyro_scale
+        accel = as_block(accel)
+        n, streams = rates.shape[:2]
+        if streams != len(self.angles):
+            raise Exception(f"expected blocks of {len(self.angles)} streams")
+        ax, ay, az = accel[..., 0], accel[..., 1], accel[..., 2]
+        accel_roll = np.arctan2(ay, az)
+        accel_pitch = np.arctan2(-ax, np.sqrt(ay*ay + az*az))
+        if not self.initialised and n:
+            self.angles[:, 0] = accel_roll[0]       # start level with the first accelerometer reading
+            self.angles[:, 1] = accel_pitch[0]
+            self.initialised = True
+        a = self.alpha
+        result = np.empty((n, streams, 3))
+        # angle[k] = a*(angle[k-1] + rate[k]*dt) + (1-a)*accel_angle[k]
+        result[:, :, 0] = self.linear(a*rates[..., 0]*self.dt + (1 - a)*accel_roll, self.angles[:, 0])
+        result[:, :, 1] = self.linear(a*rates[..., 1]*self.dt + (1 - a)*accel_pitch, self.angles[:, 1])
+        result[:, :, 2] = self.angles[:, 2] + np.cumsum(rates[..., 2]*self.dt, axis=0)
+        if n:
+            self.angles[:] = result[-1]
+        self.samples += n
+        return result[:, 0, :] if squeeze else result
+
+    def update(self, gyro, accel):
+        ''' As update_angles, as quaternions '''
+        return euler_to_quaternion(self.update_angles(gyro, accel))
+
+    def linear(self, u, y0):
+        ''' y[k] = alpha*y[k-1] + u[k] for (N, S) inputs u, y[-1] = y0, in chunks: within a chunk
+            y[k] = alpha^(k+1) * y0 + alpha^k * cumsum(u[j] / alpha^j)
+        '''
+        a = self.alpha
+        if a == 0:
+            return u.copy()
+        n = len(u)
+        y = np.empty_like(u)
+        carry = y0.copy()
+        length = min(self.chunk, max(n, 1))
+        k = np.arange(length, dtype=np.float64)[:, np.newaxis]
+        powers = a ** k                     # alpha^k
+        inverse = a ** -k
+        for start in range(0, n, length):
+            block = u[start:start + length]
+            m = len(block)
+            y[start:start + m] = powers[:m] * (np.cumsum(block * inverse[:m], axis=0) + a * carry)
+            carry = y[start + m - 1]
+        return y
+
+
+def euler_to_quaternion(angles):
+    ''' Quaternions of (..., 3) roll, pitch, yaw angles in rad (z-y-x rotation order) '''
+    half = np.asarray(angles) * 0.5
+    cr, cp, cy = np.cos(half[..., 0]), np.cos(half[..., 1]), np.cos(half[..., 2])
+    sr, sp, sy = np.sin(half[..., 0]), np.sin(half[..., 1]), np.sin(half[..., 2])
+    return np.stack((cr*cp*cy + sr*sp*sy,
+                     sr*cp*cy - cr*sp*sy,
+                     cr*sp*cy + sr*cp*sy,
+                     cr*cp*sy - sr*sp*cy), axis=-1)
+
+#
+# Per-sample references
+#
+def madgwick_reference(q, gyro, accel, dt, beta=0.1, gyro_fs=0):
+    ''' One step of Madgwick's updateIMU from raw int readings; q is (q0, q1, q2, q3) '''
+    q0, q1, q2, q3 = q
+    gx, gy, gz = [math.radians(g / GYRO_LSB_PER_DPS[gyro_fs]) for g in gyro]
+    ax, ay, az = accel
+    qDot1 = 0.5 * (-q1 * gx - q2 * gy - q3 * gz)
+    qDot2 = 0.5 * (q0 * gx + q2 * gz - q3 * gy)
+    qDot3 = 0.5 * (q0 * gy - q1 * gz + q3 * gx)
+    qDot4 = 0.5 * (q0 * gz + q1 * gy - q2 * gx)
+    if not (ax == 0 and ay == 0 and az == 0):
+        recipNorm = 1 / math.sqrt(ax * ax + ay * ay + az * az)
+        ax *= recipNorm
+        ay *= recipNorm
+        az *= recipNorm
+        _2q0, _2q1, _2q2, _2q3 = 2 * q0, 2 * q1, 2 * q2, 2 * q3
+        _4q0, _4q1, _4q2 = 4 * q0, 4 * q1, 4 * q2
+        _8q1, _8q2 = 8 * q1, 8 * q2
+        q0q0, q1q1, q2q2, q3q3 = q0 * q0, q1 * q1, q2 * q2, q3 * q3
+        s0 = _4q0 * q2q2 + _2q2 * ax + _4q0 * q1q1 - _2q1 * ay
+        s1 = _4q1 * q3q3 - _2q3 * ax + 4 * q0q0 * q1 - _2q0 * ay - _4q1 + _8q1 * q1q1 + _8q1 * q2q2 + _4q1 * az
+        s2 = 4 * q0q0 * q2 + _2q0 * ax + _4q2 * q3q3 - _2q3 * ay - _4q2 + _8q2 * q1q1 + _8q2 * q2q2 + _4q2 * az
+        s3 = 4 * q1q1 * q3 - _2q1 * ax + 4 * q2q2 * q3 - _2q2 * ay
+        norm = math.sqrt(s0 * s0 + s1 * s1 + s2 * s2 + s3 * s3)
+        if norm > 0:
+            recipNorm = 1 / norm
+            qDot1 -= beta * s0 * recipNorm
+            qDot2 -= beta * s1 * recipNorm
+            qDot3 -= beta * s2 * recipNorm
+            qDot4 -= beta * s3 * recipNorm
+    q0 += qDot1 * dt
+    q1 += qDot2 * dt
+    q2 += qDot3 * dt
+    q3 += qDot4 * dt
+    recipNorm = 1 / math.sqrt(q0 * q0 + q1 * q1 + q2 * q2 + q3 * q3)
+    return (q0 * recipNorm, q1 * recipNorm, q2 * recipNorm, q3 * recipNorm)
+
+
+def mahony_reference(q, integral, gyro, accel, dt, kp=0.5, ki=0.0, gyro_fs=0):
+    ''' One step of Mahony's updateIMU from raw int readings. Returns (q, integral). '''
+    q0, q1, q2, q3 = q
+    ix, iy, iz = integral
+    gx, gy, gz = [math.radians(g / GYRO_LSB_PER_DPS[gyro_fs]) for g in gyro]
+    ax, ay, az = accel
+    if not (ax == 0 and ay == 0 and az == 0):
+        recipNorm = 1 / math.sqrt(ax * ax + ay * ay + az * az)
+        ax *= recipNorm
+        ay *= recipNorm
+        az *= recipNorm
+        halfvx = q1 * q3 - q0 * q2
+        halfvy = q0 * q1 + q2 * q3
+        halfvz = q0 * q0 - 0.5 + q3 * q3
+        halfex = ay * halfvz - az * halfvy
+        halfey = az * halfvx - ax * halfvz
+        halfez = ax * halfvy - ay * halfvx
+        if ki > 0:
+            ix += 2 * ki * halfex * dt
+            iy += 2 * ki * halfey * dt
+            iz += 2 * ki * halfez * dt
+            gx += ix
+            gy += iy
+            gz += iz
+        else:
+            ix = iy = iz = 0.0
+        gx += 2 * kp * halfex
+        gy += 2 * kp * halfey
+        gz += 2 * kp * halfez
+    gx *= 0.5 * dt
+    gy *= 0.5 * dt
+    gz *= 0.5 * dt
+    qa, qb, qc = q0, q1, q2
+    q0 += -qb * gx - qc * gy - q3 * gz
+    q1 += qa * gx + qc * gz - q3 * gy
+    q2 += qa * gy - qb * gz + q3 * gx
+    q3 += qa * gz + qb * gy - qc * gx
+    recipNorm = 1 / math.sqrt(q0 * q0 + q1 * q1 + q2 * q2 + q3 * q3)
+    return (q0 * recipNorm, q1 * recipNorm, q2 * recipNorm, q3 * recipNorm), (ix, iy, iz)
+
+
+def complementary_reference(angles, gyro, accel, dt, alpha=0.98, gyro_fs=0):
+    ''' One step of the complementary filter from raw int readings; angles is (roll, pitch, yaw) '''
+    roll, pitch, yaw = angles
+    gx, gy, gz = [math.radians(g / GYRO_LSB_PER_DPS[gyro_fs]) for g in gyro]
+    ax, ay, az = accel
+    roll = alpha * (roll + gx * dt) + (1 - alpha) * math.atan2(ay, az)
+    pitch = alpha * (pitch + gy * dt) + (1 - alpha) * math.atan2(-ax, math.sqrt(ay * ay + az * az))
+    return (roll, pitch, yaw + gz * dt)
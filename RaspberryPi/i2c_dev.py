@@ -0,0 +1,134 @@
+# Python (CPython) version
+# Linux counterpart of micropython's machine.I2C on /dev/i2c-N, so that the
+# library in RaspberryPico/Lib runs on a Raspberry Pi (see machine.py).
+# Register access uses the I2C_RDWR ioctl: a register read is a single
+# combined transaction (write register address, repeated start, read), of any
+# length. SMBus block reads would limit a read to 32 bytes and split a FIFO
+# drain into many transactions.
+# The device behind the ioctl is replaceable: set i2c_dev.device_factory to a
+# class like fake_i2c.fake_i2c_device to run without hardware, or to None for a
+# subclass that overrides the transfers itself (RaspberryPico/Lib/virtual_mpu.py).
+
+import ctypes
+import fcntl
+import os
+
+I2C_RDWR  = 0x0707      # from linux/i2c-dev.h
+I2C_M_RD  = 0x0001      # from linux/i2c.h
+
+
+class i2c_msg(ctypes.Structure):
+    _fields_ = [('addr',  ctypes.c_uint16),
+                ('flags', ctypes.c_uint16),
+                ('len',   ctypes.c_uint16),
+                ('buf',   ctypes.POINTER(ctypes.c_uint8))]
+
+class i2c_rdwr_ioctl_data(ctypes.Structure):
+    _fields_ = [('msgs',  ctypes.POINTER(i2c_msg)),
+                ('nmsgs', ctypes.c_uint32)]
+
+
+class linux_device():
+    ''' The character device of I2C bus id '''
+    def __init__(self, id):
+        self.fd = os.open(f"/dev/i2c-{id}", os.O_RDWR)
+
+    def ioctl(self, request, arg):
+        return fcntl.ioctl(self.fd, request, arg)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class i2c_dev():
+    ''' I2C controller with the methods of machine.I2C used by bus. sda, scl and freq are only
+        accepted for compatibility: on Linux pins and bus speed are set in /boot/config.txt.
+        Like the micropython type the device is opened in __new__, so subclasses (bus) need not
+        call __init__.
+    '''
+    device_factory = linux_device
+
+    def __new__(cls, id=1, *args, **kwargs):
+        self = super().__new__(cls)
+        self.id = id
+        self.device = cls.device_factory(id) if cls.device_factory is not None else None
+        # One set of ctypes structures, reused for every transaction
+        self.msgs = (i2c_msg * 2)()
+        self.rdwr = i2c_rdwr_ioctl_data(ctypes.cast(self.msgs, ctypes.POINTER(i2c_msg)), 0)
+        self.register = (ctypes.c_uint8 * 2)()
+        self.transactions = 0
+        return self
+
+    def __init__(self, id=1, sda=None, scl=None, freq=400000):
+        pass
+
+    def transfer(self, nmsgs):
+        self.rdwr.nmsgs = nmsgs
+        self.transactions += 1
+        self.device.ioctl(I2C_RDWR, self.rdwr)
+
+    def set_message(self, i, addr, flags, buffer, length):
+        msg = self.msgs[i]
+        msg.addr = addr
+        msg.flags = flags
+        msg.len = length
+        msg.buf = ctypes.cast(buffer, ctypes.POINTER(ctypes.c_uint8))
+
+    def set_register(self, i, addr, memaddr, addrsize):
+        if addrsize == 16:
+            self.register[0] = memaddr >> 8
+            self.register[1] = memaddr & 0xFF
+            self.set_message(i, addr, 0, self.register, 2)
+        else:
+            self.register[0] = memaddr
+            self.set_message(i, addr, 0, self.register, 1)
+
+    def readfrom_mem_into(self, addr, memaddr, buf, *, addrsize=8):
+        ''' Register read as one combined transaction, straight into buf (bytearray or memoryview) '''
+        if len(buf) == 0:
+            return
+        self.set_register(0, addr, memaddr, addrsize)
+        self.set_message(1, addr, I2C_M_RD, (ctypes.c_uint8 * len(buf)).from_buffer(buf), len(buf))
+        self.transfer(2)
+
+    def readfrom_mem(self, addr, memaddr, nbytes, *, addrsize=8) -> bytes:
+        buf = bytearray(nbytes)
+        self.readfrom_mem_into(addr, memaddr, buf, addrsize=addrsize)
+        return bytes(buf)
+
+    def writeto_mem(self, addr, memaddr, buf, *, addrsize=8):
+        ''' Register address and data in a single message '''
+        data = (memaddr.to_bytes(2, 'big') if addrsize == 16 else bytes((memaddr,))) + bytes(buf)
+        self.set_message(0, addr, 0, (ctypes.c_uint8 * len(data)).from_buffer_copy(data), len(data))
+        self.transfer(1)
+
+    def readfrom_into(self, addr, buf, stop=True):
+        self.set_message(0, addr, I2C_M_RD, (ctypes.c_uint8 * len(buf)).from_buffer(buf), len(buf))
+        self.transfer(1)
+
+    def readfrom(self, addr, nbytes, stop=True) -> bytes:
+        buf = bytearray(nbytes)
+        self.readfrom_into(addr, buf)
+        return bytes(buf)
+
+    def writeto(self, addr, buf, stop=True) -> int:
+        data = (ctypes.c_uint8 * len(buf)).from_buffer_copy(bytes(buf))
+        self.set_message(0, addr, 0, data, len(buf))
+        self.transfer(1)
+        return 1
+
+    def scan(self):
+        ''' Addresses that acknowledge a one byte read '''
+        found = []
+        probe = bytearray(1)
+        for addr in range(0x08, 0x78):
+            try:
+                self.readfrom_into(addr, probe)
+                found.append(addr)
+            except OSError:
+                pass
+        return found
+
+    def deinit(self):
+        if self.device is not None:
+            self.device.close()
@@ -0,0 +1,31 @@
+# Python (CPython) version
+# The parts of micropython's machine module used by RaspberryPico/Lib, for
+# running the library on a Raspberry Pi. I2C goes to /dev/i2c-N (i2c_dev.py).
+# There are no pin interrupts from user space here, so the interrupt driven
+# packet reading of MPU6050_DMP is not available; polling works as on the Pico.
+# Without hardware, virtual_mpu.virtual_pin stands in for the INT pin.
+
+import time
+from i2c_dev import i2c_dev
+
+I2C = i2c_dev
+
+
+class Pin():
+    ''' Placeholder for the default arguments of bus; SDA and SCL are fixed by the I2C bus id '''
+    IN = 0
+    OUT = 1
+    PULL_UP = 1
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self, id, *args, **kwargs):
+        self.id = id
+
+    def irq(self, handler=None, trigger=None, **kwargs):
+        if handler is not None:
+            raise Exception("pin interrupts are not supported on Linux, poll the FIFO instead")
+
+
+def idle():
+    time.sleep(0.0002)
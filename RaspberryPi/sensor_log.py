@@ -0,0 +1,202 @@
+# Python (CPython) version
+# Fixed record log files of DMP packets for analysis on the host. The reader
+# memory-maps the file and presents the records as a numpy structured array
+# on the mapped bytes, so nothing is read until it is used and files larger
+# than RAM can be processed in chunks.
+#
+# File: header followed by fixed size records
+#   header  4s  magic b'MPLG'
+#           B   version
+#           B   device id
+#           H   header size in bytes
+#           H   record size in bytes
+#           H   packet size in bytes
+#           I   sample period in us
+#           16x (padding)
+#   record  >u8 timestamp in us, not wrapping (unwrapped Pico ticks_us or host time)
+#           >u4 sequence number
+#           28 byte DMP packet, layout as dmp_decode.DMP_PACKET
+#
+# Recordings made on the Pico with RaspberryPico/Lib/recorder.py are converted
+# with from_recording().
+
+import mmap
+import os
+import struct
+import sys
+import numpy as np
+from dmp_decode import DMP_PACKET, DMP_PACKET_SIZE, QUATERNION_SCALE
+
+# recorder.py defines the block format of recordings; Lib first, so its MPUregisters is found
+# before the older copy in the repo root
+LIB = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'RaspberryPico', 'Lib')
+if LIB in sys.path:
+    sys.path.remove(LIB)
+sys.path.insert(0, LIB)
+import recorder
+
+MAGIC   = b'MPLG'
+VERSION = 1
+HEADER  = '>4sBBHHHI16x'
+HEADER_SIZE = struct.calcsize(HEADER)
+
+LOG_RECORD = np.dtype([('timestamp_us', '>u8'),
+                       ('sequence',     '>u4'),
+                       ('packet',       DMP_PACKET)])
+RECORD_SIZE = LOG_RECORD.itemsize
+
+INDEX_INTERVAL = 1024       # records per entry of the sparse timestamp index
+TICKS_PERIOD = 1 << 30      # Pico ticks_us wrap around at this value
+
+
+def unwrap_ticks(ticks, start=None, period=TICKS_PERIOD):
+    ''' Wrapping tick values as increasing int64 values. start is the unwrapped value the first
+        tick follows on from, None to take the first tick as it is.
+    '''
+    ticks = np.asarray(ticks, dtype=np.int64)
+    if len(ticks) == 0:
+        return ticks
+    first = ticks[0] if start is None else start + (ticks[0] - start) % period
+    return first + np.concatenate(([0], np.cumsum(np.diff(ticks) % period)))
+
+
+class log_writer():
+    ''' Appends records to a log file, writing the header when the file is new '''
+    def __init__(self, path, period_us, device_id=0):
+        self.file = open(path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(struct.pack(HEADER, MAGIC, VERSION, device_id, HEADER_SIZE,
+                                        RECORD_SIZE, DMP_PACKET_SIZE, period_us))
+        self.records = 0
+
+    def write(self, timestamp_us, sequence, packet):
+        ''' One record, packet being the 28 bytes of a DMP packet '''
+        self.write_packets([timestamp_us], [sequence], packet)
+
+    def write_packets(self, timestamps_us, sequences, buffer):
+        ''' N records at once, buffer holding N x 28 byte DMP packets '''
+        packets = np.frombuffer(buffer, dtype=np.uint8).reshape(-1, DMP_PACKET_SIZE)
+        records = np.empty(len(packets), dtype=LOG_RECORD)
+        records['timestamp_us'] = timestamps_us
+        records['sequence'] = sequences
+        # as raw bytes: assigning DMP_PACKET fields would lose the low words of the quaternion
+        offset = LOG_RECORD.fields['packet'][1]
+        records.view(np.uint8).reshape(-1, RECORD_SIZE)[:, offset:offset + DMP_PACKET_SIZE] = packets
+        records.tofile(self.file)
+        self.records += len(records)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class log_reader():
+    ''' Memory-mapped log file. records is a zero copy structured array of LOG_RECORD, e.g.
+        records['packet']['w'] or records['timestamp_us']. Timestamps must be increasing for
+        the lookups by time. A record being appended while the file is open is left out.
+    '''
+    def __init__(self, path, index_interval=INDEX_INTERVAL):
+        self.file = open(path, 'rb')
+        header = self.file.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE:
+            raise Exception(f"{path} is too short for a log file")
+        magic, version, self.device_id, header_size, record_size, packet_size, self.period_us = \
+            struct.unpack(HEADER, header)
+        if magic != MAGIC or version != VERSION:
+            raise Exception(f"{path} is not a version {VERSION} log file")
+        if record_size != RECORD_SIZE or packet_size != DMP_PACKET_SIZE:
+            raise Exception(f"{path} has records of {record_size} bytes, expected {RECORD_SIZE}")
+        count = (self.file.seek(0, 2) - header_size) // record_size
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if count else None
+        self.records = np.frombuffer(self.map, dtype=LOG_RECORD, count=count, offset=header_size) \
+                       if count else np.zeros(0, dtype=LOG_RECORD)
+        # Sparse index: the timestamp of every index_interval-th record, small enough to keep in RAM
+        self.index_interval = index_interval
+        self.index = self.records['timestamp_us'][::index_interval].astype(np.int64)
+
+    def __len__(self):
+        return len(self.records)
+
+    def find(self, timestamp_us) -> int:
+        ''' Position of the first record at or after timestamp_us. Only touches the index and the
+            pages of one index interval.
+        '''
+        entry = int(np.searchsorted(self.index, timestamp_us, side='right')) - 1
+        if entry < 0:
+            return 0
+        start = entry * self.index_interval
+        timestamps = self.records['timestamp_us'][start:start + self.index_interval]
+        return start + int(np.searchsorted(timestamps, timestamp_us))
+
+    def between(self, start_us, end_us):
+        ''' Records with start_us <= timestamp < end_us, as a view '''
+        return self.records[self.find(start_us):self.find(end_us)]
+
+    def chunks(self, records_per_chunk=1 << 16):
+        ''' Views of consecutive records, to work through a file larger than RAM. Pages of a
+            chunk that was processed can be dropped by the OS again.
+        '''
+        for start in range(0, len(self.records), records_per_chunk):
+            yield self.records[start:start + records_per_chunk]
+
+    def close(self):
+        self.records = self.index = None      # views on the map have to go before it is closed
+        if self.map is not None:
+            try:
+                self.map.close()
+            except BufferError:
+                pass                    # views handed out are still in use, the map goes with them
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def decode(records):
+    ''' (quaternion, accel, gyro) of records as dmp_decode.decode: an (N, 4) float array and raw
+        (N, 3) int16 views on the mapped file
+    '''
+    packets = records['packet']
+    quaternion = np.stack([packets['w'], packets['x'], packets['y'], packets['z']], axis=1) * (1/QUATERNION_SCALE)
+    return quaternion, packets['accel'], packets['gyro']
+
+
+def from_recording(source, destination, device_id=0) -> int:
+    ''' Convert a recording file of RaspberryPico/Lib/recorder.py into a log file: checks the
+        version and CRC of every block and unwraps the Pico timestamps, which only works for recordings less
+        than TICKS_PERIOD us (about 18 minutes) apart. Returns the number of records written.
+    '''
+    written = 0
+    writer = None
+    previous = None
+    with open(source, 'rb') as file:
+        while True:
+            block = file.read(recorder.BLOCK_SIZE)
+            if len(block) < recorder.BLOCK_SIZE:
+                break
+            try:
+                flags, trigger, sequence, timestamp_us, period_us, packets = recorder.decode_block(block)
+            except Exception as e:
+                raise Exception(f"{source}: {e}")
+            packet_size = struct.unpack_from(recorder.HEADER, block)[2]
+            if packet_size != DMP_PACKET_SIZE:
+                raise Exception(f"{source} is not a recording of DMP packets")
+            count = len(packets) // packet_size
+            if writer is None:
+                writer = log_writer(destination, period_us, device_id)
+            start = int(unwrap_ticks([timestamp_us], start=previous)[0])
+            timestamps = start + period_us*np.arange(count, dtype=np.int64)
+            writer.write_packets(timestamps, sequence + np.arange(count), packets)
+            previous = start
+            written += count
+    if writer is not None:
+        writer.close()
+    return written
@@ -0,0 +1,31 @@
+# Python (CPython) version
+# The tick functions of micropython's utime, for running RaspberryPico/Lib on a
+# Raspberry Pi. Ticks wrap around at 2**30 as on the Pico, so the library code
+# using ticks_diff and ticks_add behaves the same.
+
+import time
+
+TICKS_PERIOD = 1 << 30
+TICKS_HALF   = TICKS_PERIOD >> 1
+
+
+def ticks_us() -> int:
+    return time.perf_counter_ns() // 1000 % TICKS_PERIOD
+
+def ticks_ms() -> int:
+    return time.perf_counter_ns() // 1000000 % TICKS_PERIOD
+
+def ticks_diff(ticks1, ticks2) -> int:
+    return (ticks1 - ticks2 + TICKS_HALF) % TICKS_PERIOD - TICKS_HALF
+
+def ticks_add(ticks, delta) -> int:
+    return (ticks + delta) % TICKS_PERIOD
+
+def sleep_us(us):
+    time.sleep(us / 1000000)
+
+def sleep_ms(ms):
+    time.sleep(ms / 1000)
+
+def sleep(seconds):
+    time.sleep(seconds)
@@ -1,6 +1,7 @@
 # Micropython version
-# Create a MPU object with running dmp, extract quaternion data from dmp
-# packets and send this to a remote host over the network for display
+# Create a MPU object with running dmp, pack every dmp packet into binary
+# telemetry datagrams (see telemetry.py) and send these to a remote host
+# over the network for display
 # This requires a Pico W to send data over Wifi.
 # Ron Meiburg feb 2024
 
@@ -8,17 +9,10 @@ from machine import Pin, I2C
 import MPUregisters as MPUreg
 from bus import bus
 from MPU6050 import MPU6050_DMP
+from telemetry import telemetry_encoder
 from secrets import *
 import network
 import usocket
-import json
-import utime
-
-def two_bytes_to_int(d1,d2) -> int:
-    value = d1*256 + d2    
-    if value >= 0x8000:
-        value -= 65536
-    return value
 
 
 led         = Pin("LED", Pin.OUT)
@@ -72,31 +66,14 @@ if mpu.get_dmp_enabled():
 else:
     print("digital motion processor not enabled")
 
-dmp_packet_length = mpu.dmp_get_fifo_packet_size()
-
-
-scale = 16384.0
-
-
-while True:
-#for _ in range(100):
-    utime.sleep_ms(30)   # delay so not to overload the network
-    data = mpu.get_current_fifo_packet(dmp_packet_length)
-    b = [j for j in data]
-
-# Pull the quaternion components out of the dmp output
-# NB the components of b are actually already integers
+# Every sample at the full dmp rate, 8 samples per datagram
+encoder = telemetry_encoder(device_id=0, samples_per_datagram=8, period_us=mpu.get_sample_period_us())
 
-    q1 = (two_bytes_to_int(b[0], b[1]))/scale
-    q2 = (two_bytes_to_int(b[4], b[5]))/scale
-    q3 = (two_bytes_to_int(b[8], b[9]))/scale
-    q4 = (two_bytes_to_int(b[12], b[13]))/scale
-    data = {"q1" : q1,
-            "q2" : q2,
-            "q3" : q3,
-            "q4" : q4,
-        }
-    # pack up the data and send to server for display
-    json_data = json.dumps(data)
-    sock.write(json_data.encode('utf-8'))
+for sequence, timestamp, packet in mpu.iter_packets():
+    if packet is None:           # FIFO overflow: send what we have, the receiver sees the gap
+        datagram = encoder.flush()
+    else:
+        datagram = encoder.add(sequence, timestamp, packet)
+    if datagram is not None:
+        sock.write(datagram)
 
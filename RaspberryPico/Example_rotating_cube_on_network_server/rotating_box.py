@@ -6,34 +6,52 @@
 # Added socket communication to receive data from
 # an MPU elsewhere on the network.
 # Ron Meiburg feb 2024
+#
+# Datagrams are received in a separate thread that keeps only the newest
+# orientation, while the cube is drawn at a fixed frame rate. ArrayCube
+# draws the cube with numpy instead of a fresh set of euclid objects per frame.
 
 
-import json
+import os
 from random import random
 from socket import socket, gethostbyname, AF_INET, SOCK_DGRAM, SOCK_STREAM
 import sys
-from time import sleep
+import threading
+from time import sleep, perf_counter
 from scipy.spatial.transform import Rotation
+import numpy as np
 import pygame
 import pygame.draw
 import pygame.time
 from math import sin, cos, acos
 from euclid import *
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Lib'))
+import telemetry
+
 PORT_NUMBER = 5000
 SIZE = 1024
-
-hostName = gethostbyname( '0.0.0.0' )
-
-mySocket = socket( AF_INET, SOCK_DGRAM ) # choose UDP
-mySocket.bind( (hostName, PORT_NUMBER) )
+FRAME_RATE = 60
+REPORT_INTERVAL = 5.0    # seconds between latency reports
 
 class Screen (object):
+    # projection (2x3) and depth (3) as matrices, for use on arrays of points
+    projection = np.array([[1.0, 0.0, 0.0],
+                           [0.0, 1.0, 0.0]])
+    depth_axis = np.array([0.0, 0.0, 1.0])
+
     def __init__(self,x=320,y=280,scale=1):
         self.i = pygame.display.set_mode((x,y))
         self.originx = self.i.get_width() / 2
         self.originy = self.i.get_height() / 2
         self.scale = scale
+        self.origin_xy = np.array([self.originx, self.originy])
+
+    def project_array(self,pts):
+        """ (N,3) points to (N,2) screen coordinates """
+        return pts @ (self.projection.T * self.scale) + self.origin_xy
+    def depth_array(self,pts):
+        return pts @ self.depth_axis
 
     def project(self,v):
         assert isinstance(v,Vector3)
@@ -47,6 +65,9 @@ class Screen (object):
 class PrespectiveScreen(Screen):
     # the xy projection and depth functions are really an orthonormal space
     # but here i just approximated it with decimals to keep it quick n dirty
+    projection = np.array([[0.957, 0.0, 0.287],
+                           [0.0, 0.957, 0.287]])
+    depth_axis = np.array([-0.276, -0.276, 0.9205])
     def project(self,v):
         assert isinstance(v,Vector3)
         x = ((v.x*0.957) + (v.z*0.287)) * self.scale + self.originx
@@ -182,27 +203,160 @@ class Cube (object):
         R = q.get_matrix()
         self.pts = [R*p for p in self.pts]
 
+def rotation_matrix(q):
+    """ 3x3 rotation matrix of a unit quaternion (w,x,y,z) """
+    w, x, y, z = q
+    return np.array([[1-2*(y*y+z*z), 2*(x*y-w*z),   2*(x*z+w*y)],
+                     [2*(x*y+w*z),   1-2*(x*x+z*z), 2*(y*z-w*x)],
+                     [2*(x*z-w*y),   2*(y*z+w*x),   1-2*(x*x+y*y)]])
+
+class ArrayCube (object):
+    """ Cube with the vertices in a numpy array and the topology of sides and
+        edges as static index lists: a frame is one matmul for the rotation,
+        one for the projection and one argsort on depth, all for 8 vertices.
+        Draws the same image as Cube.
+    """
+    # vertex order and topology as in Cube
+    side_index = [[0,1,2,3], [4,5,6,7], [0,4,5,1], [1,5,6,2], [2,6,7,3], [3,7,4,0]]
+    side_colors = [(255,0,0), (0,255,0), (0,0,255), (255,255,0), (0,255,255), (255,0,255)]
+    edge_index = [[0,1], [1,2], [2,3], [3,0], [4,5], [5,6], [6,7], [7,4],
+                  [0,4], [1,5], [2,6], [3,7]]
+    edge_color = (0,0,255)
+
+    def __init__(self,a=10,b=10,c=10):
+        self.origin_pts = np.array([[-a,b,c], [a,b,c], [a,-b,c], [-a,-b,c],
+                                    [-a,b,-c], [a,b,-c], [a,-b,-c], [-a,-b,-c]], dtype=float)
+        # centroids are linear in the vertices, so they rotate along: (18,8) averaging matrix
+        averaging = np.zeros((len(self.side_index) + len(self.edge_index), 8))
+        for row, index in enumerate(self.side_index + self.edge_index):
+            averaging[row, index] = 1.0 / len(index)
+        self.averaging = averaging
+        self.last = None      # bounding box of the last frame drawn, for erase
+
+    def draw(self,screen,q=(1.0,0.0,0.0,0.0)):
+        """ draw object at given rotation (w,x,y,z) """
+        pts = self.origin_pts @ rotation_matrix(q).T
+        order = np.argsort(screen.depth_array(self.averaging @ pts), kind='stable')
+        projected = screen.project_array(pts)
+        low = np.floor(projected.min(axis=0)) - 1
+        self.last = pygame.Rect(low.tolist(), (np.ceil(projected.max(axis=0)) + 2 - low).tolist())
+        self.draw_projected(screen, projected.tolist(), order.tolist())
+
+    def draw_projected(self,screen,xy,order):
+        nsides = len(self.side_index)
+        for k in order:
+            if k < nsides:
+                pygame.draw.polygon(screen.i, self.side_colors[k], [xy[i] for i in self.side_index[k]])
+            else:
+                a, b = self.edge_index[k - nsides]
+                pygame.draw.line(screen.i, self.edge_color, xy[a], xy[b])
+
+    def erase(self,screen,clear_color = (0,0,0)):
+        """ erase object at present rotation: one fill of the box around the last one drawn """
+        if self.last is not None:
+            screen.i.fill(clear_color, self.last)
+
+class Receiver (threading.Thread):
+    """ Drains the socket continuously and keeps only the newest orientation.
+        Sender clocks are not synchronised with ours, so latency is measured
+        against the fastest transit seen: (arrival - sender timestamp) minus
+        its minimum over the run.
+    """
+    def __init__(self,sock):
+        super().__init__(daemon=True)
+        self.sock = sock
+        self.lock = threading.Lock()
+        self.tracker = telemetry.sequence_tracker()
+        self.quaternion = None
+        self.sample_timestamp = None   # sender timestamp of the newest sample
+        self.new = False
+        self.superseded = 0            # orientations replaced before they were drawn
+        self.rejected = 0              # datagrams that did not decode, truncated or corrupt
+        self.min_offset = None
+
+    def offset(self,timestamp,host_us):
+        return (host_us - timestamp) % telemetry.TICKS_PERIOD
+
+    def excess(self,offset):
+        """ offset - min_offset, taking the wrap around of sender timestamps into account """
+        d = (offset - self.min_offset) % telemetry.TICKS_PERIOD
+        return d - telemetry.TICKS_PERIOD if d > telemetry.TICKS_PERIOD // 2 else d
+
+    def run(self):
+        while True:
+            bytestring,_ = self.sock.recvfrom(SIZE)
+            arrival = int(perf_counter()*1e6)
+            try:
+                device_id, sequence, timestamp, period, samples = telemetry.decode(bytestring)
+            except Exception:
+                samples = None
+            if not samples:
+                self.rejected += 1
+                continue
+            newest = (timestamp + (len(samples)-1)*period) % telemetry.TICKS_PERIOD
+            offset = self.offset(newest,arrival)
+            with self.lock:
+                if not self.tracker.update(device_id, sequence, len(samples)):
+                    continue                  # older than what we have already
+                if self.min_offset is None or self.excess(offset) < 0:
+                    self.min_offset = offset
+                if self.new:
+                    self.superseded += 1
+                self.quaternion = [c/telemetry.QUATERNION_SCALE for c in samples[-1][0:4]]
+                self.sample_timestamp = newest
+                self.new = True
+
+    def newest(self):
+        """ (quaternion, sender timestamp) when a new orientation arrived since the last call """
+        with self.lock:
+            if not self.new:
+                return None
+            self.new = False
+            return self.quaternion, self.sample_timestamp
+
+    def latency_us(self,timestamp,host_us):
+        with self.lock:
+            return self.excess(self.offset(timestamp,host_us))
+
 if __name__ == "__main__":
-    labels = ("q1", "q2", "q3", "q4")
+    hostName = gethostbyname( '0.0.0.0' )
+
+    mySocket = socket( AF_INET, SOCK_DGRAM ) # choose UDP
+    mySocket.bind( (hostName, PORT_NUMBER) )
+
     pygame.init()
     screen = Screen(480,400,scale=1.5)
-    cube = Cube(40,30,60)
+    cube = ArrayCube(40,30,60)
     q = Quaternion(1,0,0,0)
     incr = Quaternion(0.96,0.01,0.01,0).normalized()
+    receiver = Receiver(mySocket)
+    receiver.start()
+    clock = pygame.time.Clock()
+    latencies = []
+    next_report = perf_counter() + REPORT_INTERVAL
     
     while True:
-        bytestring,_ = mySocket.recvfrom(SIZE)
-        data_json = json.loads(bytestring.decode('utf-8'))
-        q = []
-        for i in range(4):
-            q.append(data_json[labels[i]])
-#                         q.append(data_json[labels[i]][0])
-        quat = Quaternion(q[0],q[1],q[2],q[3]).normalized()
-        cube.draw(screen,quat)
+        clock.tick(FRAME_RATE)
         event = pygame.event.poll()
         if event.type == pygame.QUIT \
             or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
             break
-        pygame.display.flip()
+        newest = receiver.newest()
+        if newest is None:
+            continue                  # nothing new, keep the last frame on screen
+        q, timestamp = newest
+        norm = sum(c*c for c in q) ** 0.5
+        if norm == 0:
+            continue                  # corrupt sample, not a rotation
         cube.erase(screen)
+        cube.draw(screen,[c/norm for c in q])
+        pygame.display.flip()
+        latencies.append(receiver.latency_us(timestamp, int(perf_counter()*1e6)))
+        if perf_counter() > next_report:
+            tracker = receiver.tracker
+            print(f"latency avg {sum(latencies)/len(latencies)/1000:6.1f} ms  max {max(latencies)/1000:6.1f} ms"
+                  f" (above fastest transit)  received {tracker.received}  lost {tracker.lost}"
+                  f"  out of order {tracker.out_of_order}  not drawn {receiver.superseded}  rejected {receiver.rejected}")
+            latencies = []
+            next_report += REPORT_INTERVAL
 
@@ -0,0 +1,259 @@
+# Python (CPython) version
+# Relay for telemetry datagrams (see Lib/telemetry.py): the Pico sends its
+# datagrams once, to the relay, and the relay passes them on to any number of
+# subscribers on the network.
+#
+# Subscribing
+#   UDP  send "SUB" or "SUB <rate>" to the control port; datagrams are sent
+#        back to the address the request came from, "UNSUB" ends it.
+#        Subscriptions time out unless renewed every SUBSCRIPTION_TIMEOUT seconds.
+#   TCP  connect to the stream port and send a line "SUB" or "SUB <rate>".
+#        Every datagram is sent prefixed with its length as 2 byte big endian,
+#        read them with recv_framed().
+# rate is the maximum number of datagrams per second per device, 0 (the
+# default) forwards everything. Skipped datagrams show up as lost samples in
+# telemetry.sequence_tracker on the subscriber side.
+#
+# Every subscriber has its own sender thread and a bounded queue. When a
+# subscriber falls behind the oldest datagrams in its queue are dropped, the
+# thread receiving from the Pico never waits for a subscriber.
+# Ron Meiburg 18-oct-2026
+
+import argparse
+from collections import deque
+import os
+from socket import socket, AF_INET, SOCK_DGRAM, SOCK_STREAM, IPPROTO_TCP, TCP_NODELAY, SOL_SOCKET, SO_REUSEADDR
+import struct
+import sys
+import threading
+from time import perf_counter, sleep
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Lib'))
+import telemetry
+
+INGEST_PORT  = 5000      # the Pico sends here, as for rotating_box.py
+CONTROL_PORT = 5001      # UDP subscriptions
+STREAM_PORT  = 5002      # TCP subscriptions
+SIZE = 1024
+QUEUE_SIZE = 64          # datagrams per subscriber
+SUBSCRIPTION_TIMEOUT = 30.0
+REPORT_INTERVAL = 5.0
+FRAME = '>H'
+
+
+def recv_exactly(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return bytes(data)
+
+def recv_framed(sock):
+    """ Next datagram from a TCP subscription, None when the relay closed the connection """
+    header = recv_exactly(sock, struct.calcsize(FRAME))
+    if header is None:
+        return None
+    return recv_exactly(sock, struct.unpack(FRAME, header)[0])
+
+def parse_subscription(request):
+    """ rate of a "SUB [rate]" request, None when it is not one """
+    words = request.split()
+    if not words or words[0] != b'SUB' or len(words) > 2:
+        return None
+    try:
+        rate = float(words[1]) if len(words) == 2 else 0.0
+    except ValueError:
+        return None
+    return rate if rate >= 0 else None
+
+
+class Subscriber (threading.Thread):
+    """ Queue and sender thread of one subscriber. send is called with every datagram
+        in the sender thread; when it raises OSError the subscription ends.
+    """
+    def __init__(self,name,send,rate=0.0,queue_size=QUEUE_SIZE,on_close=None):
+        super().__init__(daemon=True, name=name)
+        self.send = send
+        self.interval = 1.0/rate if rate else 0.0
+        self.on_close = on_close
+        self.due = {}                  # device id: earliest time the next datagram is forwarded
+        self.queue = deque(maxlen=queue_size)
+        self.ready = threading.Condition()
+        self.closed = False
+        self.last_seen = perf_counter()
+        self.sent = 0
+        self.skipped = 0               # left out by the rate limit
+        self.dropped = 0               # pushed out of the queue by newer datagrams
+
+    def offer(self,datagram,device_id,now):
+        """ Called by the ingesting thread, never blocks """
+        if self.interval:
+            due = self.due.get(device_id, now)
+            if now < due:
+                self.skipped += 1
+                return
+            # keep the average rate, but do not catch up after a quiet spell
+            self.due[device_id] = (due if now - due < self.interval else now) + self.interval
+        with self.ready:
+            if len(self.queue) == self.queue.maxlen:
+                self.dropped += 1
+            self.queue.append(datagram)
+            self.ready.notify()
+
+    def close(self):
+        with self.ready:
+            self.closed = True
+            self.ready.notify()
+
+    def run(self):
+        while True:
+            with self.ready:
+                while not self.queue and not self.closed:
+                    self.ready.wait()
+                if self.closed:
+                    break
+                datagram = self.queue.popleft()
+            try:
+                self.send(datagram)
+            except OSError:
+                break
+            self.sent += 1
+        self.closed = True
+        if self.on_close is not None:
+            self.on_close(self)
+
+
+class Relay (object):
+    """ Receives telemetry datagrams on ingest_port and fans them out to the subscribers.
+        Ports given as 0 are picked by the OS, see self.ports.
+    """
+    def __init__(self,host='0.0.0.0',ingest_port=INGEST_PORT,control_port=CONTROL_PORT,
+                 stream_port=STREAM_PORT,queue_size=QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.ingest = socket(AF_INET, SOCK_DGRAM)
+        self.ingest.bind((host, ingest_port))
+        self.control = socket(AF_INET, SOCK_DGRAM)
+        self.control.bind((host, control_port))
+        self.listener = socket(AF_INET, SOCK_STREAM)
+        self.listener.setsockopt(SOL_SOCKET, SO_REUSEADDR, 1)
+        self.listener.bind((host, stream_port))
+        self.listener.listen()
+        self.ports = (self.ingest.getsockname()[1], self.control.getsockname()[1],
+                      self.listener.getsockname()[1])
+        self.lock = threading.Lock()
+        self.subscribers = ()          # replaced as a whole, so ingestion reads it without the lock
+        self.udp_subscribers = {}      # address: Subscriber
+        self.received = 0
+        self.rejected = 0              # not telemetry datagrams
+
+    def start(self):
+        for target in (self.run_ingest, self.run_control, self.run_listener):
+            threading.Thread(target=target, daemon=True).start()
+
+    def add(self,subscriber):
+        with self.lock:
+            self.subscribers = self.subscribers + (subscriber,)
+        subscriber.start()
+
+    def remove(self,subscriber):
+        with self.lock:
+            self.subscribers = tuple(s for s in self.subscribers if s is not subscriber)
+            for address, s in list(self.udp_subscribers.items()):
+                if s is subscriber:
+                    del self.udp_subscribers[address]
+        subscriber.close()
+
+    def run_ingest(self):
+        buffer = bytearray(SIZE)
+        while True:
+            n = self.ingest.recv_into(buffer)
+            if n < telemetry.HEADER_SIZE or buffer[0:2] != telemetry.MAGIC:
+                self.rejected += 1
+                continue
+            datagram = bytes(buffer[:n])       # one immutable copy, shared by all queues
+            device_id = buffer[3]
+            now = perf_counter()
+            self.received += 1
+            for subscriber in self.subscribers:
+                subscriber.offer(datagram, device_id, now)
+
+    def run_control(self):
+        while True:
+            request, address = self.control.recvfrom(SIZE)
+            subscriber = self.udp_subscribers.get(address)
+            if request.strip() == b'UNSUB':
+                if subscriber is not None:
+                    self.remove(subscriber)
+                continue
+            rate = parse_subscription(request)
+            if rate is None:
+                continue
+            if subscriber is not None and subscriber.interval == (1.0/rate if rate else 0.0):
+                subscriber.last_seen = perf_counter()      # renewal
+                continue
+            if subscriber is not None:
+                self.remove(subscriber)
+            subscriber = Subscriber(f"udp {address[0]}:{address[1]}",
+                                    lambda datagram, address=address: self.control.sendto(datagram, address),
+                                    rate, self.queue_size, self.remove)
+            with self.lock:
+                self.udp_subscribers[address] = subscriber
+            self.add(subscriber)
+
+    def run_listener(self):
+        while True:
+            connection, address = self.listener.accept()
+            threading.Thread(target=self.subscribe_stream, args=(connection, address), daemon=True).start()
+
+    def subscribe_stream(self,connection,address):
+        connection.settimeout(5.0)
+        request = b''
+        try:
+            while b'\n' not in request and len(request) < 64:
+                chunk = connection.recv(64)
+                if not chunk:
+                    break
+                request += chunk
+        except OSError:
+            pass
+        rate = parse_subscription(request.split(b'\n')[0])
+        if rate is None:
+            connection.close()
+            return
+        connection.settimeout(None)
+        connection.setsockopt(IPPROTO_TCP, TCP_NODELAY, 1)
+        def send(datagram):
+            connection.sendall(struct.pack(FRAME, len(datagram)) + datagram)
+        def on_close(subscriber):
+            self.remove(subscriber)
+            connection.close()
+        self.add(Subscriber(f"tcp {address[0]}:{address[1]}", send, rate, self.queue_size, on_close))
+
+    def expire(self,timeout=SUBSCRIPTION_TIMEOUT):
+        """ End UDP subscriptions that were not renewed in time """
+        now = perf_counter()
+        for subscriber in list(self.udp_subscribers.values()):
+            if now - subscriber.last_seen > timeout:
+                self.remove(subscriber)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Relay telemetry datagrams from the Pico to many subscribers')
+    parser.add_argument('--ingest-port', type=int, default=INGEST_PORT)
+    parser.add_argument('--control-port', type=int, default=CONTROL_PORT)
+    parser.add_argument('--stream-port', type=int, default=STREAM_PORT)
+    parser.add_argument('--queue-size', type=int, default=QUEUE_SIZE)
+    args = parser.parse_args()
+
+    relay = Relay('0.0.0.0', args.ingest_port, args.control_port, args.stream_port, args.queue_size)
+    relay.start()
+    print(f"ingest on UDP {relay.ports[0]}, subscriptions on UDP {relay.ports[1]} and TCP {relay.ports[2]}")
+    while True:
+        sleep(REPORT_INTERVAL)
+        relay.expire()
+        print(f"received {relay.received}  rejected {relay.rejected}")
+        for subscriber in relay.subscribers:
+            print(f"  {subscriber.name:28s} sent {subscriber.sent:8d}  skipped {subscriber.skipped:8d}"
+                  f"  dropped {subscriber.dropped:8d}")
@@ -1,6 +1,8 @@
-from machine import Pin, I2C
+from machine import Pin, I2C, idle
 import MPUregisters as MPUreg
 from bus import bus
+from fifo import fifo_reader, FIFO_SIZE
+import struct
 import utime
 #
 # Version 1.4 26-feb-2024
@@ -25,236 +27,341 @@ def two_bytes_to_int(d1,d2) -> int:
         d -= 65536
     return d
 
+def keep_reserved_bit(buffer, index, offset) -> None:
+    ''' Put a 16 bit accel offset at buffer[index], keeping bit 0 of the low byte already there:
+        it is reserved in the accel offset registers
+    '''
+    buffer[index] = (offset >> 8) & 0xFF
+    buffer[index + 1] = (offset & 0xFE) | (buffer[index + 1] & 0x01)
+
+try:
+    from binascii import crc32
+except ImportError:          # not every micropython port has binascii.crc32
+    def crc32(data, crc=0) -> int:
+        crc ^= 0xFFFFFFFF
+        for byte in data:
+            crc ^= byte
+            for _ in range(8):
+                crc = (crc >> 1) ^ (0xEDB88320 if crc & 1 else 0)
+        return crc ^ 0xFFFFFFFF
+
  
 
 class MPU6050():
    
-    def __init__(self, bus):
+    def __init__(self, bus, address=MPUADDR):
         
         self.bus = bus
+        self.address = address               # 0x68, or 0x69 with AD0 pulled high
+        self.motion_buffer = bytearray(14)   # ACCEL_XOUT_H .. GYRO_ZOUT_L, reused by get_motion6/7
+        self.fifo_count_buffer = bytearray(2)
+        self.int_status_buffer = bytearray(1)
+        self.offset_buffer = bytearray(8)    # offset registers, read through the views below
+        self.offset_word = memoryview(self.offset_buffer)[0:2]
+        self.offset_block = memoryview(self.offset_buffer)[0:6]
 #
         self.start_time_us = utime.ticks_us()
         self.start_time_ms = utime.ticks_ms()
-        self.bus.writeto_mem(MPUADDR, MPUreg.RESET, b'\0')  # initialize MPU
+        self.bus.writeto_mem(self.address, MPUreg.RESET, b'\0')  # initialize MPU
         self.set_full_scale_gyro_range(MPUreg.GYRO_FS_250)
         self.set_full_scale_accel_range(MPUreg.ACCEL_FS_2)
         self.set_clock_source(MPUreg.CLOCK_PLL_XGYRO)    # This is doubled up in the MPU6050dmp class
         self.set_sleep_enabled(False)
+        # MPU6050s (WHO_AM_I 0x34 in bits 6:1) have their accel offsets at 0x06..0x0B, the
+        # MPU6500 family at 0x77, 0x7A and 0x7D. Read once, not for every offset access.
+        self.device_id = self.get_device_id()
+        self.accel_offsets_contiguous = self.device_id < 0x38
 #
 # I2C bus related routines
 #
     def reset_i2c_master(self): 
-        self.bus.write_bit(MPUADDR, MPUreg.USER_CTRL, MPUreg.USERCTRL_I2C_MST_RESET_BIT, True)
+        self.bus.write_bit(self.address, MPUreg.USER_CTRL, MPUreg.USERCTRL_I2C_MST_RESET_BIT, True)
         
     def set_i2c_master_mode_enabled(self, enabled):
-        self.bus.write_bit(MPUADDR, MPUreg.USER_CTRL, MPUreg.USERCTRL_I2C_MST_EN_BIT,enabled)
+        self.bus.write_bit(self.address, MPUreg.USER_CTRL, MPUreg.USERCTRL_I2C_MST_EN_BIT,enabled)
         
     def set_slave_address(self, num, address):
         if (num > 3): return
         register = MPUreg.I2C_SLV0_ADDR + num*3
         print(address, type(address))
-        self.bus.writeto_mem(MPUADDR, register, address)
+        self.bus.writeto_mem(self.address, register, address)
 #
 # MPU control routines
 #
     def set_clock_source(self, source):
-        self.bus.write_bits(MPUADDR, MPUreg.PWR_MGMT_1, MPUreg.PWR1_CLKSEL_BIT, MPUreg.PWR1_CLKSEL_LENGTH, source)
+        self.bus.write_bits(self.address, MPUreg.PWR_MGMT_1, MPUreg.PWR1_CLKSEL_BIT, MPUreg.PWR1_CLKSEL_LENGTH, source)
     
     def set_sleep_enabled(self, enabled):
-        self.bus.write_bit(MPUADDR, MPUreg.PWR_MGMT_1, MPUreg.PWR1_SLEEP_BIT, enabled)
+        self.bus.write_bit(self.address, MPUreg.PWR_MGMT_1, MPUreg.PWR1_SLEEP_BIT, enabled)
          
     def set_wake_cycle_enabled(self, enabled):
-        self.bus.write_bit(MPUADDR, MPUreg.PWR_MGMT_1, MPUreg.PWR1_CYCLE_BIT, enabled)
+        self.bus.write_bit(self.address, MPUreg.PWR_MGMT_1, MPUreg.PWR1_CYCLE_BIT, enabled)
 
     def get_device_id(self) -> int:
-        buffer = self.bus.read_bits(MPUADDR, MPUreg.WHO_AM_I, MPUreg.WHO_AM_I_BIT, MPUreg.WHO_AM_I_LENGTH)
+        buffer = self.bus.read_bits(self.address, MPUreg.WHO_AM_I, MPUreg.WHO_AM_I_BIT, MPUreg.WHO_AM_I_LENGTH)
         return buffer    
             
     def who_am_i(self) -> int:
-        return to_int(self.bus.readfrom_mem(MPUADDR, 0x75, 1))
+        return to_int(self.bus.readfrom_mem(self.address, 0x75, 1))
 
     def get_OTP_bank_valid(self):
-        buffer = self.bus.read_bit(MPUADDR, MPUreg.XG_OFFS_TC, MPUreg.TC_OTP_BNK_VLD_BIT) #CHECK return type
+        buffer = self.bus.read_bit(self.address, MPUreg.XG_OFFS_TC, MPUreg.TC_OTP_BNK_VLD_BIT) #CHECK return type
         return buffer
     
     def set_OTP_bank_valid(self, enabled):
-        self.bus.write_bit(MPUADDR, MPUreg.XG_OFFS_TC, MPUreg.OTP_BNK_VLD_BIT, enabled)
+        self.bus.write_bit(self.address, MPUreg.XG_OFFS_TC, MPUreg.OTP_BNK_VLD_BIT, enabled)
 
     def set_rate(self, rate):
-        self.bus.writeto_mem(MPUADDR, MPUreg.SMPLRT_DIV, rate)
+        self.bus.writeto_mem(self.address, MPUreg.SMPLRT_DIV, rate)
         
     def set_external_frame_sync(self, sync):
-        self.bus.write_bits(MPUADDR, MPUreg.CONFIG, MPUreg.CFG_EXT_SYNC_SET_BIT, MPUreg.CFG_EXT_SYNC_SET_LENGTH, sync)
+        self.bus.write_bits(self.address, MPUreg.CONFIG, MPUreg.CFG_EXT_SYNC_SET_BIT, MPUreg.CFG_EXT_SYNC_SET_LENGTH, sync)
 
     def set_int_enabled(self, enabled):
         b = to_byte(int(enabled))
-        self.bus.writeto_mem(MPUADDR, MPUreg.INT_ENABLE, b)
+        self.bus.writeto_mem(self.address, MPUreg.INT_ENABLE, b)
         
     def reset_dmp(self):
-        self.bus.write_bit(MPUADDR, MPUreg.USER_CTRL, MPUreg.USERCTRL_DMP_RESET_BIT, True)
+        self.bus.write_bit(self.address, MPUreg.USER_CTRL, MPUreg.USERCTRL_DMP_RESET_BIT, True)
         
     def reset_fifo(self):
-        self.bus.write_bit(MPUADDR, MPUreg.USER_CTRL, MPUreg.USERCTRL_FIFO_RESET_BIT, True)
+        self.bus.write_bit(self.address, MPUreg.USER_CTRL, MPUreg.USERCTRL_FIFO_RESET_BIT, True)
         
     def set_int_data_ready_enabled(self):
-        self.bus.write_bit(MPUADDR, MPUreg.INT_ENABLE, MPUreg.INTERRUPT_DATA_RDY_BIT, True)
+        self.bus.write_bit(self.address, MPUreg.INT_ENABLE, MPUreg.INTERRUPT_DATA_RDY_BIT, True)
         
     def get_int_data_ready_enabled(self):
-        return self.bus.read_bit(MPUADDR, MPUreg.INT_ENABLE, MPUreg.INTERRUPT_DATA_RDY_BIT)
+        return self.bus.read_bit(self.address, MPUreg.INT_ENABLE, MPUreg.INTERRUPT_DATA_RDY_BIT)
     
     def get_int_data_ready_status(self):
-        return self.bus.read_bit(MPUADDR, MPUreg.INT_STATUS, MPUreg.INTERRUPT_DATA_RDY_BIT)
+        return self.bus.read_bit(self.address, MPUreg.INT_STATUS, MPUreg.INTERRUPT_DATA_RDY_BIT)
+
+    def get_int_fifo_overflow_status(self):
+        return self.bus.read_bit(self.address, MPUreg.INT_STATUS, MPUreg.INTERRUPT_FIFO_OFLOW_BIT)
+
+    def get_int_status(self) -> int:
+        ''' All of INT_STATUS in one read, without allocating. Reading clears the status bits '''
+        self.bus.readfrom_mem_into(self.address, MPUreg.INT_STATUS, self.int_status_buffer)
+        return self.int_status_buffer[0]
 #
 # Data processing and motion detection
 #        
     def get_motion_detection_threshold(self) -> bytes:
-        return self.bus.readfrom_mem(MPUADDR, MPUreg.MOT_THR, 1)
+        return self.bus.readfrom_mem(self.address, MPUreg.MOT_THR, 1)
     
     def set_motion_detection_threshold(self, threshold):
-        self.bus.writeto_mem(MPUADDR, MPUreg.MOT_THR, threshold)
+        self.bus.writeto_mem(self.address, MPUreg.MOT_THR, threshold)
         
     def get_motion_detection_duration(self) -> bytes:
-        return self.bus.readfrom_mem(MPUADDR, MPUreg.MOT_DUR, 1)
+        return self.bus.readfrom_mem(self.address, MPUreg.MOT_DUR, 1)
 
     def set_motion_detection_duration(self, time):
-        self.bus.writeto_mem(MPUADDR, MPUreg.MOT_DUR, time)
+        self.bus.writeto_mem(self.address, MPUreg.MOT_DUR, time)
         
     def get_zero_motion_detection_threshold(self) -> bytes:
-        return self.bus.readfrom_mem(MPUADDR, MPUreg.ZRMOT_THR, 1)
+        return self.bus.readfrom_mem(self.address, MPUreg.ZRMOT_THR, 1)
         
     def set_zero_motion_detection_threshold(self, threshold):
-        self.bus.writeto_mem(MPUADDR, MPUreg.ZRMOT_THR, threshold)
+        self.bus.writeto_mem(self.address, MPUreg.ZRMOT_THR, threshold)
         
     def get_zero_motion_detection_duration(self) -> bytes:
-        return self.bus.readfrom_mem(MPUADDR, MPUreg.ZRMOT_DUR, 1)
+        return self.bus.readfrom_mem(self.address, MPUreg.ZRMOT_DUR, 1)
         
     def set_zero_motion_detection_duration(self, time):
-        self.bus.writeto_mem(MPUADDR, MPUreg.ZRMOT_DUR, time)
+        self.bus.writeto_mem(self.address, MPUreg.ZRMOT_DUR, time)
         
     def get_int_zero_motion_enabled(self) -> int:
-        b = self.bus.read_bit(MPUADDR, MPUreg.INT_ENABLE, MPUreg.INTERRUPT_ZMOT_BIT)
+        b = self.bus.read_bit(self.address, MPUreg.INT_ENABLE, MPUreg.INTERRUPT_ZMOT_BIT)
         return b
     
     def set_int_zero_motion_enabled(self, enabled):
-        self.bus.write_bit(MPUADDR, MPUreg.INT_ENABLE, MPUreg.INTERRUPT_ZMOT_BIT,enabled)
+        self.bus.write_bit(self.address, MPUreg.INT_ENABLE, MPUreg.INTERRUPT_ZMOT_BIT,enabled)
         
     def get_int_motion_enabled(self) -> int:
-        b = self.bus.read_bit(MPUADDR, MPUreg.INT_ENABLE, MPUreg.INTERRUPT_MOT_BIT)
+        b = self.bus.read_bit(self.address, MPUreg.INT_ENABLE, MPUreg.INTERRUPT_MOT_BIT)
         return b
     
     def set_int_motion_enabled(self, enabled):
-        self.bus.write_bit(MPUADDR, MPUreg.INT_ENABLE, MPUreg.INTERRUPT_MOT_BIT,enabled)
+        self.bus.write_bit(self.address, MPUreg.INT_ENABLE, MPUreg.INTERRUPT_MOT_BIT,enabled)
         
     def set_motion_detection_counter_decrement(self, decrement):
-        self.bus.write_bits(MPUADDR, MPUreg.MOT_DETECT_CTRL, MPUreg.DETECT_MOT_COUNT_BIT, MPUreg.DETECT_MOT_COUNT_LENTH,decrement)
+        self.bus.write_bits(self.address, MPUreg.MOT_DETECT_CTRL, MPUreg.DETECT_MOT_COUNT_BIT, MPUreg.DETECT_MOT_COUNT_LENTH,decrement)
         
     def get_motion_detection_counter_decrement(self) -> int:
-        return self.bus.read_bits(MPUADDR, MPUreg.MOT_DETECT_CTRL, MPUreg.DETECT_MOT_COUNT_BIT, MPUreg.DETECT_MOT_COUNT_LENTH)
+        return self.bus.read_bits(self.address, MPUreg.MOT_DETECT_CTRL, MPUreg.DETECT_MOT_COUNT_BIT, MPUreg.DETECT_MOT_COUNT_LENTH)
 
     def get_DLPF_mode(self) -> int:
-        return self.bus.read_bits(MPUADDR, MPUreg.MOT_DETECT_CTRL, MPUreg.CONFIG, MPUreg.CFG_DLPF_CFG_BIT, MPUreg.CFG_DLPF_CFG_LENGTH) 
+        return self.bus.read_bits(self.address, MPUreg.CONFIG, MPUreg.CFG_DLPF_CFG_BIT, MPUreg.CFG_DLPF_CFG_LENGTH) 
     
     def set_DLPF_mode(self,mode):
-        self.bus.write_bits(MPUADDR, MPUreg.CONFIG, MPUreg.CFG_DLPF_CFG_BIT, MPUreg.CFG_DLPF_CFG_LENGTH, mode)
+        self.bus.write_bits(self.address, MPUreg.CONFIG, MPUreg.CFG_DLPF_CFG_BIT, MPUreg.CFG_DLPF_CFG_LENGTH, mode)
         
     def set_DHPF_mode(self, mode):
-        self.bus.write_bits(MPUADDR, MPUreg.ACCEL_CONFIG, MPUreg.ACONFIG_ACCEL_HPF_BIT, MPUreg.ACONFIG_ACCEL_HPF_LENGTH, mode)
+        self.bus.write_bits(self.address, MPUreg.ACCEL_CONFIG, MPUreg.ACONFIG_ACCEL_HPF_BIT, MPUreg.ACONFIG_ACCEL_HPF_LENGTH, mode)
         
     def get_DHPF_mode(self) -> int:
-        return self.bus.read_bits(MPUADDR, MPUreg.ACCEL_CONFIG, MPUreg.ACONFIG_ACCEL_HPF_BIT, MPUreg.ACONFIG_ACCEL_HPF_LENGTH)
+        return self.bus.read_bits(self.address, MPUreg.ACCEL_CONFIG, MPUreg.ACONFIG_ACCEL_HPF_BIT, MPUreg.ACONFIG_ACCEL_HPF_LENGTH)
     
     
     def set_rate(self, rate):
-        self.bus.writeto_mem(MPUADDR, MPUreg.SMPLRT_DIV, rate)
+        self.bus.writeto_mem(self.address, MPUreg.SMPLRT_DIV, rate)
+
+    def get_rate(self) -> int:
+        return self.bus.read_register(self.address, MPUreg.SMPLRT_DIV)
+
+    def get_sample_period_us(self) -> int:
+        ''' Sample Rate = Gyroscope Output Rate / (1 + SMPLRT_DIV), where the gyroscope
+            output rate is 8kHz with the DLPF disabled (mode 0 or 7) and 1kHz otherwise
+        '''
+        gyro_period_us = 125 if self.get_DLPF_mode() in (0, 7) else 1000
+        return gyro_period_us * (1 + self.get_rate())
+
+    def get_packet_timeout_ms(self, periods=4) -> int:
+        ''' Time to wait for the next sample before giving up: a few sample periods,
+            plus a millisecond for the resolution of utime.ticks_ms
+        '''
+        return (periods*self.get_sample_period_us() + 999) // 1000 + 1
 
 #
 # Sensor related functions
 #
     def get_full_scale_gyro_range(self) -> int:
-        return(self.bus.read_bits(MPUADDR,
+        return(self.bus.read_bits(self.address,
                                   MPUreg.GYRO_CONFIG,
                                   MPUreg.GCONFIG_FS_SEL_BIT,
                                   MPUreg.GCONFIG_FS_SEL_LENGTH))
     
     def set_full_scale_gyro_range(self, range):
-        self.bus.write_bits(MPUADDR,
+        self.bus.write_bits(self.address,
                             MPUreg.GYRO_CONFIG,
                             MPUreg.GCONFIG_FS_SEL_BIT,
                             MPUreg.GCONFIG_FS_SEL_LENGTH, range);
         
+    def get_full_scale_accel_range(self) -> int:
+        return(self.bus.read_bits(self.address,
+                                  MPUreg.ACCEL_CONFIG,
+                                  MPUreg.ACONFIG_AFS_SEL_BIT,
+                                  MPUreg.ACONFIG_AFS_SEL_LENGTH))
+
     def set_full_scale_accel_range(self, range):
-        self.bus.write_bits(MPUADDR,
+        self.bus.write_bits(self.address,
                             MPUreg.ACCEL_CONFIG,
                             MPUreg.ACONFIG_AFS_SEL_BIT,
                             MPUreg.ACONFIG_AFS_SEL_LENGTH, range);
           
     def get_acceleration(self):
-        b = self.bus.readfrom_mem(MPUADDR, MPUreg.ACCEL_XOUT_H, 6)
+        b = self.bus.readfrom_mem(self.address, MPUreg.ACCEL_XOUT_H, 6)
         return(two_bytes_to_int(b[0:1], b[1:2]), two_bytes_to_int(b[2:3], b[3:4]),two_bytes_to_int(b[4:5], b[5:6]))    
 
     def get_rotation(self):
-        b = self.bus.readfrom_mem(MPUADDR, MPUreg.GYRO_XOUT_H, 6)
+        b = self.bus.readfrom_mem(self.address, MPUreg.GYRO_XOUT_H, 6)
         return(two_bytes_to_int(b[0:1], b[1:2]), two_bytes_to_int(b[2:3], b[3:4]),two_bytes_to_int(b[4:5], b[5:6]))
         
     def get_temperature(self) -> float:
-        buffer = self.bus.readfrom_mem(MPUADDR, MPU6050_RA_TEMP_OUT_H, 2)
+        buffer = self.bus.readfrom_mem(self.address, MPUreg.TEMP_OUT_H, 2)
         return (two_bytes_to_int(buffer[0:1], buffer[1:2]))/340 + 36.53
+
+    def get_motion7(self):
+        ''' Raw (ax, ay, az, temperature, gx, gy, gz) from a single burst read of the
+            contiguous sensor block into a preallocated buffer.
+        '''
+        self.bus.readfrom_mem_into(self.address, MPUreg.ACCEL_XOUT_H, self.motion_buffer)
+        return struct.unpack_from('>7h', self.motion_buffer)
+
+    def get_motion6(self):
+        ax, ay, az, _, gx, gy, gz = self.get_motion7()
+        return (ax, ay, az, gx, gy, gz)
     
 #
 # Sensor offsets
 #
 
+    def accel_offset_register(self, axis) -> int:
+        if self.accel_offsets_contiguous:
+            return MPUreg.XA_OFFS_H + 2*axis
+        return MPUreg.XA_OFFSET_H_MPU6500 + 3*axis      # 0x77, 0x7A, 0x7D
+
+    def get_accel_offset(self, axis) -> int:
+        self.bus.readfrom_mem_into(self.address, self.accel_offset_register(axis), self.offset_word)
+        return struct.unpack_from('>h', self.offset_buffer)[0]
+
+    def set_accel_offset(self, axis, offset):
+        ''' Bit 0 of the low byte is reserved: the current value is read and kept '''
+        register = self.accel_offset_register(axis)
+        self.bus.readfrom_mem_into(self.address, register, self.offset_word)
+        keep_reserved_bit(self.offset_buffer, 0, offset)
+        self.bus.writeto_mem(self.address, register, self.offset_word)
+
     def get_xaccel_offset(self):
-        save_address = MPUreg.XA_OFFS_H if self.get_device_id() < 0x38 else 0x77   # why are we checking getDevice. According to docs w should get 0x34
-        buffer = self.bus.readfrom_mem(MPUADDR, save_address, 2)
-        return two_bytes_to_int(buffer[0:1], buffer[1:2])  #This is awkward python way to addres bytes in bytearray
+        return self.get_accel_offset(0)
 
     def set_xaccel_offset(self, offset):
-        save_address = MPUreg.XA_OFFS_H if self.get_device_id() < 0x38 else 0x77
-        self.bus.writeto_mem(MPUADDR, save_address, offset)
-        
+        self.set_accel_offset(0, offset)
+
     def get_yaccel_offset(self):
-        save_address = MPUreg.YA_OFFS_H if self.get_device_id() < 0x38 else 0x77   # why are we checking getDevice. According to docs w should get 0x34
-        buffer = self.bus.readfrom_mem(MPUADDR, save_address, 2)
-        return two_bytes_to_int(buffer[0:1], buffer[1:2])  #This is awkward python way to addres bytes in bytearray
+        return self.get_accel_offset(1)
 
     def set_yaccel_offset(self, offset):
-        save_address = MPUreg.YA_OFFS_H if self.get_device_id() < 0x38 else 0x77
-        self.bus.writeto_mem(MPUADDR, save_address, offset)
-        
+        self.set_accel_offset(1, offset)
+
     def get_zaccel_offset(self):
-        save_address = MPUreg.ZA_OFFS_H if self.get_device_id() < 0x38 else 0x77   # why are we checking getDevice. According to docs w should get 0x34
-        buffer = self.bus.readfrom_mem(MPUADDR, save_address, 2)
-        return two_bytes_to_int(buffer[0:1], buffer[1:2])  #This is awkward python way to addres bytes in bytearray
+        return self.get_accel_offset(2)
 
     def set_zaccel_offset(self, offset):
-        save_address = MPUreg.ZA_OFFS_H if self.get_device_id() < 0x38 else 0x77
-        self.bus.writeto_mem(MPUADDR, save_address, offset)      
+        self.set_accel_offset(2, offset)
 
     def get_xgyro_offset(self):
-        return self.bus.read_word(MPUADDR, MPUreg.XG_OFFS_USRH)
-    
+        return struct.unpack('>h', self.bus.readfrom_mem(self.address, MPUreg.XG_OFFS_USRH, 2))[0]
+
     def set_xgyro_offset(self, offset):
-        self.bus.write_word(MPUADDR, MPUreg.XG_OFFS_USRH, offset)   # translate write word to write buffer
-  
+        self.bus.writeto_mem(self.address, MPUreg.XG_OFFS_USRH, struct.pack('>h', offset))
+
     def get_ygyro_offset(self):
-        return self.bus.read_word(MPUADDR, MPUreg.YG_OFFS_USRH)
-    
+        return struct.unpack('>h', self.bus.readfrom_mem(self.address, MPUreg.YG_OFFS_USRH, 2))[0]
+
     def set_ygyro_offset(self, offset):
-        self.bus.write_word(MPUADDR, MPUreg.YG_OFFS_USRH, offset)   # translate write word to write buffer
-    
+        self.bus.writeto_mem(self.address, MPUreg.YG_OFFS_USRH, struct.pack('>h', offset))
+
     def get_zgyro_offset(self):
-        return self.bus.read_word(MPUADDR, MPUreg.ZG_OFFS_USRH)
-    
+        return struct.unpack('>h', self.bus.readfrom_mem(self.address, MPUreg.ZG_OFFS_USRH, 2))[0]
+
     def set_zgyro_offset(self, offset):
-        self.bus.write_word(MPUADDR, MPUreg.ZG_OFFS_USRH, offset)   # translate write word to write buffer
-        
-        
+        self.bus.writeto_mem(self.address, MPUreg.ZG_OFFS_USRH, struct.pack('>h', offset))
+
+    def get_offsets(self):
+        ''' (ax, ay, az, gx, gy, gz) offset registers, in one burst read per sensor '''
+        buffer = self.offset_buffer
+        if self.accel_offsets_contiguous:
+            self.bus.readfrom_mem_into(self.address, MPUreg.XA_OFFS_H, self.offset_block)
+            ax, ay, az = struct.unpack_from('>3h', buffer)
+        else:
+            self.bus.readfrom_mem_into(self.address, MPUreg.XA_OFFSET_H_MPU6500, buffer)
+            ax, ay, az = struct.unpack_from('>hxhxh', buffer)
+        self.bus.readfrom_mem_into(self.address, MPUreg.XG_OFFS_USRH, self.offset_block)
+        gx, gy, gz = struct.unpack_from('>3h', buffer)
+        return (ax, ay, az, gx, gy, gz)
+
+    def set_offsets(self, ax, ay, az, gx, gy, gz):
+        ''' Write all six offsets, as signed 16 bit values, in one burst write per sensor '''
+        for offset in (ax, ay, az, gx, gy, gz):
+            if not -32768 <= offset <= 32767:
+                raise Exception(f"offset {offset} out of range for a 16 bit register")
+        if self.accel_offsets_contiguous:
+            buffer = self.offset_buffer
+            self.bus.readfrom_mem_into(self.address, MPUreg.XA_OFFS_H, self.offset_block)
+            for axis, offset in enumerate((ax, ay, az)):
+                keep_reserved_bit(buffer, 2*axis, offset)
+            self.bus.writeto_mem(self.address, MPUreg.XA_OFFS_H, self.offset_block)
+        else:
+            for axis, offset in enumerate((ax, ay, az)):     # registers in between are not offsets
+                self.set_accel_offset(axis, offset)
+        self.bus.writeto_mem(self.address, MPUreg.XG_OFFS_USRH, struct.pack('>3h', gx, gy, gz))
+
     def get_accelerometer_power_on_delay(self) -> int:
-        return self.bus.read_bits(MPUADDR, MPUreg.MOT_DETECT_CTRL, MPUreg.DETECT_ACCEL_ON_DELAY_BIT, MPUreg.DETECT_ACCEL_ON_DELAY_LENGTH)
+        return self.bus.read_bits(self.address, MPUreg.MOT_DETECT_CTRL, MPUreg.DETECT_ACCEL_ON_DELAY_BIT, MPUreg.DETECT_ACCEL_ON_DELAY_LENGTH)
     
     def set_accelerometer_power_on_delay(self, delay):
-        self.bus.write_bits(MPUADDR, MPUreg.MOT_DETECT_CTRL, MPUreg.DETECT_ACCEL_ON_DELAY_BIT, MPUreg.DETECT_ACCEL_ON_DELAY_LENGTH, delay)
+        self.bus.write_bits(self.address, MPUreg.MOT_DETECT_CTRL, MPUreg.DETECT_ACCEL_ON_DELAY_BIT, MPUreg.DETECT_ACCEL_ON_DELAY_LENGTH, delay)
 
        
     # Memory related routines
@@ -267,103 +374,117 @@ class MPU6050():
         if (prefetchEnabled):
             bank_i |= 0x40
         bank = to_byte(bank_i)
-        self.bus.writeto_mem(MPUADDR, MPUreg.BANK_SEL, bank);
+        self.bus.writeto_mem(self.address, MPUreg.BANK_SEL, bank);
 
     #MEM_START_ADDR register
     
     def set_memory_start_address(self, address):
-        self.bus.writeto_mem(MPUADDR, MPUreg.MEM_START_ADDR, address);
+        self.bus.writeto_mem(self.address, MPUreg.MEM_START_ADDR, address);
         
-    def writeProgMemoryBlock(self,data, data_size, bank, address, verify):
+    def writeProgMemoryBlock(self,data, data_size, bank, address, verify, chunk_size=MPUreg.DMP_MEMORY_BANK_SIZE):
         
-        return self.writeMemoryBlock(data, data_size, bank, address, verify, False);
-
+        return self.writeMemoryBlock(data, data_size, bank, address, verify, False, chunk_size);
 
-    def writeMemoryBlock(self, data, data_size, bank, address, verify, useProgMem):
-        self.set_memory_bank(bank, False, False)
-        self.set_memory_start_address(address)
 
+    def writeMemoryBlock(self, data, data_size, bank, address, verify, useProgMem, chunk_size=MPUreg.DMP_MEMORY_BANK_SIZE):
+        ''' Write data to DMP memory in chunks of up to chunk_size bytes that never cross a bank
+            boundary. MEM_START_ADDR auto-increments with every byte written, so bank and start
+            address are only set when a new bank is entered. With verify the whole block is read
+            back afterwards and compared by CRC. Timing is kept in self.upload_timing.
+        '''
+        start = utime.ticks_us()
+        data = memoryview(data)
         data_pointer = 0
-        address_i = to_int(address) 
+        address_i = to_int(address)
         bank_i    = to_int(bank)
-        counter = 0
+        self.set_memory_bank(bank)
+        self.set_memory_start_address(address)
         while data_pointer < data_size:
-            counter += 1
-            chunk_size = MPUreg.DMP_MEMORY_CHUNK_SIZE;
-            chunk_size = min(chunk_size, len(data) - data_pointer)
-            chunk_size = min(chunk_size, 256-address_i)
-            if (useProgMem):
-                pass  # the following was commented out in the c++ source code
-            else:
-                prog_buffer = data[data_pointer:data_pointer+chunk_size]
-                bank = to_byte(bank_i)
-                self.set_memory_bank(bank)                    
-                address = to_byte(address_i) 
-                self.set_memory_start_address(address)
-                self.bus.writeto_mem(MPUADDR, MPUreg.MEM_R_W, prog_buffer);
-
-            verify = True # DEBUG DEBUG
-            if verify:
-                bank    = to_byte(bank_i)       
-                address = to_byte(address_i)
-                self.set_memory_bank(bank);                 # set bank and start address again even though
-                self.set_memory_start_address(address);     # these have just been set to write data to the MPU
-                verify_buffer = self.bus.readfrom_mem(MPUADDR, MPUreg.MEM_R_W, chunk_size)
-
-                for i in range(chunk_size):
-                    if (prog_buffer[i] != verify_buffer[i]):  #translate
-                        print(f"Block write verification error, {bank} , address {address} !");
-                        print("Expected:")
-                        for j in range(chunk_size):
-                            print(f" 0x{prog_buffer[j]:02X}", end='')
-                        print("\nReceived:")
-                        for j in range(chunk_size):
-                            print(f" 0x{verify_buffer[j]:02X}", end='')
-                        print("\n")
-                        return False # // uh oh.
-
-            data_pointer += chunk_size
-            address_i += chunk_size
-            address_i %= 256       # wrap around at 256, c++ progs use uint8_t variables for that
-            address = to_byte(address_i)
- 
-            if (i < data_size):
-                if (address_i == 0):
-                    bank_i += 1 
-                    bank = to_byte(bank_i)                     
+            size = min(chunk_size, data_size - data_pointer, 256 - address_i)
+            self.bus.writeto_mem(self.address, MPUreg.MEM_R_W, data[data_pointer:data_pointer + size])
+            data_pointer += size
+            address_i = (address_i + size) % 256       # wrap around at 256, c++ progs use uint8_t variables for that
+            if address_i == 0 and data_pointer < data_size:
+                bank_i += 1
+                self.set_memory_bank(to_byte(bank_i))
+                self.set_memory_start_address(b'\x00')
+        write_us = utime.ticks_diff(utime.ticks_us(), start)
+
+        verify_us = 0
+        if verify:
+            start = utime.ticks_us()
+            expected = crc32(data[:data_size])
+            received = self.memory_block_crc(data_size, bank, address, chunk_size)
+            verify_us = utime.ticks_diff(utime.ticks_us(), start)
+            if received != expected:
+                print(f"Block write verification error, bank {to_int(bank)}, address {to_int(address)}, {data_size} bytes: CRC 0x{received:08X}, expected 0x{expected:08X}")
+                return False # // uh oh.
+        self.upload_timing = {"bytes": data_size,
+                              "write_us": write_us,
+                              "verify_us": verify_us,
+                              "bytes_per_s": data_size * 1000000 // max(1, write_us + verify_us)}
         return True
+
+    def memory_block_crc(self, data_size, bank, address, chunk_size=MPUreg.DMP_MEMORY_BANK_SIZE) -> int:
+        ''' CRC32 of data_size bytes of DMP memory, read bank by bank into a single reused buffer '''
+        buffer = memoryview(bytearray(min(chunk_size, 256)))
+        address_i = to_int(address)
+        bank_i    = to_int(bank)
+        crc = 0
+        self.set_memory_bank(bank)
+        self.set_memory_start_address(address)
+        while data_size > 0:
+            size = min(len(buffer), data_size, 256 - address_i)
+            self.bus.readfrom_mem_into(self.address, MPUreg.MEM_R_W, buffer[:size])
+            crc = crc32(buffer[:size], crc)
+            data_size -= size
+            address_i = (address_i + size) % 256
+            if address_i == 0 and data_size > 0:
+                bank_i += 1
+                self.set_memory_bank(to_byte(bank_i))
+                self.set_memory_start_address(b'\x00')
+        return crc
     
 #
 # FIFO related routines
 #
 
     def get_fifo_count(self):
-        buffer = self.bus.readfrom_mem(MPUADDR, MPUreg.FIFO_COUNTH, 2)
+        buffer = self.fifo_count_buffer
+        self.bus.readfrom_mem_into(self.address, MPUreg.FIFO_COUNTH, buffer)
         return (buffer[0] << 8 | buffer[1])
 
     def get_fifo_byte(self):
-        buffer = self.bus.readfrom_mem(MPUADDR, MPUreg.FIFO_R_W, 1)
+        buffer = self.bus.readfrom_mem(self.address, MPUreg.FIFO_R_W, 1)
         return buffer
 
     def get_fifo_bytes(self,length):
         if(length > 0):
-            data = self.bus.readfrom_mem(MPUADDR, MPUreg.FIFO_R_W, length);
+            data = self.bus.readfrom_mem(self.address, MPUreg.FIFO_R_W, length);
         else:
             data = bytearray()
         return data
 
+    def get_fifo_bytes_into(self, buffer):
+        self.bus.readfrom_mem_into(self.address, MPUreg.FIFO_R_W, buffer)
+
     def reset_fifo(self):
-       self.bus.write_bit(MPUADDR, MPUreg.USER_CTRL, MPUreg.USERCTRL_FIFO_RESET_BIT, True)
+       self.bus.write_bit(self.address, MPUreg.USER_CTRL, MPUreg.USERCTRL_FIFO_RESET_BIT, True)
 
-    def get_current_fifo_packet(self, length):   # length = packetsize. There is no check!!!
+    def get_current_fifo_packet(self, length, timeout_ms=50):   # length = packetsize. There is no check!!!
         ''' Overflow-proof function to retrieve a FIFO packet. Modified from Rowberg's C++
             routine as this was creating fragmented packets. The current approach is robust against
             busfrequencies as low as 50kHz and packetretrieval rates of 10Hz
+            With timeout_ms None the timeout follows from the configured sample rate.
         '''
         break_timer = utime.ticks_ms()
         fifo_c = self.get_fifo_count()
         while True:    
-            if fifo_c == length:                          # Nice, we have only 1 packet
+            if fifo_c >= FIFO_SIZE:                       # Overflowed: the oldest bytes are lost and the packet
+                self.reset_fifo()                         # boundaries with them. Start over and wait for a new one
+                self.get_int_status()                     # clears FIFO_OFLOW
+                break_timer = utime.ticks_ms()
+            elif fifo_c == length:                        # Nice, we have only 1 packet
                 return self.get_fifo_bytes(length) 
             elif fifo_c > length:                         # There is more than 1 packet in the fifo buffer 
                 remove = (int(fifo_c/length) - 1)*length
@@ -371,9 +492,15 @@ class MPU6050():
                     self.get_fifo_bytes(5*length)         # trash these
                     remove -= 5* length
                 self.get_fifo_bytes(remove)
-                return self.get_fifo_bytes(length)        # and return the remaining packet
+                packet = self.get_fifo_bytes(length)      # the remaining packet
+                if remove == 0 or not self.get_int_fifo_overflow_status():
+                    return packet
+                self.reset_fifo()                         # overflowed while reading at a low bus frequency
+                break_timer = utime.ticks_ms()
             elif fifo_c == 0:
-                if utime.ticks_diff(utime.ticks_ms(), break_timer) <= 50: # Need some more intelligence for timeout
+                if timeout_ms is None:
+                    timeout_ms = self.get_packet_timeout_ms()
+                if utime.ticks_diff(utime.ticks_ms(), break_timer) <= timeout_ms:
                     utime.sleep_us(500)
                 else:
                     raise Exception('Timeout waiting for next packet')
@@ -386,66 +513,244 @@ class MPU6050():
 
             fifo_c = self.get_fifo_count() 
 
+def get_asyncio():
+    ''' asyncio on CPython and recent micropython, uasyncio on older micropython.
+        Only imported when the async API is used.
+    '''
+    try:
+        import asyncio
+    except ImportError:
+        import uasyncio as asyncio
+    return asyncio
+
+DMP_IMAGE_SIZE = 3062
+# Region read back by dmp_image_loaded: the last, partly filled, bank of the image. This is
+# program code, which unlike the data memory in the first banks is not changed by a running DMP.
+DMP_SIGNATURE_OFFSET = (DMP_IMAGE_SIZE // 256) * 256
+DMP_SIGNATURE_SIZE   = DMP_IMAGE_SIZE - DMP_SIGNATURE_OFFSET
+
+def load_dmp_image(path='/lib/DMP_image.bin'):
+    ''' The DMP firmware image. A frozen dmp_firmware module (see RaspberryPico/tools/build_dmp_image.py)
+        is used when present, as its image stays in flash. Otherwise the binary image is read
+        from path, made by the same tool: length and CRC32 header followed by the image.
+    '''
+    try:
+        from dmp_firmware import IMAGE, CRC32
+        image, crc = IMAGE, CRC32
+    except ImportError:
+        with open(path, 'rb') as DMP_image_source:
+            length, crc = struct.unpack('>II', DMP_image_source.read(8))
+            image = bytearray(length)
+            DMP_image_source.readinto(image)
+    if len(image) != DMP_IMAGE_SIZE:
+        raise Exception("DMP image file has incorrect length")
+    if crc32(image) != crc:
+        raise Exception("DMP image file is corrupt, CRC32 mismatch")
+    return image
+
 class MPU6050_DMP(MPU6050):
     
     MPU6050_DMP_FIFO_RATE_DIVISOR  = 0x01 # The New instance of the Firmware has this as the default
 
-    def __init__(self, bus):
-        super().__init__(bus)
-        # we are reading DMP image from file. Make sure this is in /lib in the pico memory
-        int_values =  []
-        with open('/lib/DMP_image.txt') as DMP_image_source:
-            a = DMP_image_source.readlines()
-            for line in a:
-                hex_values = line.strip().rstrip(', ').split(', ')
-                int_values += [int(value, 16) for value in hex_values]
-        self.DMP_image = bytes(int_values)
-        self.len_DMP_image = 3062
-        if len(self.DMP_image) != self.len_DMP_image:
-            raise Exception("DMP image file has incorrect length")
+    def __init__(self, bus, address=MPUADDR, image_path='/lib/DMP_image.bin'):
+        super().__init__(bus, address)
+        self.DMP_image = load_dmp_image(image_path)
+        self.len_DMP_image = DMP_IMAGE_SIZE
+        self.DMP_signature_crc = crc32(memoryview(self.DMP_image)[DMP_SIGNATURE_OFFSET:DMP_SIGNATURE_OFFSET + DMP_SIGNATURE_SIZE])
         
         self.dmp_packet_size = 28
+        self.fifo = fifo_reader(self, self.dmp_packet_size)
+        self.int_pin = None
+        self.int_pending = 0
+        self.packet_timeout_ms = None       # set by attach_interrupt for the configured rate
         
     def set_dmp_enabled(self, enabled):
-        self.bus.write_bit(MPUADDR, MPUreg.USER_CTRL, MPUreg.USERCTRL_DMP_EN_BIT, enabled)
+        self.bus.write_bit(self.address, MPUreg.USER_CTRL, MPUreg.USERCTRL_DMP_EN_BIT, enabled)
         
     def get_dmp_enabled(self):
-        return self.bus.read_bit(MPUADDR, MPUreg.USER_CTRL, MPUreg.USERCTRL_DMP_EN_BIT)
+        return self.bus.read_bit(self.address, MPUreg.USER_CTRL, MPUreg.USERCTRL_DMP_EN_BIT)
 
-    def dmp_initialize(self):
-        self.bus.write_bit(MPUADDR,0x6B, 7, 1)                #PWR_MGMT_1: reset with 100ms delay
-        utime.sleep_ms(100)
-       
-        self.bus.write_bits(MPUADDR,0x6A, 2, 3, 0b111)        # full SIGNAL_PATH_RESET: with another 100ms delay
-        utime.sleep_ms(100);
-
-        self.bus.writeto_mem(MPUADDR, 0x6B, b'\x01')   # 1000 0001 PWR_MGMT_1:Clock Source Select PLL_X_gyro CHECK!! comment not in line with data
-
-        self.bus.writeto_mem(MPUADDR, 0x38, b'\x00')   # 0000 0000 INT_ENABLE: no Interrupt
-        self.bus.writeto_mem(MPUADDR, 0x23, b'\x00')   # 0000 0000 MPU FIFO_EN: (all off) Using DMP's FIFO instead
-        self.bus.writeto_mem(MPUADDR, 0x1C, b'\x00')   # 0000 0000 ACCEL_CONFIG: 0 =  Accel Full Scale Select: 2g
-        self.bus.writeto_mem(MPUADDR, 0x37, b'\x80')   # 1001 0000 INT_PIN_CFG: ACTL The logic level for int pin is active low. and interrupt status bits are cleared on any read
-        self.bus.writeto_mem(MPUADDR, 0x6B, b'\x01')   # 0000 0001 PWR_MGMT_1: Clock Source Select PLL_X_gyro
-        self.bus.writeto_mem(MPUADDR, 0x19, b'\x04')   # 0000 0100 SMPLRT_DIV: Divides the internal sample rate 400Hz ( Sample Rate = Gyroscope Output Rate / (1 + SMPLRT_DIV))
-        self.bus.writeto_mem(MPUADDR, 0x1A, b'\x01')   # 0000 0001 CONFIG: Digital Low Pass Filter (DLPF) Configuration 188HZ  //Im betting this will be the beat
-        if (not self.writeProgMemoryBlock(self.DMP_image, self.len_DMP_image, b'\x00', b'\x00', True)):
+    def dmp_image_loaded(self) -> bool:
+        ''' True when the DMP memory still holds our firmware, e.g. after a restart of the Pico
+            without power cycling the MPU. Only a signature region of the image is read back.
+        '''
+        self.set_dmp_enabled(False)
+        bank, address = divmod(DMP_SIGNATURE_OFFSET, MPUreg.DMP_MEMORY_BANK_SIZE)
+        crc = self.memory_block_crc(DMP_SIGNATURE_SIZE, to_byte(bank), to_byte(address))
+        return crc == self.DMP_signature_crc
+
+    def dmp_initialize(self, verify=True, warm_start=True):
+        ''' Reset the MPU, upload the DMP firmware and configure the registers for the DMP.
+            With warm_start the reset and upload are skipped when dmp_image_loaded() finds the
+            firmware still in place, and only the register configuration is applied.
+        '''
+        for delay_ms in self.dmp_initialize_steps(verify, warm_start):
+            utime.sleep_ms(delay_ms)
+        return self.dmp_initialize_result
+
+    async def dmp_initialize_async(self, verify=True, warm_start=True):
+        ''' dmp_initialize that hands control to the event loop while the MPU resets '''
+        asyncio = get_asyncio()
+        for delay_ms in self.dmp_initialize_steps(verify, warm_start):
+            await asyncio.sleep(delay_ms / 1000)
+        return self.dmp_initialize_result
+
+    def dmp_initialize_steps(self, verify, warm_start):
+        ''' The dmp_initialize sequence as a generator yielding the delays (ms) it needs, so the
+            waiting can be done blocking or by an event loop. Leaves 0 in dmp_initialize_result
+            on success, 1 when the firmware upload failed.
+        '''
+        self.dmp_initialize_result = 1
+        loaded = warm_start and self.dmp_image_loaded()
+        if not loaded:
+            self.bus.write_bit(self.address,0x6B, 7, 1)                #PWR_MGMT_1: reset with 100ms delay
+            yield 100
+           
+            self.bus.write_bits(self.address,0x6A, 2, 3, 0b111)        # full SIGNAL_PATH_RESET: with another 100ms delay
+            yield 100
+
+        self.bus.writeto_mem(self.address, 0x6B, b'\x01')   # 1000 0001 PWR_MGMT_1:Clock Source Select PLL_X_gyro CHECK!! comment not in line with data
+
+        self.bus.writeto_mem(self.address, 0x38, b'\x00')   # 0000 0000 INT_ENABLE: no Interrupt
+        self.bus.writeto_mem(self.address, 0x23, b'\x00')   # 0000 0000 MPU FIFO_EN: (all off) Using DMP's FIFO instead
+        self.bus.writeto_mem(self.address, 0x1C, b'\x00')   # 0000 0000 ACCEL_CONFIG: 0 =  Accel Full Scale Select: 2g
+        self.bus.writeto_mem(self.address, 0x37, b'\x80')   # 1001 0000 INT_PIN_CFG: ACTL The logic level for int pin is active low. and interrupt status bits are cleared on any read
+        self.bus.writeto_mem(self.address, 0x6B, b'\x01')   # 0000 0001 PWR_MGMT_1: Clock Source Select PLL_X_gyro
+        self.bus.writeto_mem(self.address, 0x19, b'\x04')   # 0000 0100 SMPLRT_DIV: Divides the internal sample rate 400Hz ( Sample Rate = Gyroscope Output Rate / (1 + SMPLRT_DIV))
+        self.bus.writeto_mem(self.address, 0x1A, b'\x01')   # 0000 0001 CONFIG: Digital Low Pass Filter (DLPF) Configuration 188HZ  //Im betting this will be the beat
+        if (not loaded and not self.writeProgMemoryBlock(self.DMP_image, self.len_DMP_image, b'\x00', b'\x00', verify)):
              return 1     # Loads the DMP image into the MPU6050 Memory // Should Never Fail
-        self.bus.writeto_mem(MPUADDR, 0x70, b'\x04\x00')# DMP Program Start Address!!
-        self.bus.writeto_mem(MPUADDR, 0x1B, b'\x18')   # 0001 1000 GYRO_CONFIG: 3 = +2000 Deg/sec
-        self.bus.writeto_mem(MPUADDR, 0x6A, b'\xC0')   # 1100 1100 USER_CTRL: Enable Fifo and Reset Fifo
-        self.bus.writeto_mem(MPUADDR, 0x38, b'\x02')   # 0000 0010 INT_ENABLE: RAW_DMP_INT_EN on
-        self.bus.write_bit(MPUADDR,0x6A, 2, 1)        # Reset FIFO one last time just for kicks. (MPUi2cWrite reads 0x6A first and only alters 1 bit and then saves the byte)
+        self.bus.writeto_mem(self.address, 0x70, b'\x04\x00')# DMP Program Start Address!!
+        self.bus.writeto_mem(self.address, 0x1B, b'\x18')   # 0001 1000 GYRO_CONFIG: 3 = +2000 Deg/sec
+        self.bus.writeto_mem(self.address, 0x6A, b'\xC0')   # 1100 1100 USER_CTRL: Enable Fifo and Reset Fifo
+        self.bus.writeto_mem(self.address, 0x38, b'\x02')   # 0000 0010 INT_ENABLE: RAW_DMP_INT_EN on
+        self.bus.write_bit(self.address,0x6A, 2, 1)        # Reset FIFO one last time just for kicks. (MPUi2cWrite reads 0x6A first and only alters 1 bit and then saves the byte)
 # 
         self.set_dmp_enabled(False)# disable DMP for compatibility with the MPU6050 library. Switch this on once all is initialised
         rate = b'\x04' 
         self.set_rate(rate) # slow down the pace of output to 1khz/(1+rate)
 
-
+        self.dmp_initialize_result = 0
         return 0
 
+    def iter_packets(self):
+        ''' Lossless streaming: yields every DMP packet in the FIFO, in order, as
+            (sequence, timestamp_us, packet). Packets are memoryviews into self.fifo and are
+            only valid until the generator is resumed. Timestamps are utime.ticks_us values
+            reconstructed from the read time and the sample period.
+            A FIFO overflow is reported as (sequence, timestamp_us, None). The FIFO is then reset
+            and the sequence number skips the packets estimated to be lost in the overflow.
+        '''
+        fifo = self.fifo
+        period_us = self.get_sample_period_us()
+        timeout_ms = self.get_packet_timeout_ms()
+        sequence = 0
+        last_timestamp = None
+        break_timer = utime.ticks_ms()
+        while True:
+            overflow = self.get_int_fifo_overflow_status()      # read every pass: reading clears it
+            fifo_count = self.get_fifo_count()
+            read_time = utime.ticks_us()
+            if overflow or fifo_count >= FIFO_SIZE:
+                self.reset_fifo()
+                fifo.clear()
+                break_timer = utime.ticks_ms()
+                yield (sequence, read_time, None)    # sequence number of the first lost packet
+                if last_timestamp is not None:
+                    sequence += utime.ticks_diff(read_time, last_timestamp) // period_us
+                last_timestamp = read_time
+                continue
+            packets = fifo.fill(fifo_count)
+            if packets == 0:
+                if utime.ticks_diff(utime.ticks_ms(), break_timer) > timeout_ms:
+                    raise Exception('Timeout waiting for next packet')
+                utime.sleep_us(min(500, period_us // 2))
+                continue
+            break_timer = utime.ticks_ms()
+            for i in range(packets):    # oldest first, the newest packet was sampled just before read_time
+                last_timestamp = utime.ticks_add(read_time, -(packets - 1 - i)*period_us)
+                yield (sequence, last_timestamp, fifo.next_packet())
+                sequence += 1
+
+#
+# Interrupt driven acquisition
+#
+    def attach_interrupt(self, pin):
+        ''' Read the FIFO only after the MPU signals a new packet on its INT pin, instead of
+            polling FIFO_COUNT. dmp_initialize sets INT_PIN_CFG to active low and enables
+            RAW_DMP_INT, so the pin fires on its falling edge once per DMP packet.
+        '''
+        self.int_pending = 0
+        self.packet_timeout_ms = self.get_packet_timeout_ms()
+        self.int_pin = pin
+        pin.irq(handler=self.on_interrupt, trigger=Pin.IRQ_FALLING)
+
+    def detach_interrupt(self):
+        if self.int_pin is not None:
+            self.int_pin.irq(handler=None)
+            self.int_pin = None
+
+    def on_interrupt(self, pin):
+        self.int_pending += 1      # interrupt context: no bus traffic here, wait_packet does the read
+
+    def wait_packet(self):
+        ''' Oldest unread DMP packet as a memoryview into self.fifo. The FIFO is read once per
+            interrupt; in between the processor idles instead of polling the bus.
+        '''
+        fifo = self.fifo
+        timeout_ms = self.packet_timeout_ms
+        if timeout_ms is None:
+            timeout_ms = self.get_packet_timeout_ms()
+        break_timer = utime.ticks_ms()
+        while fifo.packets_available() == 0:
+            if self.int_pending:
+                self.int_pending = 0         # an interrupt arriving after this is read by the fill below
+                fifo.fill()
+            elif utime.ticks_diff(utime.ticks_ms(), break_timer) > timeout_ms:
+                raise Exception('Timeout waiting for next packet')
+            else:
+                idle()
+        return fifo.next_packet()
+
+    def packets(self):
+        ''' Async iterator over DMP packets: async for packet in mpu.packets() '''
+        return async_packets(self)
+
     def dmp_packet_available(self):
         return self.get_fifo_count() >= self.dmp_get_fifo_packet_size();  #superflous call. Replace later
 
     def dmp_get_fifo_packet_size(self):
-        return self.dmp_packet_size   
-
+        return self.dmp_packet_size
+
+
+class async_packets():
+    ''' Async iterator over the DMP packets of an MPU6050_DMP, waiting in the event loop instead
+        of sleeping. With an attached interrupt the FIFO is only read after the INT pin fired,
+        otherwise it is polled every half sample period. Packets are memoryviews into mpu.fifo,
+        valid until the next packet is requested.
+    '''
+    def __init__(self, mpu):
+        self.mpu = mpu
+        self.asyncio = get_asyncio()
+        self.poll_s = mpu.get_sample_period_us() / 2000000
+        self.timeout_ms = mpu.get_packet_timeout_ms()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        mpu = self.mpu
+        fifo = mpu.fifo
+        break_timer = utime.ticks_ms()
+        while fifo.packets_available() == 0:
+            if mpu.int_pin is None or mpu.int_pending:
+                mpu.int_pending = 0
+                fifo_count = mpu.get_fifo_count()
+                if fifo_count >= FIFO_SIZE:
+                    mpu.reset_fifo()        # overflowed, packet boundaries are lost
+                elif fifo.fill(fifo_count) > 0:
+                    break
+            if utime.ticks_diff(utime.ticks_ms(), break_timer) > self.timeout_ms:
+                raise Exception('Timeout waiting for next packet')
+            await self.asyncio.sleep(self.poll_s)
+        return fifo.next_packet()
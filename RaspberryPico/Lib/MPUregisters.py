@@ -55,6 +55,7 @@ YA_OFFS_H      =  0x08 #[15:0] YA_OFFS
 YA_OFFS_L_TC   =  0x09
 ZA_OFFS_H      =  0x0A #[15:0] ZA_OFFS
 ZA_OFFS_L_TC   =  0x0B
+XA_OFFSET_H_MPU6500 = 0x77  # MPU6500 family: XA, YA, ZA offsets at 0x77, 0x7A, 0x7D
 XG_OFFS_USRH   =  0x13   # X-Gyro offset [0:15]
 XG_OFFS_USRL   =  0x14
 YG_OFFS_USRH   =  0x15   # Y-Gyro offset [0:15]
@@ -73,6 +74,7 @@ TC_OTP_BNK_VLD_BIT = 0
 #
 # Interrupt settings
 #
+I2C_MST_STATUS             = 0x36
 INT_ENABLE                 = 0x38
 DMP_INT_STATUS             = 0x39
 INT_STATUS                 = 0x3A
@@ -94,6 +96,12 @@ MEM_START_ADDR =  0x6E  #
 MEM_R_W        =  0x6F  # Register for reading of writing to DMP (check)
 
 
+FIFO_EN        =  0x23  # Sensor data written to the FIFO when the DMP is not used
+FIFO_TEMP_EN_BIT  = 7
+FIFO_XG_EN_BIT    = 6
+FIFO_YG_EN_BIT    = 5
+FIFO_ZG_EN_BIT    = 4
+FIFO_ACCEL_EN_BIT = 3
 FIFO_COUNTH    =  0x72
 FIFO_COUNTL    =  0x73
 FIFO_R_W       =  0x74
@@ -166,4 +174,19 @@ SMPLRT_DIV = 0x19
 EXT_SYNC_TEMP_OUT_L = 0x1
 CFG_EXT_SYNC_SET_BIT    = 5
 CFG_EXT_SYNC_SET_LENGTH = 3
-CONFIG = 0x1A
\ No newline at end of file
+CONFIG = 0x1A
+
+#
+# Register shadowing (see bus.enable_shadow)
+#
+# Registers that change under the feet of the host: sensor outputs, status
+# registers, FIFO and DMP memory access. These are never cached.
+VOLATILE_REGISTERS = set(range(DMP_INT_STATUS, MOT_DETECT_STATUS + 1)) | {
+    I2C_MST_STATUS, SIGNAL_PATH_RESET, BANK_SEL, MEM_START_ADDR, MEM_R_W,
+    FIFO_COUNTH, FIFO_COUNTL, FIFO_R_W}
+# Registers that do not auto-increment: every byte of a multi-byte write goes
+# to the same register (DMP memory, FIFO)
+STREAM_REGISTERS = {MEM_R_W, FIFO_R_W}
+# Bits that the MPU clears by itself after they have been written
+SELF_CLEARING_BITS = {USER_CTRL:  0x0F,   # DMP, FIFO, I2C master and signal condition resets
+                      PWR_MGMT_1: 0x80}   # DEVICE_RESET
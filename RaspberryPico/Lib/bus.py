@@ -1,4 +1,5 @@
 from machine import Pin, I2C
+import MPUregisters as MPUreg
 
 
 def to_byte(integer) -> bytes:
@@ -16,17 +17,78 @@ def two_bytes_to_int(d1,d2) -> int:
         d -= 65536
     return d
 
+class register_shadow():
+    ''' Write-through copy of the configuration registers of one or more devices on the bus.
+        Registers flagged volatile are never cached. Bits that the device clears by itself
+        are masked out before storing, and a device reset drops all entries for that device.
+    '''
+    def __init__(self, volatile=MPUreg.VOLATILE_REGISTERS, self_clearing=MPUreg.SELF_CLEARING_BITS):
+        self.volatile = volatile
+        self.self_clearing = self_clearing
+        self.registers = {}
+
+    def get(self, dev_addr, reg_addr):
+        return self.registers.get((dev_addr, reg_addr))    # None when not (or never) cached
+
+    def store(self, dev_addr, reg_addr, value):
+        if reg_addr in self.volatile:
+            return
+        self.registers[(dev_addr, reg_addr)] = value & ~self.self_clearing.get(reg_addr, 0)
+
+    def update(self, dev_addr, reg_addr, buf):
+        if reg_addr == MPUreg.PWR_MGMT_1 and buf[0] & (1 << MPUreg.PWR1_DEVICE_RESET_BIT):
+            self.invalidate(dev_addr)    # all registers return to their power-on values
+            return
+        if reg_addr in MPUreg.STREAM_REGISTERS:
+            return                      # all bytes go to one register, which is volatile anyway
+        for i in range(len(buf)):       # multi-byte writes auto-increment the register address
+            self.store(dev_addr, (reg_addr + i) & 0xFF, buf[i])
+
+    def invalidate(self, dev_addr=None):
+        if dev_addr is None:
+            self.registers = {}
+        else:
+            for key in [key for key in self.registers if key[0] == dev_addr]:
+                del self.registers[key]
+
+
 class bus(I2C):
     
     def __init__(self, i2cbus, sda=Pin(16), scl=Pin(17), freq=400000):
-        pass
+        self.shadow = None
+#
+# Optional register shadowing. With the shadow enabled the read-modify-write
+# cycle of write_bit(s) only costs a single write once a register is known.
+#
+    def enable_shadow(self, volatile=MPUreg.VOLATILE_REGISTERS, self_clearing=MPUreg.SELF_CLEARING_BITS):
+        self.shadow = register_shadow(volatile, self_clearing)
+
+    def disable_shadow(self):
+        self.shadow = None
+
+    def invalidate_shadow(self, dev_addr=None):
+        if self.shadow is not None:
+            self.shadow.invalidate(dev_addr)
+
+    def read_register(self, dev_addr, reg_addr) -> int:
+        if self.shadow is None:
+            return to_int(self.readfrom_mem(dev_addr, reg_addr, 1))
+        value = self.shadow.get(dev_addr, reg_addr)
+        if value is None:
+            value = to_int(self.readfrom_mem(dev_addr, reg_addr, 1))
+            self.shadow.store(dev_addr, reg_addr, value)
+        return value
+
+    def writeto_mem(self, dev_addr, reg_addr, buf, *, addrsize=8):
+        super().writeto_mem(dev_addr, reg_addr, buf, addrsize=addrsize)
+        if self.shadow is not None:
+            self.shadow.update(dev_addr, reg_addr, buf)
    
     def read_bit(self, dev_addr, reg_addr, bit_start) -> int:
         return self.read_bits(dev_addr, reg_addr, bit_start, 1)
 
     def read_bits(self, dev_addr, reg_addr, bit_start, length) -> int:
-        b = self.readfrom_mem(dev_addr, reg_addr, 1)
-        bi = to_int(b)
+        bi = self.read_register(dev_addr, reg_addr)
         mask = ((1 << length) - 1) << (bit_start - length + 1)
         bi &= mask
         bi >>= (bit_start - length + 1)
@@ -43,8 +105,7 @@ class bus(I2C):
  
    
     def write_bit(self, dev_addr, reg_addr, bit_num, value) -> bool:
-        b = self.readfrom_mem(dev_addr, reg_addr, 1) 
-        bi = to_int(b)                                # convert to integer. Python does not support bitwise ops on bytes
+        bi = self.read_register(dev_addr, reg_addr)   # integer, python does not support bitwise ops on bytes
         bi = (bi | (1 << bit_num)) if value != 0 else (bi & ~(1 << bit_num))     # Update the bit value
         b = to_byte(bi)                               # convert back to byte
         self.writeto_mem(dev_addr, reg_addr, b)      # Write the updated value back to the register
@@ -52,8 +113,7 @@ class bus(I2C):
 
 
     def write_bits(self, dev_addr, reg_addr, bit_start, length, data) -> None:
-        b = self.readfrom_mem(dev_addr, reg_addr, 1)
-        bi = to_int(b)                       
+        bi = self.read_register(dev_addr, reg_addr)
         mask = ((1 << length) - 1) << (bit_start - length + 1)
         data <<= (bit_start - length + 1)       # shift data into correct position
         data &= mask                            # zero all non-important bits in data
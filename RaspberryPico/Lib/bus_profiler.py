@@ -0,0 +1,285 @@
+import utime
+#
+# Version 1.0 18-oct-2026
+#
+# Instrumentation of the I2C traffic of a bus object, in two strengths.
+#
+# bus_counters: counts transactions and bytes per direction. Cheap enough to
+# leave on in production on the Pico: an extra function call and a few integer
+# operations per transaction, no allocation.
+#
+# bus_profiler: attributes every transaction (direction, register, bytes, wall
+# time) to the MPU6050 method that caused it. Attached to an MPU6050 or
+# MPU6050_DMP object it wraps its methods, and the helpers of bus that do
+# read-modify-write, so a transaction is booked on
+#   api     the outermost MPU6050 method, the one the application called
+#   method  the innermost MPU6050 method, the one that used the bus
+#   helper  the bus helper in between, e.g. write_bit, which hides a read
+# report() prints the totals per API call and the detail per register.
+# Methods returning a generator (iter_packets, dmp_initialize_steps), a
+# coroutine (dmp_initialize_async) or an async iterator (packets) use the bus
+# while they are iterated or awaited, not when they are called. Their result
+# is wrapped so every step runs with the method on the stack; in between, e.g.
+# while an async task waits, other traffic is not booked on them.
+# Allocates per call, so for finding bus time, not for production.
+#
+# Both patch the bus instance, so every path to the primitives is seen,
+# including the helpers of bus calling them on self. A primitive implemented
+# with another one (readfrom_mem with readfrom_mem_into) counts once.
+#
+#   counters = bus_counters(i2c).attach()
+#   profiler = bus_profiler(i2c).attach(mpu)
+#   ... profiler.report() ... profiler.detach()
+#
+
+PRIMITIVES = ('readfrom_mem', 'readfrom_mem_into', 'writeto_mem')
+HELPERS    = ('read_register', 'read_bit', 'read_bits', 'read_word', 'write_bit', 'write_bits', 'write_word')
+READ  = 'R'
+WRITE = 'W'
+GENERATOR = type((lambda: (yield))())       # also the type of coroutines on micropython
+
+
+def stepped(stack, name, inner):
+    ''' Generator passing on the steps of generator or await iterator inner, with name on the
+        stack during each step
+    '''
+    value = None
+    error = None
+    while True:
+        stack.append(name)
+        try:
+            out = inner.send(value) if error is None else inner.throw(error)
+        except StopIteration as e:
+            return e.value
+        finally:
+            stack.pop()
+        error = None
+        try:
+            value = yield out
+        except GeneratorExit:
+            inner.close()
+            raise
+        except BaseException as e:      # thrown in, e.g. a cancelled task: pass it on to inner
+            error = e
+            value = None
+
+
+class profiled_awaitable():
+    def __init__(self, stack, name, awaitable):
+        self.stack = stack
+        self.name = name
+        self.awaitable = awaitable
+
+    def __await__(self):
+        awaitable = self.awaitable
+        inner = awaitable.__await__() if hasattr(awaitable, '__await__') else awaitable
+        return stepped(self.stack, self.name, inner)
+
+    __iter__ = __await__                # micropython awaits through __iter__
+
+
+class profiled_async_iterator():
+    def __init__(self, stack, name, iterator):
+        self.stack = stack
+        self.name = name
+        self.iterator = iterator
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        return profiled_awaitable(self.stack, self.name, self.iterator.__anext__())
+
+
+def profiled(stack, name, result):
+    ''' result, or a wrapper attributing the bus traffic of its iteration or awaiting to name '''
+    if hasattr(result, '__await__'):
+        return profiled_awaitable(stack, name, result)
+    if isinstance(result, GENERATOR):
+        return stepped(stack, name, result)
+    if hasattr(result, '__anext__'):
+        return profiled_async_iterator(stack, name, result)
+    return result
+
+
+class bus_counters():
+    ''' Always-on transaction and byte counters of a bus '''
+    def __init__(self, bus):
+        self.bus = bus
+        self.patched = []       # (object, name) of the methods replaced on instances
+        self.reset()
+
+    def reset(self):
+        self.reads = 0
+        self.writes = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.depth = 0          # > 0 inside a primitive
+
+    def counts(self):
+        ''' (reads, writes, bytes read, bytes written) '''
+        return self.reads, self.writes, self.bytes_read, self.bytes_written
+
+    def attach(self):
+        readfrom_mem = self.bus.readfrom_mem
+        readfrom_mem_into = self.bus.readfrom_mem_into
+        writeto_mem = self.bus.writeto_mem
+        counters = self
+
+        def counted_readfrom_mem(dev_addr, reg_addr, length, *, addrsize=8):
+            if counters.depth == 0:
+                counters.reads += 1
+                counters.bytes_read += length
+            counters.depth += 1
+            try:
+                return readfrom_mem(dev_addr, reg_addr, length, addrsize=addrsize)
+            finally:
+                counters.depth -= 1
+
+        def counted_readfrom_mem_into(dev_addr, reg_addr, buffer, *, addrsize=8):
+            if counters.depth == 0:
+                counters.reads += 1
+                counters.bytes_read += len(buffer)
+            counters.depth += 1
+            try:
+                readfrom_mem_into(dev_addr, reg_addr, buffer, addrsize=addrsize)
+            finally:
+                counters.depth -= 1
+
+        def counted_writeto_mem(dev_addr, reg_addr, buf, *, addrsize=8):
+            if counters.depth == 0:
+                counters.writes += 1
+                counters.bytes_written += len(buf)
+            counters.depth += 1
+            try:
+                writeto_mem(dev_addr, reg_addr, buf, addrsize=addrsize)
+            finally:
+                counters.depth -= 1
+
+        self.patch(self.bus, 'readfrom_mem', counted_readfrom_mem)
+        self.patch(self.bus, 'readfrom_mem_into', counted_readfrom_mem_into)
+        self.patch(self.bus, 'writeto_mem', counted_writeto_mem)
+        return self
+
+    def patch(self, instance, name, function):
+        setattr(instance, name, function)
+        self.patched.append((instance, name))
+
+    def detach(self):
+        ''' Back to the methods of the classes '''
+        for instance, name in self.patched:
+            delattr(instance, name)
+        self.patched = []
+
+
+class bus_profiler(bus_counters):
+    ''' Per method attribution of the transactions on a bus '''
+    def __init__(self, bus, log_limit=0):
+        self.stack = []         # names of the methods being executed, outermost first
+        self.log_limit = log_limit      # keep the first log_limit transactions in log
+        super().__init__(bus)
+
+    def reset(self):
+        super().reset()
+        self.calls = {}         # api -> number of calls
+        self.apis = {}          # api -> [transactions, reads, writes, bytes, us]
+        self.details = {}       # (api, method, helper, direction, register) -> [transactions, bytes, us]
+        self.log = []           # (api, method, helper, direction, register, bytes, us)
+
+    def attach(self, *mpus):
+        ''' Profile the bus and attribute its traffic to the methods of mpus '''
+        bus = self.bus
+        for name in PRIMITIVES:
+            self.patch(bus, name, self.timed(name, getattr(bus, name)))
+        for name in HELPERS:
+            if hasattr(bus, name):
+                self.patch(bus, name, self.wrap('bus.' + name, getattr(bus, name)))
+        for mpu in mpus:
+            for name in dir(mpu):
+                if name.startswith('_') or name == 'on_interrupt':     # not inside an interrupt handler
+                    continue
+                method = getattr(mpu, name)
+                if callable(method):
+                    self.patch(mpu, name, self.wrap(name, method))
+        return self
+
+    def wrap(self, name, method):
+        stack = self.stack
+        profiler = self
+
+        def wrapper(*args, **kwargs):
+            if not stack:
+                profiler.calls[name] = profiler.calls.get(name, 0) + 1
+            stack.append(name)
+            try:
+                result = method(*args, **kwargs)
+            finally:
+                stack.pop()
+            return profiled(stack, name, result)
+        return wrapper
+
+    def timed(self, name, primitive):
+        direction = WRITE if name == 'writeto_mem' else READ
+        profiler = self
+
+        def wrapper(dev_addr, reg_addr, data, *, addrsize=8):
+            if profiler.depth:
+                return primitive(dev_addr, reg_addr, data, addrsize=addrsize)
+            profiler.depth += 1
+            start = utime.ticks_us()
+            try:
+                result = primitive(dev_addr, reg_addr, data, addrsize=addrsize)
+            finally:
+                profiler.depth -= 1
+            elapsed = utime.ticks_diff(utime.ticks_us(), start)
+            length = data if isinstance(data, int) else len(data)
+            profiler.record(direction, reg_addr, length, elapsed)
+            return result
+        return wrapper
+
+    def record(self, direction, reg_addr, length, elapsed):
+        if direction == READ:
+            self.reads += 1
+            self.bytes_read += length
+        else:
+            self.writes += 1
+            self.bytes_written += length
+        stack = self.stack
+        api = stack[0] if stack else '-'
+        method = helper = '-'
+        for name in stack:
+            if name.startswith('bus.'):
+                helper = name[4:]
+            else:
+                method = name
+                helper = '-'
+        totals = self.apis.get(api)
+        if totals is None:
+            totals = self.apis[api] = [0, 0, 0, 0, 0]
+        totals[0] += 1
+        totals[1 if direction == READ else 2] += 1
+        totals[3] += length
+        totals[4] += elapsed
+        key = (api, method, helper, direction, reg_addr)
+        detail = self.details.get(key)
+        if detail is None:
+            detail = self.details[key] = [0, 0, 0]
+        detail[0] += 1
+        detail[1] += length
+        detail[2] += elapsed
+        if len(self.log) < self.log_limit:
+            self.log.append((api, method, helper, direction, reg_addr, length, elapsed))
+
+    def report(self, limit=20):
+        ''' Totals per API call, most bus time first, and the limit costliest method/register pairs '''
+        print(f"{'api call':32s} {'calls':>6s} {'trans':>7s} {'reads':>7s} {'writes':>7s} {'bytes':>8s}"
+              f" {'time us':>9s} {'us/call':>8s}")
+        for api, (transactions, reads, writes, length, us) in sorted(self.apis.items(), key=lambda item: -item[1][4]):
+            calls = self.calls.get(api, 0)
+            per_call = f"{us / calls:8.0f}" if calls else f"{'':8s}"
+            print(f"{api:32s} {calls:6d} {transactions:7d} {reads:7d} {writes:7d} {length:8d} {us:9d} {per_call}")
+        print()
+        print(f"{'api call':28s} {'method':28s} {'via':12s} {'':1s} {'reg':>4s} {'trans':>7s} {'bytes':>8s} {'time us':>9s}")
+        details = sorted(self.details.items(), key=lambda item: -item[1][2])
+        for (api, method, helper, direction, reg_addr), (transactions, length, us) in details[:limit]:
+            print(f"{api:28s} {method:28s} {helper:12s} {direction:1s} {reg_addr:#04x} {transactions:7d} {length:8d} {us:9d}")
@@ -0,0 +1,135 @@
+import json
+import utime
+#
+# Version 1.0 18-oct-2026
+#
+# Offset calibration of an MPU6050 at rest. Instead of the iterative PID loop
+# of the C++ library, the offsets follow in closed form from the mean of a
+# window of samples: with the sensor at rest the gyro should read 0 and the
+# accelerometer 1g along the vertical axis, so the mean error is the bias.
+# The offset registers have a fixed scale, independent of the full scale
+# ranges: 2048 LSB/g for the accelerometer and 32.8 LSB/dps for the gyro.
+# The offsets are applied in one pass and checked with a second window; a
+# further round only corrects what is left of the error.
+# The result can be saved to and reloaded from a json file, keyed on the I2C
+# address, so a unit does not need to be calibrated at every start-up.
+#
+
+ACCEL_OFFSET_LSB_PER_G    = 2048
+GYRO_OFFSET_LSB_PER_DPS   = 32.8
+ACCEL_REST_STD_G          = 0.03    # more noise than this means the sensor is moving
+GYRO_REST_STD_DPS         = 1.0
+ACCEL_TOLERANCE_G         = 0.005   # remaining mean error for a calibration to be accepted
+GYRO_TOLERANCE_DPS        = 0.1
+
+
+def collect(mpu, samples, period_us=None):
+    ''' Mean and standard deviation per axis (ax, ay, az, gx, gy, gz) of samples readings taken one
+        sample period apart, each with a single burst read. Nothing is kept per sample.
+    '''
+    if period_us is None:
+        period_us = mpu.get_sample_period_us()
+    sums = [0] * 6
+    squares = [0] * 6
+    next_time = utime.ticks_us()
+    for _ in range(samples):
+        wait = utime.ticks_diff(next_time, utime.ticks_us())
+        if wait > 0:
+            utime.sleep_us(wait)
+        next_time = utime.ticks_add(next_time, period_us)
+        reading = mpu.get_motion6()
+        for i in range(6):
+            sums[i] += reading[i]
+            squares[i] += reading[i] * reading[i]
+    means = [s / samples for s in sums]
+    deviations = [max(0, q / samples - m*m) ** 0.5 for q, m in zip(squares, means)]
+    return means, deviations
+
+
+class calibrator():
+    ''' Calibrates the offsets of an MPU6050 lying still, with gravity along gravity_axis (0, 1 or
+        2 for x, y or z; None picks the axis with the largest reading) pointing up.
+    '''
+    def __init__(self, mpu, samples=200, gravity_axis=None, max_rounds=3):
+        self.mpu = mpu
+        self.samples = samples
+        self.gravity_axis = gravity_axis
+        self.max_rounds = max_rounds
+        self.rounds = 0
+        self.samples_used = 0
+        self.residual = None        # remaining mean error per axis, in g and dps
+
+    def scales(self):
+        ''' LSB per g and per dps of the sensor readings at the current full scale ranges '''
+        accel_lsb = 16384 >> self.mpu.get_full_scale_accel_range()
+        gyro_lsb = 131 / (1 << self.mpu.get_full_scale_gyro_range())
+        return accel_lsb, gyro_lsb
+
+    def errors(self, means, accel_lsb, gyro_lsb):
+        ''' Mean error per axis in sensor LSB: the difference with 1g up and no rotation '''
+        if self.gravity_axis is None:
+            self.gravity_axis = max(range(3), key=lambda i: abs(means[i]))
+        expected = [0] * 6
+        expected[self.gravity_axis] = accel_lsb if means[self.gravity_axis] >= 0 else -accel_lsb
+        return [m - e for m, e in zip(means, expected)]
+
+    def calibrate(self):
+        ''' Returns the offsets (ax, ay, az, gx, gy, gz) left in the offset registers '''
+        mpu = self.mpu
+        accel_lsb, gyro_lsb = self.scales()
+        accel_factor = ACCEL_OFFSET_LSB_PER_G / accel_lsb           # offset LSB per sensor LSB
+        gyro_factor = GYRO_OFFSET_LSB_PER_DPS / gyro_lsb
+        period_us = mpu.get_sample_period_us()
+        offsets = list(mpu.get_offsets())
+        for rounds in range(1, self.max_rounds + 1):
+            self.rounds = rounds
+            means, deviations = collect(mpu, self.samples, period_us)
+            self.samples_used += self.samples
+            if max(deviations[0:3]) > ACCEL_REST_STD_G*accel_lsb or max(deviations[3:6]) > GYRO_REST_STD_DPS*gyro_lsb:
+                raise Exception("MPU6050 is not at rest, calibration aborted")
+            errors = self.errors(means, accel_lsb, gyro_lsb)
+            self.residual = [e / accel_lsb for e in errors[0:3]] + [e / gyro_lsb for e in errors[3:6]]
+            if rounds > 1 and self.converged():
+                return tuple(offsets)
+            for i in range(6):
+                offsets[i] -= round(errors[i] * (accel_factor if i < 3 else gyro_factor))
+                offsets[i] = max(-32768, min(32767, offsets[i]))
+            mpu.set_offsets(*offsets)
+            offsets = list(mpu.get_offsets())   # as written: set_offsets keeps the reserved bit 0 of the accel offsets
+        means, deviations = collect(mpu, self.samples, period_us)
+        self.samples_used += self.samples
+        errors = self.errors(means, accel_lsb, gyro_lsb)
+        self.residual = [e / accel_lsb for e in errors[0:3]] + [e / gyro_lsb for e in errors[3:6]]
+        if not self.converged():
+            raise Exception(f"calibration did not converge, remaining error {self.residual}")
+        return tuple(offsets)
+
+    def converged(self) -> bool:
+        return max(abs(e) for e in self.residual[0:3]) <= ACCEL_TOLERANCE_G and \
+               max(abs(e) for e in self.residual[3:6]) <= GYRO_TOLERANCE_DPS
+
+
+def save_calibration(mpu, offsets, path='/calibration.json'):
+    ''' Store the offsets of mpu in path, next to those of other devices already in it '''
+    try:
+        with open(path) as file:
+            stored = json.load(file)
+    except (OSError, ValueError):
+        stored = {}
+    stored[hex(mpu.address)] = list(offsets)
+    with open(path, 'w') as file:
+        json.dump(stored, file)
+
+def load_calibration(mpu, path='/calibration.json'):
+    ''' Write the offsets stored for mpu to its offset registers. Returns them, or None when there
+        are none stored, in which case the device has to be calibrated.
+    '''
+    try:
+        with open(path) as file:
+            offsets = json.load(file).get(hex(mpu.address))
+    except (OSError, ValueError):
+        return None
+    if offsets is None or len(offsets) != 6:
+        return None
+    mpu.set_offsets(*offsets)
+    return tuple(offsets)
@@ -0,0 +1,153 @@
+#
+# Version 1.0 18-oct-2026
+#
+# Quantities derived from a DMP packet, the dmpGetGravity, dmpGetYawPitchRoll,
+# dmpGetLinearAccel and dmpGetLinearAccelInWorld routines of the C++ library
+# (MotionApps 6.12). Each function takes a 28 byte packet (bytes, bytearray or
+# memoryview, e.g. from fifo_reader.next_packet) and writes its result into a
+# preallocated out, a list or array('i') of 3.
+#
+# Floats are heap objects on the Pico, so all arithmetic is on small integers
+# and nothing is allocated per call:
+#   quaternion    high words of the packet, 16384 = 1 (Q14)
+#   gravity       Q14, 16384 = 1g
+#   yaw/pitch/roll in 0.01 degree, from an integer CORDIC atan2
+#   accelerations raw DMP units, 8192 = 1g
+# For arrays of packets on the host see RaspberryPi/dmp_decode.py, which has the
+# same functions in float units and vectorized with numpy.
+#
+
+Q14 = 16384
+DMP_ACCEL_LSB_PER_G = 8192
+# atan(2^-i) in 0.0001 degree, for the CORDIC iterations
+ATAN_TABLE = (450000, 265651, 140362, 71250, 35763, 17899, 8952, 4476, 2238, 1119,
+              560, 280, 140, 70, 35, 17, 9, 4, 2, 1)
+CORDIC_BITS = 22                # operands are scaled up to this many bits
+
+
+def word(packet, index) -> int:
+    ''' Signed big endian 16 bit value at byte index '''
+    value = (packet[index] << 8) | packet[index + 1]
+    return value - 0x10000 if value & 0x8000 else value
+
+
+def get_quaternion(packet, out):
+    ''' w, x, y, z in Q14 into out (4 elements) '''
+    out[0] = word(packet, 0)
+    out[1] = word(packet, 4)
+    out[2] = word(packet, 8)
+    out[3] = word(packet, 12)
+
+
+def get_accel(packet, out):
+    out[0] = word(packet, 16)
+    out[1] = word(packet, 18)
+    out[2] = word(packet, 20)
+
+
+def get_gyro(packet, out):
+    out[0] = word(packet, 22)
+    out[1] = word(packet, 24)
+    out[2] = word(packet, 26)
+
+
+def get_gravity(packet, out):
+    ''' Direction of gravity in the sensor frame, Q14 '''
+    w = word(packet, 0)
+    x = word(packet, 4)
+    y = word(packet, 8)
+    z = word(packet, 12)
+    out[0] = (x*z - w*y) >> 13                      # 2(xz - wy)
+    out[1] = (w*x + y*z) >> 13                      # 2(wx + yz)
+    out[2] = (w*w - x*x - y*y + z*z) >> 14
+
+
+def atan2(y, x) -> int:
+    ''' atan2 in 0.01 degree, (-18000, 18000] '''
+    if x == 0 and y == 0:
+        return 0
+    angle = 0
+    if x < 0:                                       # CORDIC converges for x >= 0: rotate by 180
+        x = -x
+        y = -y
+        angle = 1800000
+    while -(1 << CORDIC_BITS) < x < (1 << CORDIC_BITS) and -(1 << CORDIC_BITS) < y < (1 << CORDIC_BITS):
+        x <<= 1
+        y <<= 1
+    for i in range(len(ATAN_TABLE)):
+        if y > 0:
+            x, y, angle = x + (y >> i), y - (x >> i), angle + ATAN_TABLE[i]
+        else:
+            x, y, angle = x - (y >> i), y + (x >> i), angle - ATAN_TABLE[i]
+    if angle > 1800000:
+        angle -= 3600000
+    angle = (angle + 50) // 100
+    return angle - 36000 if angle > 18000 else angle
+
+
+def isqrt(n) -> int:
+    ''' Integer square root of 0 <= n < 2^30 '''
+    if n <= 0:
+        return 0
+    x = 1 << 15
+    y = (x + n // x) >> 1
+    while y < x:
+        x = y
+        y = (x + n // x) >> 1
+    return x
+
+
+def get_yaw_pitch_roll(packet, out):
+    ''' Yaw, pitch and roll in 0.01 degree, as dmpGetYawPitchRoll of MotionApps 6.12: pitch
+        continues past 90 degrees when the sensor is upside down
+    '''
+    w = word(packet, 0)
+    x = word(packet, 4)
+    y = word(packet, 8)
+    z = word(packet, 12)
+    # yaw and roll from the products at full precision (Q28, halved), so they stay exact
+    # where both atan2 arguments are small; the squares for pitch are taken in Q14
+    gy = w*x + y*z
+    gz = (w*w - x*x - y*y + z*z) >> 1
+    out[0] = atan2(x*y - w*z, w*w + x*x - (1 << 27))   # 2xy - 2wz, 2w^2 + 2x^2 - 1
+    out[2] = atan2(gy, gz)
+    gy >>= 13
+    gz >>= 13
+    pitch = atan2((x*z - w*y) >> 13, isqrt(gy*gy + gz*gz))
+    if gz < 0:
+        pitch = 18000 - pitch if pitch > 0 else -18000 - pitch
+    out[1] = pitch
+
+
+def get_linear_accel(packet, out):
+    ''' Acceleration without gravity in the sensor frame, raw units (8192 = 1g) '''
+    w = word(packet, 0)
+    x = word(packet, 4)
+    y = word(packet, 8)
+    z = word(packet, 12)
+    # gravity in Q14 is twice the raw accel units: 2(xz - wy) >> 14 >> 1 = (xz - wy) >> 14
+    out[0] = word(packet, 16) - ((x*z - w*y) >> 14)
+    out[1] = word(packet, 18) - ((w*x + y*z) >> 14)
+    out[2] = word(packet, 20) - ((w*w - x*x - y*y + z*z) >> 15)
+
+
+def get_linear_accel_in_world(packet, out):
+    ''' Acceleration without gravity in the world frame, raw units: the linear acceleration
+        rotated by the quaternion, v + 2w(u x v) + 2u x (u x v) with u = (x, y, z). The
+        quaternion is taken in Q13 here, so the products stay small integers for linear
+        accelerations up to 4g.
+    '''
+    get_linear_accel(packet, out)
+    vx = out[0]
+    vy = out[1]
+    vz = out[2]
+    w = (word(packet, 0) + 1) >> 1
+    x = (word(packet, 4) + 1) >> 1
+    y = (word(packet, 8) + 1) >> 1
+    z = (word(packet, 12) + 1) >> 1
+    tx = (y*vz - z*vy + 2048) >> 12                 # t = 2(u x v)
+    ty = (z*vx - x*vz + 2048) >> 12
+    tz = (x*vy - y*vx + 2048) >> 12
+    out[0] = vx + ((w*tx + y*tz - z*ty + 4096) >> 13)   # v + w t + u x t
+    out[1] = vy + ((w*ty + z*tx - x*tz + 4096) >> 13)
+    out[2] = vz + ((w*tz + x*ty - y*tx + 4096) >> 13)
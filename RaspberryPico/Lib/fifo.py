@@ -0,0 +1,105 @@
+import utime
+#
+# Version 1.0 18-oct-2026
+#
+# Allocation free reading of the MPU6050 FIFO. All buffers and memoryviews are
+# created once, the FIFO is read with readfrom_mem_into straight into them.
+#
+
+FIFO_SIZE = 1024    # bytes in the MPU6050 hardware FIFO
+
+
+class fifo_reader():
+    ''' Drains the FIFO of an MPU6050 object into a preallocated ring buffer of whole packets.
+        The ring holds as many packets as fit in the 1024 byte hardware FIFO, so a packet never
+        wraps around the end of the buffer and can be handed out as a memoryview of its slot.
+        A view stays valid until its slot is reused by a later fill().
+    '''
+    def __init__(self, mpu, packet_size, chunk_packets=5):
+        self.mpu = mpu
+        self.packet_size = packet_size
+        self.slots = FIFO_SIZE // packet_size
+        self.chunk_packets = min(chunk_packets, self.slots)   # limit per read to avoid timeouts at low busfrequencies
+        self.buffer = bytearray(self.slots * packet_size)
+        # Slicing a memoryview allocates on micropython, so all views are made here
+        view = memoryview(self.buffer)
+        self.packet_views = [view[i*packet_size:(i+1)*packet_size] for i in range(self.slots)]
+        self.chunk_views = [view[i*packet_size:(i+self.chunk_packets)*packet_size]
+                            for i in range(self.slots - self.chunk_packets + 1)]
+        scratch = memoryview(bytearray(self.chunk_packets * packet_size))
+        self.scratch_chunk = scratch
+        self.scratch_packet = scratch[:packet_size]
+        self.head = 0       # slot of the oldest packet in the ring
+        self.count = 0      # number of packets in the ring
+        self.overruns = 0   # packets dropped because the ring was full
+
+    def packets_available(self) -> int:
+        return self.count
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+
+    def fill(self, fifo_count=None) -> int:
+        ''' Move all complete packets from the hardware FIFO into the ring, in chunks of at most
+            chunk_packets per bus transaction. Returns the number of packets read.
+        '''
+        if fifo_count is None:
+            fifo_count = self.mpu.get_fifo_count()
+        packets = fifo_count // self.packet_size
+        slots = self.slots
+        k = self.chunk_packets
+        read = 0
+        if self.count == 0:
+            self.head = 0       # start at slot 0 when empty so reads stay in full chunks
+        while read < packets:
+            if self.count == slots:                  # ring full, the oldest packet makes way
+                self.head = (self.head + 1) % slots
+                self.count -= 1
+                self.overruns += 1
+            tail = (self.head + self.count) % slots
+            if packets - read >= k and tail + k <= slots and slots - self.count >= k:
+                self.mpu.get_fifo_bytes_into(self.chunk_views[tail])
+                n = k
+            else:
+                self.mpu.get_fifo_bytes_into(self.packet_views[tail])
+                n = 1
+            self.count += n
+            read += n
+        return read
+
+    def next_packet(self):
+        ''' Oldest packet in the ring as a memoryview, or None when the ring is empty '''
+        if self.count == 0:
+            return None
+        view = self.packet_views[self.head]
+        self.head = (self.head + 1) % self.slots
+        self.count -= 1
+        return view
+
+    def discard(self, packets):
+        ''' Remove packets from the hardware FIFO without allocating, reading them into scratch space '''
+        while packets >= self.chunk_packets:
+            self.mpu.get_fifo_bytes_into(self.scratch_chunk)
+            packets -= self.chunk_packets
+        while packets > 0:
+            self.mpu.get_fifo_bytes_into(self.scratch_packet)
+            packets -= 1
+
+    def latest_packet(self, timeout_ms=None):
+        ''' Allocation free counterpart of MPU6050.get_current_fifo_packet: drop all but the newest
+            packet in the hardware FIFO and return that one as a memoryview. The view is only
+            valid until the next call of latest_packet or discard.
+        '''
+        break_timer = utime.ticks_ms()
+        while True:
+            packets = self.mpu.get_fifo_count() // self.packet_size
+            if packets > 0:
+                self.discard(packets - 1)
+                self.mpu.get_fifo_bytes_into(self.scratch_packet)
+                return self.scratch_packet
+            if timeout_ms is None:
+                timeout_ms = self.mpu.get_packet_timeout_ms()
+            if utime.ticks_diff(utime.ticks_ms(), break_timer) > timeout_ms:
+                raise Exception('Timeout waiting for next packet')
+            utime.sleep_us(500)
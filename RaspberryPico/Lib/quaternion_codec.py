@@ -0,0 +1,171 @@
+#
+# Version 1.0 18-oct-2026
+#
+# Compact coding of a stream of DMP quaternions for streaming every sample or
+# storing it to flash. The encoder runs on micropython, the decoder on CPython.
+#
+# Quaternions are taken as the raw 16 bit components of the DMP (scale 16384)
+# and coded "smallest three": the largest component is dropped (and made
+# positive, q and -q are the same rotation) and the other three are quantized
+# with a step of quantum raw units. The error per coded component is at most
+# quantum/2 raw units; the dropped one follows from the unit norm.
+# Every frame starts with a header byte: bits 7-6 the frame type, bits 1-0 the
+# index of the dropped component.
+#   KEY    three quantized components as zigzag varints
+#   DELTA  three differences with the previous frame as zigzag varints
+#   SMALL  differences in -8..7: first in header bits 5-2, the other two in one byte
+#   ZERO   no change, header only
+# A KEY frame is sent at the start, every keyframe_interval samples and whenever
+# the dropped component changes. Differences are taken between quantized values,
+# which both sides know exactly, so errors do not accumulate.
+#
+
+KEY   = 0x80
+DELTA = 0x00
+SMALL = 0x40
+ZERO  = 0xC0
+RAW_SCALE = 16384
+
+
+def zigzag(n) -> int:
+    return n << 1 if n >= 0 else ((-n) << 1) - 1
+
+def unzigzag(n) -> int:
+    return n >> 1 if not n & 1 else -((n + 1) >> 1)
+
+def write_varint(out, offset, n) -> int:
+    while n > 0x7F:
+        out[offset] = (n & 0x7F) | 0x80
+        n >>= 7
+        offset += 1
+    out[offset] = n
+    return offset + 1
+
+
+class quaternion_encoder():
+    ''' Codes quaternions into a caller supplied bytearray, at most MAX_FRAME bytes per sample.
+        A frame never depends on more than the frames since the last KEY frame.
+    '''
+    MAX_FRAME = 10
+
+    def __init__(self, quantum=4, keyframe_interval=100):
+        self.quantum = quantum
+        self.keyframe_interval = keyframe_interval
+        self.since_key = keyframe_interval      # forces a KEY frame first
+        self.index = -1
+        self.previous = [0, 0, 0]
+        self.current = [0, 0, 0]
+
+    def encode_packet(self, packet, out, offset) -> int:
+        ''' Code the quaternion of a 28 byte DMP packet. Returns the offset after the frame '''
+        w = packet[0] << 8 | packet[1]
+        x = packet[4] << 8 | packet[5]
+        y = packet[8] << 8 | packet[9]
+        z = packet[12] << 8 | packet[13]
+        return self.encode(w - 65536 if w > 32767 else w, x - 65536 if x > 32767 else x,
+                           y - 65536 if y > 32767 else y, z - 65536 if z > 32767 else z, out, offset)
+
+    def encode(self, w, x, y, z, out, offset) -> int:
+        ''' Code a quaternion of raw components. Returns the offset after the frame '''
+        aw, ax, ay, az = abs(w), abs(x), abs(y), abs(z)
+        if aw >= ax and aw >= ay and aw >= az:
+            index, sign, a, b, c = 0, w, x, y, z
+        elif ax >= ay and ax >= az:
+            index, sign, a, b, c = 1, x, w, y, z
+        elif ay >= az:
+            index, sign, a, b, c = 2, y, w, x, z
+        else:
+            index, sign, a, b, c = 3, z, w, x, y
+        if sign < 0:
+            a, b, c = -a, -b, -c
+        half = self.quantum >> 1
+        current = self.current
+        current[0] = (a + half) // self.quantum
+        current[1] = (b + half) // self.quantum
+        current[2] = (c + half) // self.quantum
+        previous = self.previous
+
+        if index != self.index or self.since_key >= self.keyframe_interval:
+            out[offset] = KEY | index
+            offset += 1
+            for i in range(3):
+                offset = write_varint(out, offset, zigzag(current[i]))
+            self.since_key = 0
+        else:
+            d0 = current[0] - previous[0]
+            d1 = current[1] - previous[1]
+            d2 = current[2] - previous[2]
+            if d0 == 0 and d1 == 0 and d2 == 0:
+                out[offset] = ZERO | index
+                offset += 1
+            elif -8 <= d0 <= 7 and -8 <= d1 <= 7 and -8 <= d2 <= 7:
+                out[offset] = SMALL | (d0 & 0x0F) << 2 | index
+                out[offset + 1] = (d1 & 0x0F) << 4 | (d2 & 0x0F)
+                offset += 2
+            else:
+                out[offset] = DELTA | index
+                offset = write_varint(out, offset + 1, zigzag(d0))
+                offset = write_varint(out, offset, zigzag(d1))
+                offset = write_varint(out, offset, zigzag(d2))
+            self.since_key += 1
+        self.index = index
+        previous[0], previous[1], previous[2] = current[0], current[1], current[2]
+        return offset
+
+
+class quaternion_decoder():
+    ''' Turns a stream of frames back into (w, x, y, z) float quaternions. After reset(), e.g.
+        when a datagram was lost, frames are skipped until the next KEY frame.
+    '''
+    def __init__(self, quantum=4):
+        self.quantum = quantum
+        self.synchronised = False
+        self.values = [0, 0, 0]
+        self.skipped = 0
+
+    def reset(self):
+        self.synchronised = False
+
+    def decode(self, data):
+        quaternions = []
+        offset = 0
+        while offset < len(data):
+            header = data[offset]
+            offset += 1
+            frame_type = header & 0xC0
+            index = header & 0x03
+            if frame_type == KEY or frame_type == DELTA:
+                numbers = []
+                for _ in range(3):
+                    n = shift = 0
+                    while True:
+                        byte = data[offset]
+                        offset += 1
+                        n |= (byte & 0x7F) << shift
+                        shift += 7
+                        if not byte & 0x80:
+                            break
+                    numbers.append(unzigzag(n))
+                if frame_type == KEY:
+                    self.values = numbers
+                    self.synchronised = True
+                else:
+                    self.values = [v + d for v, d in zip(self.values, numbers)]
+            elif frame_type == SMALL:
+                d0 = (header >> 2) & 0x0F
+                d1 = data[offset] >> 4
+                d2 = data[offset] & 0x0F
+                offset += 1
+                self.values = [v + (d - 16 if d > 7 else d) for v, d in zip(self.values, (d0, d1, d2))]
+            if not self.synchronised:
+                self.skipped += 1
+                continue
+            quaternions.append(self.quaternion(index))
+        return quaternions
+
+    def quaternion(self, index):
+        scale = self.quantum / RAW_SCALE
+        three = [v * scale for v in self.values]
+        largest = max(0.0, 1.0 - sum(c*c for c in three)) ** 0.5
+        three.insert(index, largest)
+        return tuple(three)
@@ -0,0 +1,281 @@
+import struct
+import utime
+import MPUregisters as MPUreg
+from fifo import FIFO_SIZE
+try:
+    from binascii import crc32
+except ImportError:
+    from MPU6050 import crc32
+#
+# Version 1.0 18-oct-2026
+#
+# Recording of DMP packets to a file, for capturing motion bursts on the Pico
+# when there is no network. The hardware FIFO is read straight into a ring of
+# preallocated blocks in RAM; while armed the ring holds the packets before the
+# trigger, once triggered every block is written to the file with a single
+# write. Nothing is allocated per packet.
+#
+# File: append-only sequence of BLOCK_SIZE byte blocks
+#   header  4s  magic b'MPRB'
+#           B   version
+#           B   packet size
+#           B   flags, see BLOCK_START, BLOCK_TRIGGER, BLOCK_GAP
+#           x   (padding)
+#           H   number of packets in the block
+#           H   index of the trigger packet in the block, NO_TRIGGER when there is none
+#           I   sequence number of the first packet
+#           I   timestamp of the first packet, ticks_us (wraps at 2**30 on the Pico)
+#           I   sample period in us, packet i was taken at timestamp + i*period
+#           I   CRC32 of the whole block except this field
+#   packets count x packet size bytes, the rest of the block is zero
+#
+
+MAGIC       = b'MPRB'
+VERSION     = 1
+HEADER      = '>4sBBBxHHIIII'
+HEADER_SIZE = struct.calcsize(HEADER)
+CRC_OFFSET  = HEADER_SIZE - 4
+BLOCK_SIZE  = 4096          # one flash sector
+NO_TRIGGER  = 0xFFFF
+
+BLOCK_START   = 0x01        # first block of a recording
+BLOCK_TRIGGER = 0x02        # holds a packet during which the motion interrupt fired
+BLOCK_GAP     = 0x04        # packets were lost just before this block (FIFO overflow)
+
+MOTION_STATUS   = 1 << MPUreg.INTERRUPT_MOT_BIT
+OVERFLOW_STATUS = 1 << MPUreg.INTERRUPT_FIFO_OFLOW_BIT
+
+
+def block_crc(block) -> int:
+    view = memoryview(block)
+    return crc32(view[HEADER_SIZE:], crc32(view[:CRC_OFFSET])) & 0xFFFFFFFF
+
+def decode_block(block):
+    ''' Returns (flags, trigger_index, sequence, timestamp_us, period_us, packets) for a block read
+        from a recording, packets being a memoryview of count x packet size bytes.
+    '''
+    if len(block) != BLOCK_SIZE:
+        raise Exception("recording block has incorrect length")
+    magic, version, packet_size, flags, count, trigger_index, sequence, timestamp_us, period_us, crc = \
+        struct.unpack_from(HEADER, block)
+    if magic != MAGIC or version != VERSION:
+        raise Exception(f"not a version {VERSION} recording block")
+    if crc != block_crc(block):
+        raise Exception(f"CRC error in recording block of sequence {sequence}")
+    packets = memoryview(block)[HEADER_SIZE:HEADER_SIZE + count*packet_size]
+    return flags, trigger_index, sequence, timestamp_us, period_us, packets
+
+
+class motion_recorder():
+    ''' Records the DMP packets of an initialised MPU6050_DMP to file, which only needs a write()
+        method, e.g. open(path, 'ab'). Call service() at least every few sample periods, or run().
+        A recording holds at least pretrigger_packets before the trigger and ends
+        posttrigger_packets after the last trigger; a trigger during a recording extends it.
+        The ring needs room for the pre-trigger packets plus one block to fill while another one
+        is written. Sustaining the sample rate requires a block write to finish before the
+        hardware FIFO fills up: 36 packets, 180 ms at 200Hz. The longest write is kept in
+        max_write_us.
+    '''
+    def __init__(self, mpu, file, pretrigger_packets=100, posttrigger_packets=600, ring_blocks=3, chunk_packets=5):
+        self.mpu = mpu
+        self.file = file
+        self.packet_size = packet_size = mpu.dmp_get_fifo_packet_size()
+        self.capacity = capacity = (BLOCK_SIZE - HEADER_SIZE) // packet_size
+        if ring_blocks < (pretrigger_packets + capacity - 1) // capacity + 2:
+            raise Exception(f"{ring_blocks} ring blocks of {capacity} packets cannot hold {pretrigger_packets} pre-trigger packets")
+        self.pretrigger_packets = pretrigger_packets
+        self.posttrigger_packets = posttrigger_packets
+        self.ring_blocks = ring_blocks
+        self.chunk_packets = k = min(chunk_packets, capacity)
+        self.period_us = mpu.get_sample_period_us()
+        # All buffers and views are made here, slicing a memoryview allocates on micropython
+        self.blocks = [bytearray(BLOCK_SIZE) for _ in range(ring_blocks)]
+        self.packet_views = []
+        self.chunk_views = []
+        for block in self.blocks:
+            view = memoryview(block)
+            self.packet_views.append([view[HEADER_SIZE + i*packet_size:HEADER_SIZE + (i+1)*packet_size]
+                                      for i in range(capacity)])
+            self.chunk_views.append([view[HEADER_SIZE + i*k*packet_size:HEADER_SIZE + (i+1)*k*packet_size]
+                                     for i in range(capacity // k)])
+        self.block_sequence  = [0] * ring_blocks
+        self.block_timestamp = [0] * ring_blocks
+        self.block_count     = [0] * ring_blocks
+        self.block_flags     = [0] * ring_blocks
+        self.block_trigger   = [NO_TRIGGER] * ring_blocks
+        # Blocks are numbered from the start, block n is in slot n % ring_blocks
+        self.head = 0               # oldest block held in the ring
+        self.tail = 0               # block being filled, head..tail-1 are complete
+        self.write_end = 0          # blocks before this one are to be written
+        self.fill = 0               # packets in the block being filled
+        self.next_flags = 0         # flags for the next block to be started
+        self.sequence = 0           # sequence number of the next packet
+        self.last_read = None       # time of the last read of the FIFO
+        self.recording = False
+        self.stop_sequence = 0
+        self.recordings = 0
+        self.blocks_written = 0
+        self.packets_lost = 0       # estimated, in FIFO overflows
+        self.overflows = 0
+        self.max_write_us = 0
+
+    def arm_motion(self, threshold=20, duration=1):
+        ''' Trigger on the motion interrupt: acceleration above threshold (2mg/LSB) for duration ms.
+            Uses the 5Hz high pass filter of the motion detector.
+        '''
+        self.mpu.set_DHPF_mode(1)
+        self.mpu.set_motion_detection_threshold(bytes([threshold]))
+        self.mpu.set_motion_detection_duration(bytes([duration]))
+        self.mpu.set_int_motion_enabled(True)
+
+    def start(self):
+        self.period_us = self.mpu.get_sample_period_us()
+        self.mpu.reset_fifo()
+        self.last_read = utime.ticks_us()
+
+    def trigger(self):
+        ''' Start a recording at the newest packet read, or extend the one in progress '''
+        trigger_sequence = self.sequence - 1
+        self.stop_sequence = trigger_sequence + 1 + self.posttrigger_packets
+        if self.fill > 0:
+            slot = self.tail % self.ring_blocks
+        elif self.tail > self.head:
+            slot = (self.tail - 1) % self.ring_blocks
+        else:
+            slot = None             # nothing read yet: the next block starts the recording
+        if slot is not None and not self.block_flags[slot] & BLOCK_TRIGGER:
+            self.block_flags[slot] |= BLOCK_TRIGGER
+            self.block_trigger[slot] = trigger_sequence - self.block_sequence[slot]
+        if self.recording:
+            return
+        # Drop the blocks that end before the pre-trigger part of the recording
+        first = trigger_sequence - self.pretrigger_packets
+        ring_blocks = self.ring_blocks
+        while self.head < self.tail and self.head >= self.write_end and \
+              self.block_sequence[self.head % ring_blocks] + self.block_count[self.head % ring_blocks] <= first:
+            self.head += 1
+        start = max(self.head, self.write_end)
+        if start < self.tail or self.fill > 0:
+            self.block_flags[start % ring_blocks] |= BLOCK_START
+        else:
+            self.next_flags |= BLOCK_START
+        self.write_end = self.tail
+        self.recording = True
+        self.recordings += 1
+
+    def close_block(self):
+        slot = self.tail % self.ring_blocks
+        self.block_count[slot] = self.fill
+        for i in range(HEADER_SIZE + self.fill*self.packet_size, BLOCK_SIZE):
+            self.blocks[slot][i] = 0            # only for a partial block, at the end of a recording
+        self.tail += 1
+        self.fill = 0
+        if self.recording:
+            self.write_end = self.tail
+
+    def read(self, packets, read_time) -> int:
+        ''' Read packets from the hardware FIFO into the ring. Returns the number read, which is
+            less when the ring is full of blocks waiting to be written.
+        '''
+        ring_blocks = self.ring_blocks
+        capacity = self.capacity
+        k = self.chunk_packets
+        read = 0
+        while read < packets:
+            if self.fill == 0:
+                if self.tail - self.head == ring_blocks:
+                    if self.head < self.write_end:
+                        break                   # wait for a block to be written
+                    self.head += 1              # drop the oldest pre-trigger block
+                slot = self.tail % ring_blocks
+                self.block_sequence[slot] = self.sequence
+                self.block_timestamp[slot] = utime.ticks_add(read_time, -(packets - 1 - read)*self.period_us)
+                self.block_flags[slot] = self.next_flags
+                self.block_trigger[slot] = NO_TRIGGER
+                self.next_flags = 0
+            slot = self.tail % ring_blocks
+            if self.fill % k == 0 and capacity - self.fill >= k and packets - read >= k:
+                self.mpu.get_fifo_bytes_into(self.chunk_views[slot][self.fill // k])
+                n = k
+            else:
+                self.mpu.get_fifo_bytes_into(self.packet_views[slot][self.fill])
+                n = 1
+            self.fill += n
+            self.sequence += n
+            read += n
+            if self.fill == capacity:
+                self.close_block()
+            if self.recording and self.sequence >= self.stop_sequence:
+                if self.fill > 0:
+                    self.close_block()
+                self.recording = False
+        return read
+
+    def overflow(self, read_time):
+        ''' The FIFO overflowed and lost its packet boundaries: reset it and skip the lost packets '''
+        self.mpu.reset_fifo()
+        self.overflows += 1
+        if self.fill > 0:
+            self.close_block()
+        self.next_flags |= BLOCK_GAP
+        lost = utime.ticks_diff(read_time, self.last_read) // self.period_us
+        self.sequence += lost
+        self.packets_lost += lost
+
+    def write_block(self) -> bool:
+        ''' Write the oldest block waiting to be written, if any '''
+        if self.head >= self.write_end:
+            return False
+        slot = self.head % self.ring_blocks
+        block = self.blocks[slot]
+        struct.pack_into(HEADER, block, 0, MAGIC, VERSION, self.packet_size, self.block_flags[slot],
+                         self.block_count[slot], self.block_trigger[slot], self.block_sequence[slot],
+                         self.block_timestamp[slot], self.period_us, 0)
+        struct.pack_into('>I', block, CRC_OFFSET, block_crc(block))
+        start = utime.ticks_us()
+        self.file.write(block)
+        self.max_write_us = max(self.max_write_us, utime.ticks_diff(utime.ticks_us(), start))
+        self.head += 1
+        self.blocks_written += 1
+        return True
+
+    def service(self) -> int:
+        ''' Read the FIFO, check for a trigger and write at most one block. Returns the number of
+            packets read.
+        '''
+        mpu = self.mpu
+        if self.last_read is None:
+            self.start()
+        status = mpu.get_int_status()
+        fifo_count = mpu.get_fifo_count()
+        read_time = utime.ticks_us()
+        read = 0
+        if fifo_count >= FIFO_SIZE or status & OVERFLOW_STATUS:
+            self.overflow(read_time)
+        else:
+            read = self.read(fifo_count // self.packet_size, read_time)
+        self.last_read = read_time
+        if status & MOTION_STATUS and self.sequence > 0:
+            self.trigger()
+        self.write_block()
+        return read
+
+    def flush(self):
+        ''' End a recording in progress and write all its blocks '''
+        if self.recording:
+            if self.fill > 0:
+                self.close_block()
+            self.recording = False
+        while self.write_block():
+            pass
+        if hasattr(self.file, 'flush'):
+            self.file.flush()
+
+    def run(self, duration_ms=None):
+        ''' Service the MPU until duration_ms has passed (forever when None), then flush '''
+        start = utime.ticks_ms()
+        sleep_us = min(2000, self.period_us)
+        while duration_ms is None or utime.ticks_diff(utime.ticks_ms(), start) < duration_ms:
+            if self.service() == 0:
+                utime.sleep_us(sleep_us)
+        self.flush()
@@ -0,0 +1,115 @@
+import utime
+from fifo import FIFO_SIZE
+#
+# Version 1.0 18-oct-2026
+#
+# Several MPU6050_DMP objects, at 0x68 and 0x69 and/or on both I2C controllers,
+# serviced together and delivered as time-aligned sets of DMP packets.
+#
+
+ROUND_ROBIN = 0     # service the devices in turn, starting one further every call
+FILL_LEVEL  = 1     # service the device with the fullest FIFO first
+
+
+class SensorArray():
+    ''' Owns a number of initialised MPU6050_DMP objects running at the same sample rate.
+        service() moves the packets of all hardware FIFOs into the fifo_reader rings of the
+        devices, samples() yields (timestamp_us, [packet, ...]) with one packet per device
+        sampled within half a sample period of each other. Packets are memoryviews that are
+        valid until the next service().
+    '''
+    def __init__(self, devices, schedule=FILL_LEVEL):
+        self.devices = list(devices)
+        self.schedule = schedule
+        self.next_device = 0
+        self.timestamps = [[] for _ in self.devices]     # per device, one entry per packet in its ring
+        self.period_us = [0] * len(self.devices)
+        self.counts = [0] * len(self.devices)
+        self.overflows = 0      # hardware FIFO overflows, the FIFO is reset and its packets are lost
+        self.unaligned = 0      # packets dropped because no other device had a matching packet
+
+    def start(self):
+        ''' Reset all FIFOs in quick succession so the devices start streaming (nearly) in phase '''
+        for i, device in enumerate(self.devices):
+            self.period_us[i] = device.get_sample_period_us()
+            device.fifo.clear()
+            self.timestamps[i] = []
+        for device in self.devices:
+            device.reset_fifo()
+
+    def service(self) -> int:
+        ''' Read the FIFO of every device once, in the order set by the schedule. Returns the
+            number of packets read.
+        '''
+        n = len(self.devices)
+        if self.schedule == FILL_LEVEL:
+            for i in range(n):
+                self.counts[i] = self.devices[i].get_fifo_count()
+            order = sorted(range(n), key=lambda i: -self.counts[i])
+        else:
+            order = [(self.next_device + i) % n for i in range(n)]
+            self.next_device = (self.next_device + 1) % n
+        read = 0
+        for i in order:
+            count = self.counts[i] if self.schedule == FILL_LEVEL else None
+            read += self.service_device(i, count)
+        return read
+
+    def service_device(self, i, fifo_count=None) -> int:
+        device = self.devices[i]
+        fifo = device.fifo
+        if fifo_count is None:
+            fifo_count = device.get_fifo_count()
+        read_time = utime.ticks_us()
+        if fifo_count >= FIFO_SIZE:
+            device.reset_fifo()
+            self.overflows += 1
+            return 0
+        overruns = fifo.overruns
+        packets = fifo.fill(fifo_count)
+        timestamps = self.timestamps[i]
+        del timestamps[:fifo.overruns - overruns]          # ring was full, its oldest packets are gone
+        period_us = self.period_us[i]
+        for j in range(packets):
+            timestamps.append(utime.ticks_add(read_time, -(packets - 1 - j)*period_us))
+        return packets
+
+    def aligned(self):
+        ''' The next time-aligned set from the packets already read, or None '''
+        tolerance = max(self.period_us) // 2
+        while True:
+            if not all(self.timestamps):
+                return None
+            reference = self.timestamps[0][0]
+            for timestamps in self.timestamps:
+                if utime.ticks_diff(timestamps[0], reference) > 0:
+                    reference = timestamps[0]                 # the newest of the oldest packets
+            complete = True
+            for i, timestamps in enumerate(self.timestamps):
+                if utime.ticks_diff(reference, timestamps[0]) > tolerance:
+                    timestamps.pop(0)                         # too old to pair with the others
+                    self.devices[i].fifo.next_packet()
+                    self.unaligned += 1
+                    complete = False
+            if complete:
+                packets = []
+                for i, timestamps in enumerate(self.timestamps):
+                    timestamps.pop(0)
+                    packets.append(self.devices[i].fifo.next_packet())
+                return (reference, packets)
+
+    def samples(self):
+        ''' Generator of time-aligned sets, servicing the devices when no complete set is left '''
+        if 0 in self.period_us:
+            self.start()
+        timeout_ms = max(device.get_packet_timeout_ms() for device in self.devices)
+        break_timer = utime.ticks_ms()
+        while True:
+            sample_set = self.aligned()
+            if sample_set is not None:
+                break_timer = utime.ticks_ms()
+                yield sample_set
+            elif self.service() == 0:
+                if utime.ticks_diff(utime.ticks_ms(), break_timer) > timeout_ms:
+                    raise Exception('Timeout waiting for next packet')
+                utime.sleep_us(500)
@@ -0,0 +1,113 @@
+import struct
+#
+# Version 1.0 18-oct-2026
+#
+# Binary telemetry datagrams for DMP samples, replacing one JSON datagram per
+# sample. Runs on micropython (encoder) and CPython (decoder).
+#
+# Datagram: header followed by count samples
+#   header  2s  magic b'MP'
+#           B   version
+#           B   device id
+#           B   number of samples
+#           x   (padding)
+#           I   sequence number of the first sample
+#           I   timestamp of the first sample, sender ticks_us (wraps at 2**30 on the Pico)
+#           I   sample period in us, sample i was taken at timestamp + i*period
+#   sample  10 x int16: quaternion w, x, y, z (scale 16384), accel x, y, z, gyro x, y, z
+#
+
+MAGIC   = b'MP'
+VERSION = 1
+HEADER  = '>2sBBBxIII'
+HEADER_SIZE = struct.calcsize(HEADER)
+SAMPLE  = '>10h'
+SAMPLE_SIZE = struct.calcsize(SAMPLE)
+QUATERNION_SCALE = 16384.0
+TICKS_PERIOD = 1 << 30      # sender timestamps wrap around at this value
+
+# Bytes of a 28 byte DMP packet that make up a sample: the high words of the
+# 32 bit quaternion components, then accel and gyro
+SAMPLE_OFFSETS = (0, 1, 4, 5, 8, 9, 12, 13, 16, 17, 18, 19, 20, 21, 22, 23, 24, 25, 26, 27)
+
+
+class telemetry_encoder():
+    ''' Collects DMP packets of consecutive samples into a preallocated datagram.
+        add() returns the datagram once it holds samples_per_datagram samples. After a gap in
+        the sequence (e.g. a FIFO overflow reported by MPU6050_DMP.iter_packets) call flush()
+        to send the partial datagram first. Returned datagrams are memoryviews that are
+        reused for the next datagram.
+    '''
+    def __init__(self, device_id=0, samples_per_datagram=8, period_us=5000):
+        self.device_id = device_id
+        self.samples_per_datagram = samples_per_datagram
+        self.period_us = period_us
+        self.datagram = bytearray(HEADER_SIZE + samples_per_datagram*SAMPLE_SIZE)
+        self.views = [memoryview(self.datagram)[:HEADER_SIZE + n*SAMPLE_SIZE]
+                      for n in range(samples_per_datagram + 1)]
+        self.count = 0
+        self.sequence = 0
+        self.timestamp_us = 0
+
+    def add(self, sequence, timestamp_us, packet):
+        if self.count == 0:
+            self.sequence = sequence
+            self.timestamp_us = timestamp_us
+        datagram = self.datagram
+        offset = HEADER_SIZE + self.count*SAMPLE_SIZE
+        for i in range(SAMPLE_SIZE):
+            datagram[offset + i] = packet[SAMPLE_OFFSETS[i]]
+        self.count += 1
+        if self.count == self.samples_per_datagram:
+            return self.flush()
+        return None
+
+    def flush(self):
+        ''' The datagram with the samples collected so far, or None when there are none '''
+        if self.count == 0:
+            return None
+        struct.pack_into(HEADER, self.datagram, 0, MAGIC, VERSION, self.device_id, self.count,
+                         self.sequence, self.timestamp_us, self.period_us)
+        view = self.views[self.count]
+        self.count = 0
+        return view
+
+
+def decode(datagram):
+    ''' Returns (device_id, sequence, timestamp_us, period_us, samples) where samples is a list
+        of raw 10-tuples (quaternion w, x, y, z, accel x, y, z, gyro x, y, z)
+    '''
+    if len(datagram) < HEADER_SIZE:
+        raise Exception("telemetry datagram too short")
+    magic, version, device_id, count, sequence, timestamp_us, period_us = struct.unpack_from(HEADER, datagram)
+    if magic != MAGIC or version != VERSION:
+        raise Exception(f"not a version {VERSION} telemetry datagram")
+    if len(datagram) != HEADER_SIZE + count*SAMPLE_SIZE:
+        raise Exception("telemetry datagram has incorrect length")
+    samples = [struct.unpack_from(SAMPLE, datagram, HEADER_SIZE + i*SAMPLE_SIZE) for i in range(count)]
+    return device_id, sequence, timestamp_us, period_us, samples
+
+
+class sequence_tracker():
+    ''' Loss detection on the receiving side, from the sequence numbers per device '''
+    def __init__(self):
+        self.expected = {}          # device id: next expected sequence number
+        self.received = 0
+        self.lost = 0
+        self.out_of_order = 0
+
+    def update(self, device_id, sequence, count) -> bool:
+        ''' Account for a datagram of count samples. Returns False for a datagram that arrived
+            out of order (older than one already received), which should be ignored.
+        '''
+        expected = self.expected.get(device_id)
+        if sequence == 0:
+            expected = None         # the sender restarted
+        if expected is not None and sequence < expected:
+            self.out_of_order += 1
+            return False
+        if expected is not None:
+            self.lost += sequence - expected
+        self.expected[device_id] = sequence + count
+        self.received += count
+        return True
@@ -0,0 +1,414 @@
+import math
+import struct
+import MPUregisters as MPUreg
+from bus import bus
+#
+# Version 1.0 18-oct-2026
+#
+# A virtual MPU6050 behind a virtual I2C bus, for benchmarks and regression
+# runs without hardware. virtual_mpu is a bus: MPU6050 and MPU6050_DMP use it
+# as they would the real one, through read_bits/write_bits/readfrom_mem etc.
+#
+# Time is simulated, not measured, so runs are deterministic and the same on
+# the Pico and on CPython. A virtual_clock replaces utime in the library
+# modules (clock.install(MPU6050, fifo)): sleeping advances it, and every bus
+# transaction advances it by its duration on the wire at the configured bus
+# frequency, plus an optional fixed overhead per call for the host.
+# Transaction time, in bits at freq:
+#   register write   S, address+W, register, n data bytes, P    9*(2+n) + 2
+#   register read    S, address+W, register, Sr, address+R,
+#                    n data bytes, P                             9*(3+n) + 3
+#
+# The device side:
+#   - register file with the power-on values, device reset and self-clearing
+#     bits, WHO_AM_I read only and INT_STATUS cleared on read
+#   - DMP memory through BANK_SEL/MEM_START_ADDR/MEM_R_W
+#   - sensor registers and the 1024 byte FIFO updated every sample period,
+#     1kHz (8kHz with the DLPF off) / (1 + SMPLRT_DIV), while not asleep.
+#     With USER_CTRL FIFO_EN and DMP_EN a 28 byte DMP packet per sample, with
+#     FIFO_EN only the sensors selected in the FIFO_EN register. A full FIFO
+#     loses its oldest bytes and flags FIFO_OFLOW, like the MPU6050.
+#   - the motion comes from a scripted trajectory
+# The DMP itself is not emulated: its packets are made from the trajectory
+# whether or not an image was uploaded.
+#
+# With a virtual_pin as int_pin the device pulses it for every sample that
+# sets an INT_STATUS bit enabled in INT_ENABLE, as the INT pin of the MPU6050,
+# and takes its samples while the clock advances, so a handler attached with
+# MPU6050_DMP.attach_interrupt runs without bus traffic. The clock then also
+# replaces machine.idle, as a short sleep.
+#
+
+FIFO_SIZE = 1024
+DMP_PACKET_SIZE = 28
+QUATERNION_ONE = 1 << 30            # DMP quaternions are Q30, the high word Q14 (16384)
+DMP_ACCEL_LSB_PER_G = 8192
+DMP_GYRO_LSB_PER_DPS = 16.4         # 2000 dps, as set by dmp_initialize
+DMP_MEMORY_BANKS = 16               # the 3062 byte image runs past the 8 banks of MPUregisters
+TICKS_PERIOD = 1 << 30
+TICKS_HALF = TICKS_PERIOD >> 1
+IDLE_US = 100                       # time passed per machine.idle call
+
+# (duration s, rotation rate in dps about the sensor x, y, z axes, acceleration in g along the
+# world x, y, z axes), played in a loop
+DEFAULT_SEGMENTS = ((0.5, (0, 0, 0),    (0, 0, 0)),
+                    (1.0, (0, 0, 90),   (0, 0, 0)),
+                    (0.5, (45, 0, 0),   (0.2, 0, 0)),
+                    (1.0, (0, -60, 30), (0, 0.1, -0.1)),
+                    (0.5, (-45, 0, 0),  (-0.2, 0, 0)))
+
+
+def quaternion_multiply(a, b):
+    aw, ax, ay, az = a
+    bw, bx, by, bz = b
+    return (aw*bw - ax*bx - ay*by - az*bz,
+            aw*bx + ax*bw + ay*bz - az*by,
+            aw*by - ax*bz + ay*bw + az*bx,
+            aw*bz + ax*by - ay*bx + az*bw)
+
+def rotation(rate_dps, seconds):
+    ''' Quaternion of a rotation at a constant rate for seconds '''
+    wx, wy, wz = rate_dps
+    rate = math.sqrt(wx*wx + wy*wy + wz*wz)
+    if rate == 0:
+        return (1.0, 0.0, 0.0, 0.0)
+    half = math.radians(rate) * seconds / 2
+    s = math.sin(half) / rate
+    return (math.cos(half), wx*s, wy*s, wz*s)
+
+def to_sensor(q, v):
+    ''' World vector v in the sensor frame of orientation q '''
+    w, x, y, z = q
+    vx, vy, vz = v
+    return ((1 - 2*(y*y + z*z))*vx + 2*(x*y + w*z)*vy + 2*(x*z - w*y)*vz,
+            2*(x*y - w*z)*vx + (1 - 2*(x*x + z*z))*vy + 2*(y*z + w*x)*vz,
+            2*(x*z + w*y)*vx + 2*(y*z - w*x)*vy + (1 - 2*(x*x + y*y))*vz)
+
+
+class trajectory():
+    ''' Scripted motion: segments of constant rotation rate and acceleration. Each segment is
+        integrated in closed form from the orientation at its start, so samples at any rate give
+        the same motion. state() must be called with increasing times.
+    '''
+    def __init__(self, segments=DEFAULT_SEGMENTS):
+        self.segments = segments
+        self.index = 0
+        self.start_us = 0
+        self.start_q = (1.0, 0.0, 0.0, 0.0)
+
+    def state(self, t_us):
+        ''' (quaternion, gyro dps, accel g) at t_us '''
+        duration, rate, accel = self.segments[self.index]
+        while t_us - self.start_us >= duration * 1000000:
+            self.start_q = quaternion_multiply(self.start_q, rotation(rate, duration))
+            self.start_us += round(duration * 1000000)
+            self.index = (self.index + 1) % len(self.segments)
+            duration, rate, accel = self.segments[self.index]
+        q = quaternion_multiply(self.start_q, rotation(rate, (t_us - self.start_us) / 1000000))
+        ax, ay, az = to_sensor(q, (accel[0], accel[1], accel[2] + 1.0))    # 1g up at rest
+        return q, rate, (ax, ay, az)
+
+
+class virtual_clock():
+    ''' Simulated time with the tick functions of utime. Ticks wrap around like on the Pico. '''
+    def __init__(self):
+        self.now_us = 0
+        self.devices = []           # devices that sample while time passes, not only on bus traffic
+
+    def install(self, *modules):
+        ''' Use this clock as utime, and for machine.idle, in the given (library) modules '''
+        for module in modules:
+            module.utime = self
+            if hasattr(module, 'idle'):
+                module.idle = self.idle
+
+    def ticks_us(self) -> int:
+        return self.now_us % TICKS_PERIOD
+
+    def ticks_ms(self) -> int:
+        return (self.now_us // 1000) % TICKS_PERIOD
+
+    def ticks_diff(self, ticks1, ticks2) -> int:
+        return (ticks1 - ticks2 + TICKS_HALF) % TICKS_PERIOD - TICKS_HALF
+
+    def ticks_add(self, ticks, delta) -> int:
+        return (ticks + delta) % TICKS_PERIOD
+
+    def sleep_us(self, us):
+        if us > 0:
+            self.now_us += us
+            for device in self.devices:
+                device.update()
+
+    def sleep_ms(self, ms):
+        self.sleep_us(ms * 1000)
+
+    def sleep(self, seconds):
+        self.sleep_us(round(seconds * 1000000))
+
+    def idle(self):
+        self.sleep_us(IDLE_US)
+
+
+class virtual_pin():
+    ''' The INT pin of a virtual_mpu, with the irq method of machine.Pin '''
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self):
+        self.handler = None
+        self.pulses = 0
+
+    def irq(self, handler=None, trigger=None, **kwargs):
+        self.handler = handler
+
+    def fire(self):
+        self.pulses += 1
+        if self.handler is not None:
+            self.handler(self)
+
+
+class virtual_mpu(bus):
+    ''' MPU6050 at address on a virtual bus running at freq Hz. overhead_us is added to every
+        transaction for the time the host spends outside the bus, e.g. ~50us for a
+        readfrom_mem_into call on a Pico. The I2C controller i2cbus is not used.
+    '''
+    device_factory = None       # no /dev/i2c-N behind it when run on the Pi (RaspberryPi/i2c_dev.py)
+
+    def __init__(self, i2cbus=0, freq=400000, clock=None, motion=None, address=MPUreg.MPUADDRESS, overhead_us=0,
+                 int_pin=None):
+        super().__init__(i2cbus)
+        self.freq = freq
+        self.clock = virtual_clock() if clock is None else clock
+        self.motion = trajectory() if motion is None else motion
+        self.address = address
+        self.overhead_us = overhead_us
+        self.int_pin = int_pin
+        if int_pin is not None:
+            self.clock.devices.append(self)
+        self.memory = bytearray(DMP_MEMORY_BANKS * MPUreg.DMP_MEMORY_BANK_SIZE)
+        self.power_on()
+        self.reset_stats()
+
+    def power_on(self):
+        self.registers = bytearray(256)
+        self.registers[MPUreg.WHO_AM_I] = 0x68
+        self.registers[MPUreg.PWR_MGMT_1] = 1 << MPUreg.PWR1_SLEEP_BIT
+        self.fifo = bytearray()
+        self.next_sample_us = self.clock.now_us
+        # Packet bookkeeping for the latency: FIFO byte positions counted from the start
+        self.fifo_in = 0            # bytes ever written to the FIFO
+        self.fifo_out = 0           # bytes ever read or lost from the FIFO
+        self.lost_to = 0            # bytes before this position were lost to an overflow
+        self.pending = []           # (start, end position, sample time) of packets in the FIFO
+
+    def reset_stats(self):
+        self.start_us = self.clock.now_us
+        self.transactions = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.busy_us = 0
+        self.packets_read = 0
+        self.packets_lost = 0
+        self.latency_total_us = 0
+        self.latency_max_us = 0
+        self.last_latency_us = None     # of the last packet read
+
+    def stats(self) -> dict:
+        elapsed = self.clock.now_us - self.start_us
+        return {'elapsed_us':    elapsed,
+                'transactions':  self.transactions,
+                'bytes':         self.bytes_read + self.bytes_written,
+                'busy_us':       self.busy_us,
+                'utilisation':   self.busy_us / elapsed if elapsed else 0.0,
+                'packets':       self.packets_read,
+                'packets_lost':  self.packets_lost,
+                'packets_per_s': self.packets_read * 1000000 / elapsed if elapsed else 0.0,
+                'latency_us':    self.latency_total_us / self.packets_read if self.packets_read else 0.0,
+                'latency_max_us': self.latency_max_us}
+#
+# Bus side
+#
+    def transaction(self, dev_addr, bits):
+        if dev_addr != self.address:
+            raise OSError(5, "no device at address")       # EIO, like machine.I2C on a NACK
+        self.update()
+        self.transactions += 1
+        duration = (bits * 1000000 + self.freq - 1) // self.freq
+        self.busy_us += duration
+        self.clock.now_us += duration + self.overhead_us
+
+    def readfrom_mem(self, dev_addr, reg_addr, length, *, addrsize=8):
+        buffer = bytearray(length)
+        self.readfrom_mem_into(dev_addr, reg_addr, buffer)
+        return bytes(buffer)
+
+    def readfrom_mem_into(self, dev_addr, reg_addr, buffer, *, addrsize=8):
+        length = len(buffer)
+        self.transaction(dev_addr, 9*(3 + length) + 3)
+        self.bytes_read += length
+        if reg_addr == MPUreg.FIFO_R_W:
+            self.read_fifo(buffer, length)
+            return
+        for i in range(length):
+            buffer[i] = self.device_read(reg_addr)
+            if reg_addr != MPUreg.MEM_R_W:
+                reg_addr = (reg_addr + 1) & 0xFF
+
+    def writeto_mem(self, dev_addr, reg_addr, buf, *, addrsize=8):
+        self.transaction(dev_addr, 9*(2 + len(buf)) + 2)
+        self.bytes_written += len(buf)
+        register = reg_addr
+        for i in range(len(buf)):
+            self.device_write(register, buf[i])
+            if register not in (MPUreg.MEM_R_W, MPUreg.FIFO_R_W):
+                register = (register + 1) & 0xFF
+        if self.shadow is not None:
+            self.shadow.update(dev_addr, reg_addr, buf)
+#
+# Device side
+#
+    def memory_address(self) -> int:
+        return (self.registers[MPUreg.BANK_SEL] * MPUreg.DMP_MEMORY_BANK_SIZE
+                + self.registers[MPUreg.MEM_START_ADDR]) % len(self.memory)
+
+    def device_read(self, reg_addr) -> int:
+        registers = self.registers
+        if reg_addr == MPUreg.MEM_R_W:
+            address = self.memory_address()
+            registers[MPUreg.MEM_START_ADDR] = (address + 1) & 0xFF
+            return self.memory[address]
+        if reg_addr == MPUreg.FIFO_COUNTH:
+            return min(len(self.fifo), FIFO_SIZE) >> 8
+        if reg_addr == MPUreg.FIFO_COUNTL:
+            return min(len(self.fifo), FIFO_SIZE) & 0xFF
+        value = registers[reg_addr]
+        if reg_addr == MPUreg.INT_STATUS:
+            registers[reg_addr] = 0
+        return value
+
+    def device_write(self, reg_addr, value):
+        registers = self.registers
+        if reg_addr == MPUreg.MEM_R_W:
+            address = self.memory_address()
+            self.memory[address] = value
+            registers[MPUreg.MEM_START_ADDR] = (address + 1) & 0xFF
+        elif reg_addr == MPUreg.FIFO_R_W:
+            self.push(bytes((value,)), self.clock.now_us, False)
+        elif reg_addr == MPUreg.PWR_MGMT_1 and value & (1 << MPUreg.PWR1_DEVICE_RESET_BIT):
+            self.power_on()
+        elif reg_addr == MPUreg.USER_CTRL:
+            if value & (1 << MPUreg.USERCTRL_FIFO_RESET_BIT):
+                self.clear_fifo()
+            registers[reg_addr] = value & ~MPUreg.SELF_CLEARING_BITS[MPUreg.USER_CTRL]
+        elif reg_addr == MPUreg.SIGNAL_PATH_RESET:
+            registers[reg_addr] = 0             # self clearing
+        elif reg_addr not in (MPUreg.WHO_AM_I, MPUreg.INT_STATUS, MPUreg.FIFO_COUNTH, MPUreg.FIFO_COUNTL):
+            registers[reg_addr] = value
+
+    def sample_period_us(self) -> int:
+        dlpf = self.registers[MPUreg.CONFIG] & 0x07
+        return (125 if dlpf in (0, 7) else 1000) * (1 + self.registers[MPUreg.SMPLRT_DIV])
+
+    def update(self):
+        ''' Take the samples due up to now, with the configuration at this moment '''
+        now = self.clock.now_us
+        if self.registers[MPUreg.PWR_MGMT_1] & (1 << MPUreg.PWR1_SLEEP_BIT):
+            self.next_sample_us = now
+            return
+        while self.next_sample_us <= now:
+            self.sample(self.next_sample_us)
+            self.next_sample_us += self.sample_period_us()
+
+    def sample(self, t_us):
+        registers = self.registers
+        q, gyro, accel = self.motion.state(t_us)
+        accel_lsb = 16384 >> ((registers[MPUreg.ACCEL_CONFIG] >> 3) & 3)
+        gyro_lsb = 131 / (1 << ((registers[MPUreg.GYRO_CONFIG] >> 3) & 3))
+        values = [clip16(a * accel_lsb) for a in accel] + [0] + [clip16(g * gyro_lsb) for g in gyro]
+        struct.pack_into('>7h', registers, MPUreg.ACCEL_XOUT_H, *values)
+        status = 1 << MPUreg.INTERRUPT_DATA_RDY_BIT
+        user_ctrl = registers[MPUreg.USER_CTRL]
+        if user_ctrl & (1 << MPUreg.USERCTRL_FIFO_EN_BIT):
+            if user_ctrl & (1 << MPUreg.USERCTRL_DMP_EN_BIT):
+                values = [clip32(c * QUATERNION_ONE) for c in q] + \
+                         [clip16(a * DMP_ACCEL_LSB_PER_G) for a in accel] + \
+                         [clip16(g * DMP_GYRO_LSB_PER_DPS) for g in gyro]
+                packet = struct.pack('>4i6h', *values)
+                status |= 1 << MPUreg.INTERRUPT_DMP_INT_BIT
+                self.push(packet, t_us, True)
+            else:
+                self.push(self.sensor_fifo_data(), t_us, True)
+        registers[MPUreg.INT_STATUS] |= status
+        if self.int_pin is not None and status & registers[MPUreg.INT_ENABLE]:
+            self.int_pin.fire()
+
+    def sensor_fifo_data(self) -> bytes:
+        ''' Sensor registers selected by FIFO_EN, in FIFO order: accel, temperature, gyro x, y, z '''
+        enabled = self.registers[MPUreg.FIFO_EN]
+        data = b''
+        for bit, register, length in ((MPUreg.FIFO_ACCEL_EN_BIT, MPUreg.ACCEL_XOUT_H, 6),
+                                      (MPUreg.FIFO_TEMP_EN_BIT, MPUreg.TEMP_OUT_H, 2),
+                                      (MPUreg.FIFO_XG_EN_BIT, MPUreg.ACCEL_XOUT_H + 8, 2),
+                                      (MPUreg.FIFO_YG_EN_BIT, MPUreg.ACCEL_XOUT_H + 10, 2),
+                                      (MPUreg.FIFO_ZG_EN_BIT, MPUreg.ACCEL_XOUT_H + 12, 2)):
+            if enabled & (1 << bit):
+                data += self.registers[register:register + length]
+        return data
+
+    def push(self, data, t_us, packet):
+        if not data:
+            return
+        if packet:
+            self.pending.append((self.fifo_in, self.fifo_in + len(data), t_us))
+        self.fifo += data
+        self.fifo_in += len(data)
+        excess = len(self.fifo) - FIFO_SIZE
+        if excess > 0:                          # the oldest bytes are overwritten
+            self.fifo = self.fifo[excess:]
+            self.fifo_out += excess
+            self.lost_to = self.fifo_out
+            self.registers[MPUreg.INT_STATUS] |= 1 << MPUreg.INTERRUPT_FIFO_OFLOW_BIT
+            self.retire()
+
+    def read_fifo(self, buffer, length):
+        fifo = self.fifo
+        n = min(length, len(fifo))
+        buffer[0:n] = fifo[0:n]
+        for i in range(n, length):
+            buffer[i] = 0                       # reading an empty FIFO
+        self.fifo = fifo[n:]
+        self.fifo_out += n
+        self.retire()
+
+    def retire(self):
+        ''' Account for the packets that have left the FIFO, read or (partly) lost '''
+        pending = self.pending
+        done = 0
+        read_time = self.clock.now_us
+        while done < len(pending) and pending[done][1] <= self.fifo_out:
+            start, end, t_us = pending[done]
+            if start < self.lost_to:
+                self.packets_lost += 1
+            else:
+                latency = read_time - t_us
+                self.packets_read += 1
+                self.latency_total_us += latency
+                self.last_latency_us = latency
+                if latency > self.latency_max_us:
+                    self.latency_max_us = latency
+            done += 1
+        if done:
+            del pending[0:done]
+
+    def clear_fifo(self):
+        self.fifo_out += len(self.fifo)
+        self.fifo = bytearray()
+        self.pending = []
+
+
+def clip16(value) -> int:
+    return max(-32768, min(32767, round(value)))
+
+def clip32(value) -> int:
+    return max(-0x80000000, min(0x7FFFFFFF, round(value)))
@@ -0,0 +1,91 @@
+# Micropython benchmark
+# The asyncio API of MPU6050_DMP, dmp_initialize_async and async for over
+# mpu.packets(), against a virtual_mpu, so no MPU6050 needs to be connected.
+# A task advances the virtual clock with the real time, so the device delivers
+# its packets in real time, while another task counts how often it gets to run:
+#   - dmp_initialize_async must leave the event loop free during its delays
+#   - PACKETS packets by polling and with an interrupt attached (virtual_pin),
+#     all unit quaternions and none lost, with the runs of the other task
+# Copy the files in RaspberryPico/Lib to /lib on the Pico and run this file from Thonny.
+# On CPython: PYTHONPATH=RaspberryPi:RaspberryPico/Lib python3 RaspberryPico/benchmarks/async_packets_check.py
+
+import struct
+import utime
+import MPU6050
+import fifo
+from MPU6050 import get_asyncio
+from virtual_mpu import virtual_mpu, virtual_clock, virtual_pin, QUATERNION_ONE
+
+PACKETS = 200
+TICK_S  = 0.001
+
+asyncio = get_asyncio()
+
+
+def valid(packet) -> bool:
+    w, x, y, z = [c / QUATERNION_ONE for c in struct.unpack_from('>4i', packet)]
+    return abs(w*w + x*x + y*y + z*z - 1) < 0.01
+
+
+class background():
+    ''' The other tasks: one keeps the virtual clock in step with the real time, one counts its runs '''
+    def __init__(self, clock):
+        self.clock = clock
+        self.runs = 0
+        self.running = True
+
+    async def follow_real_time(self):
+        last = utime.ticks_us()
+        while self.running:
+            await asyncio.sleep(TICK_S)
+            now = utime.ticks_us()
+            self.clock.sleep_us(utime.ticks_diff(now, last))
+            last = now
+
+    async def count(self):
+        while self.running:
+            self.runs += 1
+            await asyncio.sleep(TICK_S)
+
+
+async def run(use_interrupt):
+    clock = virtual_clock()
+    clock.install(MPU6050, fifo)
+    pin = virtual_pin()
+    device = virtual_mpu(0, 400000, clock, int_pin=pin if use_interrupt else None)
+    mpu = MPU6050.MPU6050_DMP(device)
+    tasks = background(clock)
+    follower = asyncio.create_task(tasks.follow_real_time())
+    counter = asyncio.create_task(tasks.count())
+    if await mpu.dmp_initialize_async(warm_start=False) != 0:
+        raise Exception("dmp_initialize_async failed on the virtual device")
+    runs_initialize = tasks.runs
+    if runs_initialize == 0:
+        raise Exception("dmp_initialize_async blocked the event loop")
+    mpu.set_dmp_enabled(True)
+    if use_interrupt:
+        mpu.attach_interrupt(pin)
+    mpu.reset_fifo()
+    device.reset_stats()
+    packets = 0
+    async for packet in mpu.packets():
+        if not valid(packet):
+            raise Exception("invalid packet")
+        packets += 1
+        if packets == PACKETS:
+            break
+    tasks.running = False
+    await follower
+    await counter
+    mpu.detach_interrupt()
+    stats = device.stats()
+    name = "interrupt" if use_interrupt else "polling"
+    print(f"{name:10s} initialize: other task ran {runs_initialize:4d} times;  {packets} packets:"
+          f" {stats['transactions']/packets:5.2f} transactions/packet, lost {stats['packets_lost']},"
+          f" other task ran {tasks.runs - runs_initialize:4d} times")
+    if stats['packets_lost'] or tasks.runs == runs_initialize:
+        raise Exception("packets lost or event loop blocked")
+
+
+asyncio.run(run(False))
+asyncio.run(run(True))
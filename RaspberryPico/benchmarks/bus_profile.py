@@ -0,0 +1,109 @@
+# Micropython benchmark
+# Where the bus time of MPU6050_DMP goes, with bus_profiler on a virtual_mpu
+# at 400 kHz, so no MPU6050 needs to be connected and the times are the
+# simulated bus times, the same on every run:
+#   - dmp_initialize, a configuration sequence, and 200 Hz packet reading with
+#     get_current_fifo_packet, fifo_reader and the iter_packets generator,
+#     reported per API call and per method/register
+#   - the configuration sequence again with the register shadow of bus
+#     enabled, to show the reads hidden in write_bit(s) going away
+#   - the cost on the host of the always-on counters and of the profiler, in
+#     real time per get_fifo_count call
+# Copy the files in RaspberryPico/Lib to /lib on the Pico and run this file from Thonny.
+# On CPython: PYTHONPATH=RaspberryPi:RaspberryPico/Lib python3 RaspberryPico/benchmarks/bus_profile.py
+
+import utime
+import MPU6050
+import fifo
+import bus_profiler
+import MPUregisters as MPUreg
+from fifo import fifo_reader
+from bus_profiler import bus_counters
+from virtual_mpu import virtual_mpu, virtual_clock, DMP_PACKET_SIZE
+
+PACKET_CALLS   = 100
+OVERHEAD_CALLS = 2000
+
+
+def configure(mpu):
+    mpu.set_full_scale_gyro_range(MPUreg.GYRO_FS_250)
+    mpu.set_full_scale_accel_range(MPUreg.ACCEL_FS_2)
+    mpu.set_DLPF_mode(MPUreg.DLPF_BW_42)
+    mpu.set_rate(b'\x04')
+    mpu.set_dmp_enabled(True)
+    mpu.reset_fifo()
+
+
+def profiled_run():
+    clock = virtual_clock()
+    clock.install(MPU6050, fifo, bus_profiler)
+    device = virtual_mpu(0, 400000, clock)
+    mpu = MPU6050.MPU6050_DMP(device)
+    profiler = bus_profiler.bus_profiler(device).attach(mpu)
+    mpu.dmp_initialize(warm_start=False)
+    configure(mpu)
+    for _ in range(PACKET_CALLS):
+        clock.sleep_us(5000)
+        mpu.get_current_fifo_packet(DMP_PACKET_SIZE)
+    reader = fifo_reader(mpu, DMP_PACKET_SIZE)
+    for _ in range(PACKET_CALLS):
+        clock.sleep_us(25000)
+        reader.fill()
+        reader.clear()
+    packets = mpu.iter_packets()
+    for _ in range(PACKET_CALLS):
+        clock.sleep_us(5000)
+        next(packets)
+    packets.close()
+    profiler.report(limit=15)
+    profiler.detach()
+
+
+def configuration_traffic(shadow):
+    clock = virtual_clock()
+    clock.install(MPU6050, fifo, bus_profiler)
+    device = virtual_mpu(0, 400000, clock)
+    if shadow:
+        device.enable_shadow()
+    mpu = MPU6050.MPU6050_DMP(device)
+    counters = bus_counters(device).attach()
+    configure(mpu)
+    configure(mpu)
+    counters.detach()
+    return counters.counts()
+
+
+def host_cost(instrument):
+    ''' us per get_fifo_count on the host, in real time, best of 3 '''
+    device = virtual_mpu(0, 400000, virtual_clock())
+    mpu = MPU6050.MPU6050(device)
+    if instrument is bus_counters:
+        bus_counters(device).attach()
+    elif instrument is not None:
+        instrument(device).attach(mpu)
+    best = None
+    for _ in range(3):
+        start = utime.ticks_us()
+        for _ in range(OVERHEAD_CALLS):
+            mpu.get_fifo_count()
+        duration = utime.ticks_diff(utime.ticks_us(), start)
+        best = duration if best is None else min(best, duration)
+    return best / OVERHEAD_CALLS
+
+
+profiled_run()
+print()
+for shadow in (False, True):
+    reads, writes, bytes_read, bytes_written = configuration_traffic(shadow)
+    print(f"configuration twice, shadow {'on ' if shadow else 'off'}: {reads:3d} reads {writes:3d} writes"
+          f" {bytes_read + bytes_written:4d} bytes")
+print()
+import utime as real_time           # the clock installed above was only for the simulated runs
+for module in (MPU6050, fifo, bus_profiler):
+    module.utime = real_time
+host_cost(None)                     # warm up
+plain = host_cost(None)
+counted = host_cost(bus_counters)
+profiled = host_cost(bus_profiler.bus_profiler)
+print(f"host time per get_fifo_count: plain {plain:.1f} us, counters {counted:.1f} us ({counted - plain:+.1f}),"
+      f" profiler {profiled:.1f} us ({profiled - plain:+.1f})")
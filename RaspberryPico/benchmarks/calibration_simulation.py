@@ -0,0 +1,104 @@
+# Micropython benchmark
+# Offset calibration with calibration.calibrator against a simulated MPU6050
+# lying still with a known bias and noise, so no MPU6050 needs to be
+# connected. Reports the samples used, the offsets found against the exact
+# ones and the remaining error, then saves the calibration, reloads it into a
+# fresh simulated device and checks the same offsets come back. The saved
+# file is removed afterwards.
+# Copy the files in RaspberryPico/Lib to /lib on the Pico and run this file from Thonny.
+
+import os
+import random
+import struct
+import utime
+import MPUregisters as MPUreg
+from bus import bus
+from MPU6050 import MPU6050
+from calibration import calibrator, collect, save_calibration, load_calibration, \
+                        ACCEL_OFFSET_LSB_PER_G, GYRO_OFFSET_LSB_PER_DPS
+
+FACTORY_ACCEL_OFFSETS = (-1642, 1033, 1250)   # as trimmed in the factory, not known to the calibration
+ACCEL_BIAS_G    = (0.045, -0.030, 0.060)      # error left after the factory trim
+GYRO_BIAS_DPS   = (2.5, -1.2, 0.8)
+ACCEL_NOISE_G   = 0.004                       # rms
+GYRO_NOISE_DPS  = 0.05
+PATH = 'calibration_test.json'
+
+
+def noise(rms):
+    ''' Zero mean noise of about rms, from 4 uniform variables (random.gauss is not in micropython) '''
+    return (sum(random.getrandbits(16) for _ in range(4)) / 65536 - 2) * rms * 1.732
+
+
+class simulated_sensor(bus):
+    ''' Register map in RAM; the sensor registers read as 1g up along z plus bias, the effect
+        of the offset registers and noise
+    '''
+    def __init__(self, busnum):
+        super().__init__(busnum)
+        self.registers = bytearray(256)
+        self.registers[MPUreg.WHO_AM_I] = 0x68
+        struct.pack_into('>3h', self.registers, MPUreg.XA_OFFS_H, *FACTORY_ACCEL_OFFSETS)
+        self.reads = 0
+
+    def readfrom_mem(self, dev_addr, reg_addr, length, *, addrsize=8):
+        buffer = bytearray(length)
+        self.readfrom_mem_into(dev_addr, reg_addr, buffer)
+        return bytes(buffer)
+
+    def readfrom_mem_into(self, dev_addr, reg_addr, buffer, *, addrsize=8):
+        if reg_addr == MPUreg.ACCEL_XOUT_H:
+            self.sample()
+            self.reads += 1
+        for i in range(len(buffer)):
+            buffer[i] = self.registers[reg_addr + i]
+
+    def writeto_mem(self, dev_addr, reg_addr, buf, *, addrsize=8):
+        for i in range(len(buf)):
+            self.registers[reg_addr + i] = buf[i]
+
+    def sample(self):
+        accel_lsb = 16384 >> ((self.registers[MPUreg.ACCEL_CONFIG] >> 3) & 3)
+        gyro_lsb = 131 / (1 << ((self.registers[MPUreg.GYRO_CONFIG] >> 3) & 3))
+        accel_offsets = struct.unpack_from('>3h', self.registers, MPUreg.XA_OFFS_H)
+        gyro_offsets = struct.unpack_from('>3h', self.registers, MPUreg.XG_OFFS_USRH)
+        values = []
+        for i in range(3):
+            g = (1.0 if i == 2 else 0.0) + ACCEL_BIAS_G[i] + noise(ACCEL_NOISE_G) \
+                + (accel_offsets[i] - FACTORY_ACCEL_OFFSETS[i]) / ACCEL_OFFSET_LSB_PER_G
+            values.append(max(-32768, min(32767, round(g * accel_lsb))))
+        values.append(0)        # temperature
+        for i in range(3):
+            dps = GYRO_BIAS_DPS[i] + noise(GYRO_NOISE_DPS) + gyro_offsets[i] / GYRO_OFFSET_LSB_PER_DPS
+            values.append(max(-32768, min(32767, round(dps * gyro_lsb))))
+        struct.pack_into('>7h', self.registers, MPUreg.ACCEL_XOUT_H, *values)
+
+
+def exact_offsets():
+    accel = [round(FACTORY_ACCEL_OFFSETS[i] - ACCEL_BIAS_G[i]*ACCEL_OFFSET_LSB_PER_G) for i in range(3)]
+    gyro = [round(-GYRO_BIAS_DPS[i]*GYRO_OFFSET_LSB_PER_DPS) for i in range(3)]
+    return tuple(accel + gyro)
+
+
+sim = simulated_sensor(0)
+mpu = MPU6050(sim)
+sim.registers[MPUreg.SMPLRT_DIV] = 0            # 1kHz samples, to keep the run short
+sim.registers[MPUreg.CONFIG] = 1
+means, deviations = collect(mpu, 200)
+print(f"before: accel {[round(m) for m in means[0:3]]}  gyro {[round(m) for m in means[3:6]]} LSB")
+
+start = utime.ticks_ms()
+cal = calibrator(mpu)
+offsets = cal.calibrate()
+duration = utime.ticks_diff(utime.ticks_ms(), start)
+print(f"calibrated in {cal.rounds} rounds, {cal.samples_used} samples, {duration} ms")
+print(f"offsets {offsets}")
+print(f"exact   {exact_offsets()}")
+print(f"remaining error accel {[round(e*1000, 2) for e in cal.residual[0:3]]} mg"
+      f"  gyro {[round(e, 3) for e in cal.residual[3:6]]} dps")
+
+save_calibration(mpu, offsets, PATH)
+fresh = MPU6050(simulated_sensor(0))
+reloaded = load_calibration(fresh, PATH)
+print(f"reloaded {reloaded}, in the registers: {fresh.get_offsets() == offsets}")
+os.remove(PATH)
@@ -0,0 +1,69 @@
+# Python (CPython) benchmark
+# Frames per second of the rotating cube in rotating_box.py, the original Cube
+# (euclid Vector3, Side and Edge objects created every frame) against ArrayCube
+# (numpy vertex array and static index arrays). Runs headless on the SDL dummy
+# video driver, so the numbers are for the geometry and the pygame.draw calls
+# into an off-screen surface, without display.flip. Both cubes are checked to
+# produce the same image first.
+# Run from this directory: python3 cube_render_benchmark.py [frames]
+
+import math
+import os
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                                'Example_rotating_cube_on_network_server'))
+import pygame
+from euclid import Quaternion
+import rotating_box
+
+FRAMES = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+
+def rotations(frames):
+    ''' Unit quaternions (w, x, y, z) of a tumbling motion, one per frame '''
+    result = []
+    for i in range(frames):
+        t = i / 60.0
+        angle = 1.3*t
+        axis = (math.sin(0.4*t), math.cos(0.3*t), 0.5)
+        norm = math.sqrt(sum(c*c for c in axis))
+        s = math.sin(angle/2) / norm
+        result.append((math.cos(angle/2), axis[0]*s, axis[1]*s, axis[2]*s))
+    return result
+
+
+def run(cube, screen, quaternions, wrap) -> float:
+    start = time.perf_counter()
+    for q in quaternions:
+        cube.erase(screen)
+        cube.draw(screen, wrap(q))
+    return len(quaternions) / (time.perf_counter() - start)
+
+
+def same_image(screen_class, quaternions) -> bool:
+    screen = screen_class(480, 400, scale=1.5)
+    for q in quaternions:
+        screen.i.fill((0, 0, 0))
+        rotating_box.Cube(40, 30, 60).draw(screen, Quaternion(*q))
+        reference = pygame.image.tobytes(screen.i, 'RGB')
+        screen.i.fill((0, 0, 0))
+        rotating_box.ArrayCube(40, 30, 60).draw(screen, q)
+        if pygame.image.tobytes(screen.i, 'RGB') != reference:
+            return False
+    return True
+
+
+if __name__ == "__main__":
+    pygame.init()
+    quaternions = rotations(FRAMES)
+    print(f"{FRAMES} frames, 480x400 dummy display")
+    for screen_class in (rotating_box.Screen, rotating_box.PrespectiveScreen):
+        identical = same_image(screen_class, quaternions[::FRAMES//20 or 1])
+        screen = screen_class(480, 400, scale=1.5)
+        euclid_fps = run(rotating_box.Cube(40, 30, 60), screen, quaternions, lambda q: Quaternion(*q))
+        numpy_fps = run(rotating_box.ArrayCube(40, 30, 60), screen, quaternions, lambda q: q)
+        print(f"{screen_class.__name__:18s} Cube {euclid_fps:8.0f} fps   ArrayCube {numpy_fps:8.0f} fps"
+              f"   x{numpy_fps/euclid_fps:4.1f}   same image: {identical}")
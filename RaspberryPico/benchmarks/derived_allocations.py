@@ -0,0 +1,63 @@
+# Micropython benchmark
+# Heap allocation and time per packet of the derived quantities of
+# dmp_derived (integer, preallocated out) versus the float formulas of the
+# C++ library written out in python, the way MPU6050_quaternions.py does it.
+# No MPU6050 needs to be connected. Copy the files in RaspberryPico/Lib to
+# /lib on the Pico and run this file from Thonny.
+
+import gc
+import math
+import struct
+import utime
+from array import array
+import dmp_derived
+
+CALLS = 1000
+
+# pitch -20 and roll 10 degrees, 0.1g linear acceleration along x
+PACKET = struct.pack('>4i6h', 1021717448, 40946690, 203267764, 256944634, -1983, 1337, 7581, 12, -7, 3)
+
+
+def bytes_allocated(function, count):
+    ''' Heap bytes and time used by count calls of function '''
+    function()                  # warm up
+    gc.collect()
+    gc.disable()
+    before = gc.mem_alloc()
+    start = utime.ticks_us()
+    for _ in range(count):
+        function()
+    duration = utime.ticks_diff(utime.ticks_us(), start)
+    allocated = gc.mem_alloc() - before
+    gc.enable()
+    return allocated, duration
+
+
+def float_derived():
+    qw, qx, qy, qz, ax, ay, az = struct.unpack_from('>hxxhxxhxxhxx3h', PACKET)
+    w, x, y, z = qw/16384, qx/16384, qy/16384, qz/16384
+    gx = 2*(x*z - w*y)
+    gy = 2*(w*x + y*z)
+    gz = w*w - x*x - y*y + z*z
+    yaw = math.atan2(2*x*y - 2*w*z, 2*w*w + 2*x*x - 1)
+    pitch = math.atan2(gx, math.sqrt(gy*gy + gz*gz))
+    roll = math.atan2(gy, gz)
+    return yaw, pitch, roll, ax - gx*8192, ay - gy*8192, az - gz*8192
+
+
+ypr = array('i', (0, 0, 0))
+linear = array('i', (0, 0, 0))
+world = array('i', (0, 0, 0))
+gravity = array('i', (0, 0, 0))
+
+tests = (("float formulas (C++ style)", float_derived),
+         ("get_gravity", lambda: dmp_derived.get_gravity(PACKET, gravity)),
+         ("get_yaw_pitch_roll", lambda: dmp_derived.get_yaw_pitch_roll(PACKET, ypr)),
+         ("get_linear_accel", lambda: dmp_derived.get_linear_accel(PACKET, linear)),
+         ("get_linear_accel_in_world", lambda: dmp_derived.get_linear_accel_in_world(PACKET, world)))
+
+for name, function in tests:
+    allocated, duration = bytes_allocated(function, CALLS)
+    print(f"{name:30s} {allocated/CALLS:8.1f} bytes/packet {duration/CALLS:8.1f} us/packet")
+print(f"yaw/pitch/roll {ypr[0]/100:.2f} {ypr[1]/100:.2f} {ypr[2]/100:.2f} degree,"
+      f" linear {list(linear)}, world {list(world)}")
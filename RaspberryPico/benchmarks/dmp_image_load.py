@@ -0,0 +1,39 @@
+# Micropython benchmark
+# Time and heap needed to get the DMP firmware image into memory: parsing
+# DMP_image.txt as MPU6050_DMP used to do, versus loading DMP_image.bin (or
+# the frozen dmp_firmware module when it is part of the firmware).
+# Copy the files in RaspberryPico/Lib to /lib on the Pico and run this file from Thonny.
+
+import gc
+import utime
+from MPU6050 import load_dmp_image
+
+
+def parse_text_image():
+    int_values =  []
+    with open('/lib/DMP_image.txt') as DMP_image_source:
+        a = DMP_image_source.readlines()
+        for line in a:
+            hex_values = line.strip().rstrip(', ').split(', ')
+            int_values += [int(value, 16) for value in hex_values]
+    return bytes(int_values)
+
+
+def measure(function):
+    gc.collect()
+    gc.disable()              # nothing is freed, so the allocation is an upper bound for the peak heap
+    before = gc.mem_alloc()
+    start = utime.ticks_us()
+    image = function()
+    duration = utime.ticks_diff(utime.ticks_us(), start)
+    allocated = gc.mem_alloc() - before
+    gc.enable()
+    return image, duration, allocated
+
+
+text_image, text_us, text_heap = measure(parse_text_image)
+binary_image, binary_us, binary_heap = measure(load_dmp_image)
+if bytes(text_image) != bytes(binary_image):
+    raise Exception("DMP_image.bin does not match DMP_image.txt, rebuild it with tools/build_dmp_image.py")
+print(f"DMP_image.txt parse  {text_us/1000:8.1f} ms  {text_heap:8d} bytes allocated")
+print(f"load_dmp_image       {binary_us/1000:8.1f} ms  {binary_heap:8d} bytes allocated")
@@ -0,0 +1,94 @@
+# Micropython benchmark
+# Heap allocation per DMP packet when reading the FIFO with
+# MPU6050.get_current_fifo_packet versus the preallocated fifo_reader.
+# The FIFO is simulated, so no MPU6050 needs to be connected. Copy the files
+# in RaspberryPico/Lib to /lib on the Pico and run this file from Thonny.
+
+import gc
+import utime
+import MPUregisters as MPUreg
+from bus import bus
+from MPU6050 import MPU6050
+from fifo import fifo_reader, FIFO_SIZE
+
+PACKET_SIZE = 28
+PACKETS     = 1000
+
+
+class simulated_fifo(bus):
+    ''' Register map in RAM with a FIFO that receives new_packets packets
+        every time its count is read.
+    '''
+    def __init__(self, busnum, new_packets=3):
+        super().__init__(busnum)
+        self.registers = bytearray(256)
+        self.fifo_level = 0
+        self.new_packets = new_packets
+
+    def readfrom_mem(self, dev_addr, reg_addr, length, *, addrsize=8):
+        buffer = bytearray(length)
+        self.readfrom_mem_into(dev_addr, reg_addr, buffer)
+        return bytes(buffer)
+
+    def readfrom_mem_into(self, dev_addr, reg_addr, buffer, *, addrsize=8):
+        if reg_addr == MPUreg.FIFO_COUNTH:
+            self.fifo_level = min(self.fifo_level + self.new_packets*PACKET_SIZE,
+                                  (FIFO_SIZE // PACKET_SIZE)*PACKET_SIZE)
+            buffer[0] = self.fifo_level >> 8
+            buffer[1] = self.fifo_level & 0xFF
+        elif reg_addr == MPUreg.FIFO_R_W:
+            self.fifo_level -= len(buffer)    # packet content is irrelevant here
+        else:
+            for i in range(len(buffer)):
+                buffer[i] = self.registers[reg_addr + i]
+
+    def writeto_mem(self, dev_addr, reg_addr, buf, *, addrsize=8):
+        for i in range(len(buf)):
+            self.registers[reg_addr + i] = buf[i]
+
+
+def bytes_allocated(function, count):
+    ''' Heap bytes and time used by count calls of function, which returns
+        the number of packets it delivered.
+    '''
+    function()                  # warm up
+    gc.collect()
+    gc.disable()
+    before = gc.mem_alloc()
+    start = utime.ticks_us()
+    packets = 0
+    for _ in range(count):
+        packets += function()
+    duration = utime.ticks_diff(utime.ticks_us(), start)
+    allocated = gc.mem_alloc() - before
+    gc.enable()
+    return allocated, duration, packets
+
+
+def current_packet():
+    mpu.get_current_fifo_packet(PACKET_SIZE)
+    return 1
+
+
+def latest_packet():
+    reader.latest_packet()
+    return 1
+
+
+def stream():
+    packets = reader.fill()
+    while reader.next_packet() is not None:
+        pass
+    return packets
+
+
+mpu = MPU6050(simulated_fifo(0))
+reader = fifo_reader(mpu, PACKET_SIZE)
+
+tests = (("get_current_fifo_packet", current_packet),
+         ("fifo_reader.latest_packet", latest_packet),
+         ("fifo_reader.fill/next_packet", stream))
+
+for name, function in tests:
+    allocated, duration, packets = bytes_allocated(function, PACKETS)
+    print(f"{name:30s} {allocated/packets:8.1f} bytes/packet {duration/packets:8.1f} us/packet")
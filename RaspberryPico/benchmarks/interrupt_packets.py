@@ -0,0 +1,77 @@
+# Micropython benchmark
+# Interrupt driven packet reading (MPU6050_DMP.attach_interrupt/wait_packet)
+# against a virtual_mpu whose INT pin is a virtual_pin, so no MPU6050 needs to
+# be connected and the times are simulated:
+#   - wait_packet before attach_interrupt: the timeout of the configured rate
+#   - PACKETS packets with wait_packet, checked for being unit quaternions and
+#     for none being lost, with the bus transactions and the age per packet
+#   - the same number with get_current_fifo_packet polling every POLL_US
+# Copy the files in RaspberryPico/Lib to /lib on the Pico and run this file from Thonny.
+# On CPython: PYTHONPATH=RaspberryPi:RaspberryPico/Lib python3 RaspberryPico/benchmarks/interrupt_packets.py
+
+import struct
+import MPU6050
+import fifo
+from virtual_mpu import virtual_mpu, virtual_clock, virtual_pin, DMP_PACKET_SIZE, QUATERNION_ONE
+
+PACKETS = 200
+POLL_US = 1000
+
+
+def valid(packet) -> bool:
+    w, x, y, z = [c / QUATERNION_ONE for c in struct.unpack_from('>4i', packet)]
+    return abs(w*w + x*x + y*y + z*z - 1) < 0.01
+
+
+def setup():
+    clock = virtual_clock()
+    clock.install(MPU6050, fifo)
+    pin = virtual_pin()
+    device = virtual_mpu(0, 400000, clock, int_pin=pin)
+    mpu = MPU6050.MPU6050_DMP(device)
+    if mpu.dmp_initialize(warm_start=False) != 0:
+        raise Exception("dmp_initialize failed on the virtual device")
+    mpu.set_dmp_enabled(True)
+    mpu.reset_fifo()
+    return clock, pin, device, mpu
+
+
+def timeout_without_interrupt():
+    clock, pin, device, mpu = setup()
+    start = clock.now_us
+    try:
+        mpu.wait_packet()
+    except Exception as e:
+        if str(e) != 'Timeout waiting for next packet':
+            raise
+        print(f"wait_packet without interrupt: timeout after {(clock.now_us - start)/1000:.1f} ms")
+        return
+    raise Exception("wait_packet returned a packet without an interrupt attached")
+
+
+def read(use_interrupt):
+    clock, pin, device, mpu = setup()
+    if use_interrupt:
+        mpu.attach_interrupt(pin)
+    device.reset_stats()
+    for _ in range(PACKETS):
+        if use_interrupt:
+            packet = mpu.wait_packet()
+        else:
+            clock.sleep_us(POLL_US)
+            packet = mpu.get_current_fifo_packet(DMP_PACKET_SIZE)
+        if not valid(packet):
+            raise Exception("invalid packet")
+    stats = device.stats()
+    if use_interrupt and (stats['packets'] < PACKETS or stats['packets_lost']):
+        raise Exception("packets lost with the interrupt attached")
+    name = "wait_packet (interrupt)" if use_interrupt else f"get_current_fifo_packet, {POLL_US} us poll"
+    print(f"{name:40s} {stats['transactions']/PACKETS:5.2f} transactions/packet"
+          f"  bus {stats['utilisation']*100:5.1f}%  age {stats['latency_us']/1000:5.2f} ms"
+          f"  pin pulses {pin.pulses}")
+    mpu.detach_interrupt()
+
+
+timeout_without_interrupt()
+read(True)
+read(False)
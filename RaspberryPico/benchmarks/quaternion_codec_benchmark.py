@@ -0,0 +1,75 @@
+# Python (CPython) benchmark
+# Bytes per sample, encode time and maximum error of quaternion_codec for a
+# motion trajectory resembling a hand-held sensor: slowly varying rotation
+# rates with a little tremor, sampled at the 200Hz DMP rate and rounded to
+# the raw 16 bit DMP components, as well as for a sensor at rest.
+# Run from this directory: python3 quaternion_codec_benchmark.py [samples]
+
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Lib'))
+from quaternion_codec import quaternion_encoder, quaternion_decoder, RAW_SCALE
+
+SAMPLES = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+RATE = 200.0
+
+
+def multiply(p, q):
+    pw, px, py, pz = p
+    qw, qx, qy, qz = q
+    return (pw*qw - px*qx - py*qy - pz*qz,
+            pw*qx + px*qw + py*qz - pz*qy,
+            pw*qy - px*qz + py*qw + pz*qx,
+            pw*qz + px*qy - py*qx + pz*qw)
+
+
+def trajectory(samples, moving=True):
+    random.seed(1)
+    q = (1.0, 0.0, 0.0, 0.0)
+    raw = []
+    for i in range(samples):
+        t = i / RATE
+        if moving:   # rad/s: slow sweeps on all axes plus 8Hz tremor
+            rate = (1.5*math.sin(0.7*t) + 0.05*math.sin(2*math.pi*8*t),
+                    1.0*math.sin(0.45*t + 1.0) + 0.05*math.sin(2*math.pi*8*t + 0.5),
+                    2.0*math.sin(0.3*t + 2.0))
+        else:
+            rate = (0.0, 0.0, 0.0)
+        angle = math.sqrt(sum(r*r for r in rate)) / RATE
+        if angle > 0:
+            s = math.sin(angle/2) / (angle*RATE)
+            q = multiply(q, (math.cos(angle/2), rate[0]*s, rate[1]*s, rate[2]*s))
+        norm = math.sqrt(sum(c*c for c in q))
+        q = tuple(c/norm for c in q)
+        raw.append(tuple(int(round(c*RAW_SCALE + random.gauss(0, 1.0))) for c in q))   # sensor noise
+    return raw
+
+
+def run(name, raw, quantum, keyframe_interval=100):
+    encoder = quaternion_encoder(quantum, keyframe_interval)
+    out = bytearray(len(raw) * quaternion_encoder.MAX_FRAME)
+    start = time.perf_counter()
+    offset = 0
+    for w, x, y, z in raw:
+        offset = encoder.encode(w, x, y, z, out, offset)
+    encode_time = time.perf_counter() - start
+    decoded = quaternion_decoder(quantum).decode(out[:offset])
+    error = 0.0
+    for r, d in zip(raw, decoded):
+        r = [c/RAW_SCALE for c in r]
+        sign = 1 if sum(a*b for a, b in zip(r, d)) >= 0 else -1      # q and -q are the same rotation
+        error = max(error, max(abs(a - sign*b) for a, b in zip(r, d)))
+    print(f"{name:8s} quantum {quantum:2d}  {offset/len(raw):5.2f} bytes/sample "
+          f"(raw 8, DMP 16)  {encode_time/len(raw)*1e6:6.2f} us/sample  max error {error:.6f}")
+
+
+moving = trajectory(SAMPLES)
+resting = trajectory(SAMPLES, moving=False)
+for quantum in (1, 4, 16):
+    run("moving", moving, quantum)
+for quantum in (1, 4, 16):
+    run("at rest", resting, quantum)
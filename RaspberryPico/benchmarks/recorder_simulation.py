@@ -0,0 +1,141 @@
+# Micropython benchmark
+# motion_recorder at the full 200Hz DMP rate against a simulated MPU6050 and a
+# simulated flash file system, so no MPU6050 needs to be connected.
+# The simulated FIFO receives a numbered 28 byte packet every 5 ms of real
+# time, overflows like the real one at 1024 bytes and raises the motion
+# interrupt at TRIGGERS_MS. Every block write takes WRITE_MS, like a flash
+# sector erase and program, and is checked on arrival: CRC, and packet numbers
+# following on without gaps from the pre-trigger packets to the end of the
+# post-trigger packets. Writes taking longer than the 180 ms the FIFO can
+# hold make it overflow, which shows up as gaps.
+# Copy the files in RaspberryPico/Lib to /lib on the Pico and run this file from Thonny.
+
+import struct
+import utime
+import MPUregisters as MPUreg
+from bus import bus
+from MPU6050 import MPU6050_DMP
+from fifo import FIFO_SIZE
+from recorder import motion_recorder, decode_block, BLOCK_START, BLOCK_TRIGGER, BLOCK_GAP, NO_TRIGGER
+
+PACKET_SIZE = 28
+PERIOD_US   = 5000
+DURATION_MS = 12000
+TRIGGERS_MS = (2000, 2600, 8000)   # the second one extends the first recording
+WRITE_MS    = 40
+PRETRIGGER  = 100
+POSTTRIGGER = 600
+
+
+class simulated_mpu(bus):
+    ''' Register map in RAM with a FIFO that fills in real time at the DMP rate '''
+    def __init__(self, busnum, triggers_ms=()):
+        super().__init__(busnum)
+        self.registers = bytearray(256)
+        self.registers[MPUreg.SMPLRT_DIV] = 4      # 200Hz with the DLPF on
+        self.registers[MPUreg.CONFIG] = 3
+        self.fifo = bytearray(FIFO_SIZE)
+        self.fifo_level = 0
+        self.produced = 0                           # packets generated since the start
+        self.start = utime.ticks_us()
+        self.triggers_ms = list(triggers_ms)
+        self.status = 0
+
+    def update(self):
+        due = utime.ticks_diff(utime.ticks_us(), self.start) // PERIOD_US
+        while self.produced < due:
+            if self.fifo_level + PACKET_SIZE > FIFO_SIZE:
+                self.status |= 1 << MPUreg.INTERRUPT_FIFO_OFLOW_BIT
+                self.fifo_level = FIFO_SIZE         # packet boundaries are gone
+            else:
+                struct.pack_into('>I', self.fifo, self.fifo_level, self.produced)
+                self.fifo_level += PACKET_SIZE
+            self.produced += 1
+        if self.triggers_ms and self.produced*PERIOD_US >= self.triggers_ms[0]*1000:
+            self.triggers_ms.pop(0)
+            self.status |= 1 << MPUreg.INTERRUPT_MOT_BIT
+
+    def readfrom_mem(self, dev_addr, reg_addr, length, *, addrsize=8):
+        buffer = bytearray(length)
+        self.readfrom_mem_into(dev_addr, reg_addr, buffer)
+        return bytes(buffer)
+
+    def readfrom_mem_into(self, dev_addr, reg_addr, buffer, *, addrsize=8):
+        if reg_addr == MPUreg.FIFO_COUNTH:
+            self.update()
+            buffer[0] = self.fifo_level >> 8
+            buffer[1] = self.fifo_level & 0xFF
+        elif reg_addr == MPUreg.FIFO_R_W:
+            n = len(buffer)
+            for i in range(n):
+                buffer[i] = self.fifo[i]
+            self.fifo[0:self.fifo_level - n] = self.fifo[n:self.fifo_level]
+            self.fifo_level -= n
+        elif reg_addr == MPUreg.INT_STATUS:
+            self.update()
+            buffer[0] = self.status
+            self.status = 0
+        else:
+            for i in range(len(buffer)):
+                buffer[i] = self.registers[reg_addr + i]
+
+    def writeto_mem(self, dev_addr, reg_addr, buf, *, addrsize=8):
+        if reg_addr == MPUreg.USER_CTRL and buf[0] & (1 << MPUreg.USERCTRL_FIFO_RESET_BIT):
+            self.update()
+            self.fifo_level = 0
+            buf = bytes([buf[0] & ~(1 << MPUreg.USERCTRL_FIFO_RESET_BIT)])
+        for i in range(len(buf)):
+            self.registers[reg_addr + i] = buf[i]
+
+
+class simulated_file():
+    ''' Checks every block written and keeps the packet numbers of each recording '''
+    def __init__(self, write_ms):
+        self.write_ms = write_ms
+        self.recordings = []            # [first packet number, last packet number, triggers]
+        self.errors = 0
+        self.gaps = 0
+        self.blocks = 0
+
+    def write(self, block):
+        utime.sleep_ms(self.write_ms)
+        self.blocks += 1
+        try:
+            flags, trigger_index, sequence, timestamp_us, period_us, packets = decode_block(bytes(block))
+        except Exception as e:
+            print(e)
+            self.errors += 1
+            return
+        count = len(packets) // PACKET_SIZE
+        numbers = [struct.unpack_from('>I', packets, i*PACKET_SIZE)[0] for i in range(count)]
+        if flags & BLOCK_START or not self.recordings:
+            self.recordings.append([numbers[0], numbers[0] - 1, []])
+        recording = self.recordings[-1]
+        if flags & BLOCK_GAP:
+            self.gaps += 1                  # after a FIFO overflow the numbers start again
+            recording[1] = numbers[0] - 1
+        if numbers != list(range(recording[1] + 1, recording[1] + 1 + count)):
+            self.errors += 1
+        elif numbers[0] != sequence and not flags & BLOCK_GAP:
+            self.errors += 1                # sequence numbers are estimated after a gap
+        recording[1] = numbers[-1]
+        if flags & BLOCK_TRIGGER and trigger_index != NO_TRIGGER:
+            recording[2].append(numbers[trigger_index])
+
+
+sim = simulated_mpu(0, TRIGGERS_MS)
+mpu = MPU6050_DMP(sim)
+file = simulated_file(WRITE_MS)
+recorder = motion_recorder(mpu, file, PRETRIGGER, POSTTRIGGER)
+recorder.arm_motion()
+sim.start = utime.ticks_us()
+sim.produced = 0
+recorder.start()
+recorder.run(DURATION_MS)
+
+print(f"{sim.produced} packets produced in {DURATION_MS} ms, {recorder.recordings} recordings,"
+      f" {file.blocks} blocks written of which {file.errors} incorrect")
+print(f"FIFO overflows {recorder.overflows}, blocks after a gap {file.gaps}, longest block write {recorder.max_write_us/1000:.1f} ms")
+for first, last, triggers in file.recordings:
+    print(f"  packets {first:5d} .. {last:5d}  trigger at {triggers}"
+          f"  pre-trigger {triggers[0] - first if triggers else 0}  post-trigger {last - triggers[-1] if triggers else 0}")
@@ -0,0 +1,72 @@
+# Micropython benchmark
+# The register shadow of bus against virtual_mpu, its in-memory register map,
+# so no MPU6050 needs to be connected:
+#   - after dmp_initialize (which streams the firmware through MEM_R_W) and a
+#     configuration sequence, every cached register must hold the value of the
+#     device register, and get_device_id must still read 0x34
+#   - transactions and bytes of the configuration sequence with the shadow
+#     off and on
+# Copy the files in RaspberryPico/Lib to /lib on the Pico and run this file from Thonny.
+# On CPython: PYTHONPATH=RaspberryPi:RaspberryPico/Lib python3 RaspberryPico/benchmarks/register_shadow_check.py
+
+import MPU6050
+import fifo
+import MPUregisters as MPUreg
+from bus_profiler import bus_counters
+from virtual_mpu import virtual_mpu, virtual_clock
+
+DEVICE_ID = 0x34
+
+
+def configure(mpu):
+    mpu.set_full_scale_gyro_range(MPUreg.GYRO_FS_250)
+    mpu.set_full_scale_accel_range(MPUreg.ACCEL_FS_2)
+    mpu.set_DLPF_mode(MPUreg.DLPF_BW_42)
+    mpu.set_rate(b'\x04')
+    mpu.set_dmp_enabled(True)
+    mpu.reset_fifo()
+
+
+def setup(shadow):
+    clock = virtual_clock()
+    clock.install(MPU6050, fifo)
+    device = virtual_mpu(0, 400000, clock)
+    if shadow:
+        device.enable_shadow()
+    return device, MPU6050.MPU6050_DMP(device)
+
+
+def check_shadow():
+    device, mpu = setup(True)
+    if mpu.dmp_initialize(warm_start=False) != 0:
+        raise Exception("dmp_initialize failed on the virtual device")
+    configure(mpu)
+    wrong = 0
+    for (dev_addr, reg_addr), value in device.shadow.registers.items():
+        if reg_addr > 0xFF:
+            print(f"  register {reg_addr:#x} cached, beyond the register map")
+            wrong += 1
+        elif value != device.registers[reg_addr]:
+            print(f"  register {reg_addr:#04x}: shadow {value:#04x}, device {device.registers[reg_addr]:#04x}")
+            wrong += 1
+    device_id = mpu.get_device_id()
+    print(f"shadow after dmp_initialize: {len(device.shadow.registers)} registers cached,"
+          f" {wrong} wrong, device id {device_id:#04x}")
+    if wrong or device_id != DEVICE_ID:
+        raise Exception("register shadow out of step with the device")
+
+
+def configuration_traffic(shadow):
+    device, mpu = setup(shadow)
+    counters = bus_counters(device).attach()
+    configure(mpu)
+    configure(mpu)
+    counters.detach()
+    return counters.counts()
+
+
+check_shadow()
+for shadow in (False, True):
+    reads, writes, bytes_read, bytes_written = configuration_traffic(shadow)
+    print(f"configuration twice, shadow {'on ' if shadow else 'off'}: {reads:3d} reads {writes:3d} writes"
+          f" {bytes_read + bytes_written:4d} bytes")
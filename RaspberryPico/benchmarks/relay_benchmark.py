@@ -0,0 +1,115 @@
+# Python (CPython) benchmark
+# telemetry_relay.py on localhost with synthetic senders: a number of devices
+# send telemetry datagrams as fast as they can, while these subscribers listen:
+#   udp full    UDP, every datagram
+#   udp 10/s    UDP, at most 10 datagrams per second per device
+#   tcp full    TCP, every datagram
+#   tcp stalled TCP, never reads: its queue fills up and drops the oldest
+# Reports the ingest rate and per subscriber what was sent, skipped by the rate
+# limit, dropped from the queue and received, and checks the stalled
+# subscriber did not slow down the others.
+# Run from this directory: python3 relay_benchmark.py [seconds] [devices]
+
+import os
+from socket import socket, AF_INET, SOCK_DGRAM, SOCK_STREAM
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Lib'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                                'Example_rotating_cube_on_network_server'))
+import telemetry
+from telemetry_relay import Relay, recv_framed
+
+SECONDS = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+DEVICES = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+PACKET = bytes(range(28))
+
+
+def sender(port, device_id, stop, counts):
+    sock = socket(AF_INET, SOCK_DGRAM)
+    sock.connect(('127.0.0.1', port))
+    encoder = telemetry.telemetry_encoder(device_id, 8, 5000)
+    sequence = 0
+    while not stop.is_set():
+        datagram = encoder.add(sequence, sequence*5000, PACKET)
+        sequence += 1
+        if datagram is not None:
+            sock.send(datagram)
+            counts[device_id] += 1
+            if counts[device_id] % 64 == 0:
+                time.sleep(0.0005)        # leave the relay some room, as a real sender would
+
+
+class Listener(threading.Thread):
+    def __init__(self, receive):
+        super().__init__(daemon=True)
+        self.receive = receive
+        self.tracker = telemetry.sequence_tracker()
+        self.datagrams = 0
+
+    def run(self):
+        while True:
+            try:
+                datagram = self.receive()
+            except OSError:
+                return
+            if datagram is None:
+                return
+            device_id, sequence, _, _, samples = telemetry.decode(datagram)
+            self.tracker.update(device_id, sequence, len(samples))
+            self.datagrams += 1
+
+
+def udp_subscription(control_port, request):
+    sock = socket(AF_INET, SOCK_DGRAM)
+    sock.bind(('127.0.0.1', 0))
+    sock.sendto(request, ('127.0.0.1', control_port))
+    return Listener(lambda: sock.recv(2048)), sock
+
+
+def tcp_subscription(stream_port, request):
+    sock = socket(AF_INET, SOCK_STREAM)
+    sock.connect(('127.0.0.1', stream_port))
+    sock.sendall(request)
+    return Listener(lambda: recv_framed(sock)), sock
+
+
+if __name__ == "__main__":
+    relay = Relay('127.0.0.1', 0, 0, 0)
+    relay.start()
+    ingest_port, control_port, stream_port = relay.ports
+    listeners = [('udp full',    *udp_subscription(control_port, b'SUB')),
+                 ('udp 10/s',    *udp_subscription(control_port, b'SUB 10')),
+                 ('tcp full',    *tcp_subscription(stream_port, b'SUB\n')),
+                 ('tcp stalled', *tcp_subscription(stream_port, b'SUB\n'))]
+    for name, listener, _ in listeners[:-1]:
+        listener.start()
+    while len(relay.subscribers) < len(listeners):
+        time.sleep(0.01)
+
+    stop = threading.Event()
+    counts = [0] * DEVICES
+    senders = [threading.Thread(target=sender, args=(ingest_port, i, stop, counts)) for i in range(DEVICES)]
+    start = time.perf_counter()
+    for thread in senders:
+        thread.start()
+    time.sleep(SECONDS)
+    stop.set()
+    for thread in senders:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    time.sleep(0.5)                       # let the queues drain
+
+    print(f"{DEVICES} devices, {sum(counts)} datagrams sent in {elapsed:.1f} s,"
+          f" relay received {relay.received} ({relay.received/elapsed:.0f}/s)")
+    by_name = {subscriber.name: subscriber for subscriber in relay.subscribers}
+    for name, listener, sock in listeners:
+        address, port = sock.getsockname()
+        subscriber = by_name[f"{'udp' if sock.type == SOCK_DGRAM else 'tcp'} {address}:{port}"]
+        received = f"{listener.datagrams:8d}" if listener.is_alive() else "       -"
+        print(f"  {name:12s} sent {subscriber.sent:8d}  skipped {subscriber.skipped:8d}"
+              f"  dropped {subscriber.dropped:8d}  received {received}  lost {listener.tracker.lost}")
+    print(f"full rate UDP subscriber got {100*listeners[0][1].datagrams/max(relay.received, 1):.1f}%"
+          f" of the ingested datagrams, the relay itself lost none of them: {relay.received == sum(counts)}")
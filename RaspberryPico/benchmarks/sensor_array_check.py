@@ -0,0 +1,64 @@
+# Micropython benchmark
+# SensorArray with two virtual_mpu devices, at 0x68 and 0x69 on separate
+# virtual buses sharing one virtual clock, so no MPU6050 needs to be connected.
+# Both devices turn about z at a constant rate, so the sample time of every
+# packet follows from its quaternion. Per schedule this reports the aligned
+# sets, the packets dropped as unaligned, the FIFO overflows and the largest
+# difference in sample time within a set, which must stay within half a
+# sample period.
+# Copy the files in RaspberryPico/Lib to /lib on the Pico and run this file from Thonny.
+# On CPython: PYTHONPATH=RaspberryPi:RaspberryPico/Lib python3 RaspberryPico/benchmarks/sensor_array_check.py
+
+import math
+import struct
+import MPU6050
+import fifo
+import sensor_array
+from sensor_array import SensorArray, ROUND_ROBIN, FILL_LEVEL
+from virtual_mpu import virtual_mpu, virtual_clock, trajectory
+
+RATE_DPS    = 90
+SEGMENTS    = ((100.0, (0, 0, RATE_DPS), (0, 0, 0)),)
+ADDRESSES   = (0x68, 0x69)
+DURATION_US = 1500000
+WORK_US     = 3000          # processing per set, so the FIFOs hold a few packets per service
+
+
+def sample_time_us(packet) -> float:
+    ''' Time of the sample from the rotation angle about z '''
+    w, x, y, z = struct.unpack_from('>4i', packet)
+    return 2 * math.degrees(math.atan2(z, w)) / RATE_DPS * 1000000
+
+
+def run(schedule, name):
+    clock = virtual_clock()
+    clock.install(MPU6050, fifo, sensor_array)
+    devices = []
+    for i, address in enumerate(ADDRESSES):
+        device = virtual_mpu(i, 400000, clock, trajectory(SEGMENTS), address=address)
+        mpu = MPU6050.MPU6050_DMP(device, address)
+        if mpu.dmp_initialize(warm_start=False) != 0:
+            raise Exception("dmp_initialize failed on the virtual device")
+        mpu.set_dmp_enabled(True)
+        devices.append(mpu)
+    array = SensorArray(devices, schedule)
+    array.start()
+    start = clock.now_us
+    period_us = devices[0].get_sample_period_us()
+    sets = 0
+    skew = 0
+    for timestamp, packets in array.samples():
+        times = [sample_time_us(packet) for packet in packets]
+        skew = max(skew, max(times) - min(times))
+        sets += 1
+        clock.sleep_us(WORK_US)
+        if clock.now_us - start > DURATION_US:
+            break
+    print(f"{name:12s} {sets:4d} aligned sets  {array.unaligned:3d} unaligned  {array.overflows:2d} overflows"
+          f"  largest skew {skew/1000:5.2f} ms (period {period_us/1000:.1f} ms)")
+    if skew > period_us / 2 or sets < DURATION_US // period_us * 9 // 10:
+        raise Exception("SensorArray sets not aligned")
+
+
+run(ROUND_ROBIN, "round robin")
+run(FILL_LEVEL, "fill level")
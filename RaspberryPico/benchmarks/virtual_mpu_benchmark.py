@@ -0,0 +1,100 @@
+# Micropython benchmark
+# Acquisition throughput against virtual_mpu, a simulated MPU6050 on a
+# simulated bus, at 50, 100 and 400 kHz. Time is simulated, so the figures are
+# the same on every run and on every host: bus time per transaction follows
+# from the bus frequency, and OVERHEAD_US is added per call for the time
+# micropython spends around each I2C call on the Pico.
+# Reported per bus frequency:
+#   dmp_initialize         transactions, bytes, time on the bus, total time
+#                          (including the two 100 ms reset delays)
+#   get_current_fifo_packet with WORK_US of processing between calls: packets
+#                          returned per second, bus utilisation and the age of
+#                          the returned packet (sample time to end of read)
+#   the same at a 300 ms polling interval, which lets the 1024 byte FIFO
+#                          overflow: get_current_fifo_packet resets it and
+#                          waits for a new packet, so no packet returned may
+#                          be invalid (not a unit quaternion)
+#   fifo_reader.fill       all packets, in chunks of 5
+# Copy the files in RaspberryPico/Lib to /lib on the Pico and run this file from Thonny.
+# On CPython: PYTHONPATH=RaspberryPi:RaspberryPico/Lib python3 RaspberryPico/benchmarks/virtual_mpu_benchmark.py
+# (the Pi stand-ins for machine and utime; the DMP image is read from /lib/DMP_image.bin
+# unless the frozen dmp_firmware module is present).
+
+import struct
+import MPU6050
+import fifo
+from fifo import fifo_reader
+from virtual_mpu import virtual_mpu, virtual_clock, DMP_PACKET_SIZE, QUATERNION_ONE
+
+FREQUENCIES  = (50000, 100000, 400000)
+OVERHEAD_US  = 50
+WORK_US      = 2000
+CALLS        = 400
+SLOW_POLL_US = 300000
+SLOW_CALLS   = 20
+FILL_MS      = 2000
+
+
+def valid(packet) -> bool:
+    ''' A DMP packet holds a unit quaternion; a packet out of step with the FIFO does not '''
+    w, x, y, z = [c / QUATERNION_ONE for c in struct.unpack_from('>4i', packet)]
+    return abs(w*w + x*x + y*y + z*z - 1) < 0.01
+
+
+def setup(freq):
+    clock = virtual_clock()
+    clock.install(MPU6050, fifo)
+    device = virtual_mpu(0, freq, clock, overhead_us=OVERHEAD_US)
+    mpu = MPU6050.MPU6050_DMP(device)
+    return clock, device, mpu
+
+
+def initialize(freq):
+    clock, device, mpu = setup(freq)
+    device.reset_stats()
+    if mpu.dmp_initialize(warm_start=False) != 0:
+        raise Exception("dmp_initialize failed on the virtual device")
+    stats = device.stats()
+    print(f"  dmp_initialize            {stats['transactions']:6d} transactions {stats['bytes']:6d} bytes"
+          f"  bus {stats['busy_us']/1000:7.1f} ms  total {stats['elapsed_us']/1000:7.1f} ms")
+    mpu.set_dmp_enabled(True)
+    mpu.reset_fifo()
+    return clock, device, mpu
+
+
+def current_packet(clock, device, mpu, interval_us, calls, name):
+    device.reset_stats()
+    ages = 0
+    invalid = 0
+    for _ in range(calls):
+        clock.sleep_us(interval_us)
+        packet = mpu.get_current_fifo_packet(DMP_PACKET_SIZE)
+        ages += device.last_latency_us
+        invalid += not valid(packet)
+    stats = device.stats()
+    rate = calls * 1000000 / stats['elapsed_us']
+    print(f"  {name:25s} {rate:6.1f} packets/s  bus {stats['utilisation']*100:5.1f}%"
+          f"  age {ages/calls/1000:6.2f} ms  invalid {invalid}/{calls}")
+
+
+def fill(clock, device, mpu):
+    mpu.reset_fifo()
+    reader = fifo_reader(mpu, DMP_PACKET_SIZE)
+    device.reset_stats()
+    packets = 0
+    while clock.now_us - device.start_us < FILL_MS * 1000:
+        clock.sleep_us(WORK_US)
+        reader.fill()
+        while reader.next_packet() is not None:
+            packets += 1
+    stats = device.stats()
+    print(f"  fifo_reader.fill          {packets*1000000/stats['elapsed_us']:6.1f} packets/s  bus {stats['utilisation']*100:5.1f}%"
+          f"  age {stats['latency_us']/1000:6.2f} ms  max {stats['latency_max_us']/1000:.2f} ms  lost {stats['packets_lost']}")
+
+
+for freq in FREQUENCIES:
+    print(f"bus at {freq//1000} kHz, {OVERHEAD_US} us overhead per call")
+    clock, device, mpu = initialize(freq)
+    current_packet(clock, device, mpu, WORK_US, CALLS, "get_current_fifo_packet")
+    current_packet(clock, device, mpu, SLOW_POLL_US, SLOW_CALLS, f"  polled every {SLOW_POLL_US//1000} ms")
+    fill(clock, device, mpu)
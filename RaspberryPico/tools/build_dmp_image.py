@@ -0,0 +1,62 @@
+# Python (CPython) tool
+# Converts the DMP firmware in RaspberryPico/Lib/DMP_image.txt into the binary
+# DMP_image.bin that MPU6050_DMP loads at start-up: an 8 byte header holding
+# the image length and its CRC32 (both big endian, 32 bit) followed by the
+# image itself.
+# With --module it also writes a python module with the image as a bytes
+# constant. Frozen into the micropython firmware (or compiled with mpy-cross)
+# the image then stays in flash and costs no heap at all.
+#
+# python3 build_dmp_image.py [--source DMP_image.txt] [--output DMP_image.bin] [--module dmp_firmware.py]
+
+import argparse
+import os
+import struct
+import zlib
+
+DMP_IMAGE_SIZE = 3062
+LIB = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Lib')
+
+
+def read_text_image(path) -> bytes:
+    int_values = []
+    with open(path) as DMP_image_source:
+        for line in DMP_image_source:
+            line = line.strip().rstrip(',').strip()
+            if line:
+                int_values += [int(value, 16) for value in line.split(',')]
+    return bytes(int_values)
+
+
+def write_binary_image(path, image):
+    with open(path, 'wb') as f:
+        f.write(struct.pack('>II', len(image), zlib.crc32(image)))
+        f.write(image)
+
+
+def write_module(path, image):
+    with open(path, 'w') as f:
+        f.write("# Generated by RaspberryPico/tools/build_dmp_image.py, do not edit\n")
+        f.write("# DMP firmware image, freeze this module to keep the image in flash\n\n")
+        f.write(f"CRC32 = 0x{zlib.crc32(image):08X}\n")
+        f.write("IMAGE = (\n")
+        for i in range(0, len(image), 16):
+            f.write("    b'" + ''.join(f"\\x{b:02x}" for b in image[i:i+16]) + "'\n")
+        f.write(")\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert DMP_image.txt to its binary form")
+    parser.add_argument("--source", default=os.path.join(LIB, 'DMP_image.txt'))
+    parser.add_argument("--output", default=os.path.join(LIB, 'DMP_image.bin'))
+    parser.add_argument("--module", help="also write the image as a python module for freezing")
+    args = parser.parse_args()
+
+    image = read_text_image(args.source)
+    if len(image) != DMP_IMAGE_SIZE:
+        raise Exception(f"DMP image file has incorrect length {len(image)}, expected {DMP_IMAGE_SIZE}")
+    write_binary_image(args.output, image)
+    print(f"{args.output}: {len(image)} bytes, CRC32 0x{zlib.crc32(image):08X}")
+    if args.module:
+        write_module(args.module, image)
+        print(f"{args.module} written")